@@ -1,6 +1,35 @@
-import pandas as pd
-from geopy.distance import geodesic
+import os
+import sys
 import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_pipeline'))
+from cctv_dedup import clean_coordinates, deduplicate
+
+
+def standardize_cctv(df, source):
+    """
+    Maps a raw CCTV frame to the standard structure (id, source, lat, lng, type, stats),
+    dropping rows without usable coordinates.
+    Mapping columns (Mock logic - replace with actual column names)
+    """
+    lat, lng, valid = clean_coordinates(df, 'lat', 'lon')  # Assuming 'lon' in source
+    raw = df[valid]
+
+    def column(name, default):
+        if name in raw.columns:
+            return raw[name].to_numpy()
+        return [default] * len(raw)
+
+    return pd.DataFrame({
+        'id': [f"TN_{source}_{v}" for v in column('id', 'N/A')],
+        'source': source,
+        'lat': lat[valid],
+        'lng': lng[valid],
+        'type': column('purpose', 'Unknown'),  # e.g., '방범용'
+        'stats': column('pixel_count', None),  # Example extra attribute for update logic
+    })
+
 
 def merge_and_deduplicate_cctv(seoul_csv, national_csv, output_csv):
     """
@@ -23,103 +52,27 @@ def merge_and_deduplicate_cctv(seoul_csv, national_csv, output_csv):
         return
 
     # 2. Preprocess & Standardize
-    # Define Standard Structure: id, source, lat, lng, type
-    
-    # Process Master Data (Seoul)
-    # Mapping columns (Mock logic - replace with actual column names)
-    master_data = []
+    # Define Standard Structure: id, source, lat, lng, type, stats
     print(f"Processing Master Data (Seoul): {len(seoul_df)} rows")
-    
-    for _, row in seoul_df.iterrows():
-        # Clean/Validate coordinates
-        try:
-            lat = float(row.get('lat', 0))
-            lng = float(row.get('lon', 0)) # Assuming 'lon' in source
-            if lat == 0 or lng == 0: continue
-            
-            master_data.append({
-                'id': f"TN_Seoul_{row.get('id', 'N/A')}",
-                'source': 'Seoul',
-                'lat': lat,
-                'lng': lng,
-                'type': row.get('purpose', 'Unknown'), # e.g., '방범용'
-                'stats': row.get('pixel_count', None) # Example extra attribute for update logic
-            })
-        except ValueError:
-            continue
+    master_df = standardize_cctv(seoul_df, 'Seoul')
 
     # 3. Spatial Deduplication Logic
-    # We maintain the result list which initially contains all Seoul data.
-    result_list = master_data.copy()
-    
+    # KD-Tree 기반 엔진 (data_pipeline/cctv_dedup.py) - EPSG:5179 미터 좌표에서 20m 반경 질의
     print(f"Processing Target Data (National): {len(national_df)} rows")
-    duplicates = 0
-    added = 0
-    updates = 0
-    
-    start_time = time.time()
-    
-    # Iterate National Data
-    for idx, row in national_df.iterrows():
-        if idx % 1000 == 0:
-            print(f"Processed {idx}/{len(national_df)}...")
+    national_std = standardize_cctv(national_df, 'National')
 
-        try:
-            lat = float(row.get('lat', 0))
-            lng = float(row.get('lon', 0))
-            if lat == 0 or lng == 0: continue
-            
-            target_point = (lat, lng)
-            is_duplicate = False
-            
-            # --- Key Logic: Check against Result List ---
-            # NOTE: For very large datasets (10k+), this O(N*M) loop is inefficient.
-            # In production, use sklearn.neighbors.BallTree or cKDTree for O(logN) queries.
-            # Here keeping strictly to the requested logic (Iterate & Compare).
-            
-            for existing_item in result_list:
-                existing_point = (existing_item['lat'], existing_item['lng'])
-                
-                # Calculate Distance (meters)
-                distance = geodesic(target_point, existing_point).meters
-                
-                if distance <= 20: # 20m Radius
-                    is_duplicate = True
-                    
-                    # Update Logic: If existing item is missing info that target has
-                    if not existing_item['stats'] and row.get('pixel_count'):
-                        existing_item['stats'] = row.get('pixel_count')
-                        updates += 1
-                        
-                    break # Stop checking, it's a duplicate
-            
-            if not is_duplicate:
-                # Add as new unique point
-                result_list.append({
-                    'id': f"TN_National_{row.get('id', 'N/A')}",
-                    'source': 'National',
-                    'lat': lat,
-                    'lng': lng,
-                    'type': row.get('purpose', 'Unknown'),
-                    'stats': row.get('pixel_count', None)
-                })
-                added += 1
-            else:
-                duplicates += 1
-                
-        except ValueError:
-            continue
+    start_time = time.time()
+    result_df, counters = deduplicate(master_df, national_std, radius=20)
 
     # 4. Final Output
     print(f"\nMerging Compelted in {time.time() - start_time:.2f}s")
-    print(f"Initial Master: {len(master_data)}")
-    print(f"National Added: {added}")
-    print(f"Duplicates Dropped: {duplicates}")
-    print(f"Attributes Updated: {updates}")
-    print(f"Final Count: {len(result_list)}")
+    print(f"Initial Master: {len(master_df)}")
+    print(f"National Added: {counters['added']}")
+    print(f"Duplicates Dropped: {counters['duplicates']}")
+    print(f"Attributes Updated: {counters['updates']}")
+    print(f"Final Count: {len(result_df)}")
 
-    final_df = pd.DataFrame(result_list)
-    final_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    result_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
     print(f"Saved to {output_csv}")
 
 # --- Execution Block (Mock Data Generation if run directly) ---
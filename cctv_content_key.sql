@@ -0,0 +1,15 @@
+-- upload_cctv.py 증분 동기화용 content_key 컬럼 (upsert on_conflict / delete 기준)
+-- Supabase SQL Editor 에서 upload_cctv.py 를 처음 실행하기 전에 한 번 실행하세요.
+-- 여러 번 실행해도 안전합니다.
+
+ALTER TABLE cctv ADD COLUMN IF NOT EXISTS content_key text;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'cctv'::regclass AND conname = 'cctv_content_key_key'
+    ) THEN
+        ALTER TABLE cctv ADD CONSTRAINT cctv_content_key_key UNIQUE (content_key);
+    END IF;
+END $$;
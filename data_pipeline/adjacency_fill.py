@@ -0,0 +1,129 @@
+"""
+Adjacency-Graph Interpolation for Missing Indicators
+Project: Tenant Note - Safety Grade Analysis
+
+PROJECT_CONTEXT 2.A-3: 데이터가 없는 행정동은 0점 처리하지 않고 '인접 행정동 평균값'으로 보간.
+
+- 행정동 폴리곤의 인접 관계 (맞닿거나 ADJACENCY_DISTANCE_M 이내) 를 STRtree 한 번으로 구해
+  scipy 희소 행렬(CSR)로 만들고 data/derived/adjacency 에 캐시 (경계 데이터가 바뀌면 다시 생성)
+- 보간: 모든 지표 컬럼을 한 행렬로 묶어 A @ 값 / A @ 관측여부 (희소 행렬-벡터 곱) 로
+  "값이 있는 이웃의 평균" 을 구하고, 채워진 행을 다시 관측값으로 보고 반복 (이웃의 이웃까지 전파)
+- 끝까지 이웃 값이 없는 행 (섬 등) 은 컬럼 전체 평균으로 채움
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import shapely
+from scipy import sparse
+from schema_config import CRS_ANALYSIS
+
+ADJACENCY_CACHE_DIR = os.path.join(os.getcwd(), 'data', 'derived', 'adjacency')
+ADJACENCY_DISTANCE_M = 50  # 경계 데이터의 미세한 틈(sliver) 도 이웃으로 인정
+MAX_FILL_ITER = 20
+
+
+def build_adjacency(geometries, distance=ADJACENCY_DISTANCE_M):
+    """
+    Symmetric CSR adjacency matrix (n x n, no self loops) of polygons that touch
+    or lie within `distance` of each other (geometries in a metric CRS).
+    """
+    geoms = np.asarray(geometries, dtype=object)
+    tree = shapely.STRtree(geoms)
+    if distance > 0:
+        left, right = tree.query(geoms, predicate='dwithin', distance=distance)
+    else:
+        left, right = tree.query(geoms, predicate='intersects')
+    keep = left != right
+    left, right = left[keep], right[keep]
+    n = len(geoms)
+    adjacency = sparse.csr_matrix((np.ones(len(left), dtype=np.float64), (left, right)), shape=(n, n))
+    # 대칭 보장 + 중복 쌍 제거
+    adjacency = ((adjacency + adjacency.T) > 0).astype(np.float64)
+    return adjacency.tocsr()
+
+
+def _adjacency_key(keys, geoms, distance):
+    h = hashlib.sha1(f"distance={distance}".encode())
+    h.update(json.dumps([str(k) for k in keys]).encode())
+    for wkb in shapely.to_wkb(geoms):
+        h.update(wkb)
+    return h.hexdigest()[:16]
+
+
+def load_adjacency(gdf, key_col='ADM_CD', distance=ADJACENCY_DISTANCE_M, cache_dir=ADJACENCY_CACHE_DIR):
+    """
+    Adjacency matrix of gdf rows (row order = gdf order), cached on disk by the
+    boundary content: the STRtree pass only runs when the boundaries change.
+    """
+    gdf_metric = gdf.to_crs(CRS_ANALYSIS) if gdf.crs is not None and gdf.crs != CRS_ANALYSIS else gdf
+    geoms = np.asarray(gdf_metric.geometry.values, dtype=object)
+    key = _adjacency_key(gdf[key_col].tolist(), geoms, distance)
+    path = os.path.join(cache_dir, f"adjacency-{key}.npz")
+    if os.path.exists(path):
+        return sparse.load_npz(path).tocsr()
+
+    print(f"   - Building adjacency graph ({len(geoms)} polygons, {distance}m)...")
+    adjacency = build_adjacency(geoms, distance)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 스레드/프로세스마다 다른 임시 파일 (동시에 빌드해도 서로 덮어쓰지 않도록)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp.npz')
+    os.close(fd)
+    try:
+        sparse.save_npz(tmp, adjacency)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return adjacency
+
+
+def fill_from_neighbours(values, adjacency, max_iter=MAX_FILL_ITER):
+    """
+    values: (n,) or (n, k) float array with NaN for missing entries.
+    Each round fills every missing entry that has observed neighbours with their mean
+    (one sparse mat-vec for sums, one for counts, all columns at once); filled entries
+    count as observed in the next round. Leftovers get the column mean.
+    Returns (filled copy, number of entries filled from neighbours).
+    """
+    values = np.array(values, dtype=float)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+    known = ~np.isnan(values)
+    filled_count = 0
+
+    for _ in range(max_iter):
+        missing = ~known
+        if not missing.any():
+            break
+        sums = adjacency @ np.where(known, values, 0.0)
+        counts = adjacency @ known.astype(float)
+        fillable = missing & (counts > 0)
+        if not fillable.any():
+            break
+        values[fillable] = sums[fillable] / counts[fillable]
+        known |= fillable
+        filled_count += int(fillable.sum())
+
+    # 이웃으로도 채울 수 없는 행 -> 컬럼 평균
+    leftover = ~known
+    if leftover.any():
+        with np.errstate(invalid='ignore'):
+            col_mean = np.nanmean(np.where(known, values, np.nan), axis=0)
+        values[leftover] = np.broadcast_to(col_mean, values.shape)[leftover]
+
+    return (values[:, 0] if squeeze else values), filled_count
+
+
+def fill_frame(df, adjacency, columns):
+    """Copy of df with NaN in `columns` interpolated from neighbouring rows (df rows = adjacency rows)"""
+    out = df.copy()
+    filled, count = fill_from_neighbours(out[columns].to_numpy(dtype=float), adjacency)
+    out[columns] = filled
+    if count:
+        print(f"   - Filled {count} missing values from neighbouring districts ({', '.join(columns)})")
+    return out
@@ -1,34 +1,32 @@
+import argparse
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-from shapely.geometry import Polygon
 from load_boundaries import process_boundaries
 from generate_mock_points import generate_mock_dataset
+from grid_lattice import grid_for_geometries, create_grid_gdf, point_cell_ids
+from hierarchical_grid import GRID_LEVELS, build_grid_hierarchy
+from adjacency_fill import fill_frame, load_adjacency
+from district_locator import load_locator
+from intermediate_store import has_dataset, read_dataset
 from schema_config import CRS_ANALYSIS, BuildingSchema, LicenseSchema, CCTVSchema
 
+# 행정동 지표: 점이 없으면 0 인 개수 지표 / 값이 없으면 인접 행정동 평균으로 보간할 비율·평균 지표
+COUNT_COLUMNS = ['cctv_count', 'infra_count', 'harmful_count', 'bld_count']
+RATE_COLUMNS = ['viol_rate', 'avg_age']
+# analyze_slope 의 행정동 경사 지표 (과락 규칙 steep_slope 가 steep_ratio 를 사용)
+SLOPE_DATASET = 'seoul_slope'
+SLOPE_COLUMNS = ['mean_slope', 'steep_ratio']
+
 def create_grid(polygon, cell_size=100):
     """
     Creates a grid of square polygons over a given polygon.
     cell_size: size in meters (since we are using EPSG:5179)
+    Cells are snapped to the global lattice (grid_lattice), so 'cell_id' is the same
+    for the same cell whichever district it was built for.
     """
-    min_x, min_y, max_x, max_y = polygon.bounds
-    x_coords = np.arange(min_x, max_x, cell_size)
-    y_coords = np.arange(min_y, max_y, cell_size)
-    
-    grid_cells = []
-    for x in x_coords:
-        for y in y_coords:
-            cell = Polygon([
-                (x, y),
-                (x + cell_size, y),
-                (x + cell_size, y + cell_size),
-                (x, y + cell_size)
-            ])
-            # Keep cell if it intersects with the original polygon
-            if cell.intersects(polygon):
-                grid_cells.append(cell)
-                
-    return gpd.GeoDataFrame(geometry=grid_cells, crs=CRS_ANALYSIS)
+    _, cell_ids = grid_for_geometries([polygon], cell_size)
+    return create_grid_gdf(cell_ids, cell_size)
 
 def calculate_building_age(date_str):
     """Simple helper to calc mock age"""
@@ -38,25 +36,111 @@ def calculate_building_age(date_str):
     except:
         return 0
 
-def run_aggregation():
-    # 1. Load Data
-    print("1. Loading & Generating Data...")
-    boundaries = process_boundaries() # ADM_CD, ADM_NM, geometry, is_target_zone
-    cctv, infra, bld = generate_mock_dataset()
+def aggregate_grid(zones, cctv_joined, bld_joined, cell_size=100):
+    """
+    Per (ADM_NM, cell) statistics for every lattice cell intersecting the zones.
+    cctv_joined / bld_joined are points already joined to their district (ADM_NM column),
+    so each point is binned by floor-division of its coordinates and reduced with groupby.
+    Returns a GeoDataFrame (ADM_NM, cell_id, cctv_count, viol_rate, avg_age, geometry) or None.
+    """
+    zone_idx, cell_ids = grid_for_geometries(zones.geometry.values, cell_size)
+    if len(cell_ids) == 0:
+        return None
+    grid = create_grid_gdf(cell_ids, cell_size)
+    grid.insert(0, 'ADM_NM', zones['ADM_NM'].to_numpy()[zone_idx])
+    keys = ['ADM_NM', 'cell_id']
+
+    cctv_cells = pd.DataFrame({
+        'ADM_NM': cctv_joined['ADM_NM'].to_numpy(),
+        'cell_id': point_cell_ids(cctv_joined.geometry.x, cctv_joined.geometry.y, cell_size),
+    })
+    c_counts = cctv_cells.groupby(keys).size().rename('cctv_count')
+
+    bld_cells = pd.DataFrame({
+        'ADM_NM': bld_joined['ADM_NM'].to_numpy(),
+        'cell_id': point_cell_ids(bld_joined.geometry.x, bld_joined.geometry.y, cell_size),
+        'is_viol': (bld_joined[BuildingSchema.VIOL_BLD_YN] == 'Y').to_numpy(),
+        'age': bld_joined['age'].to_numpy(),
+    })
+    b_stats = bld_cells.groupby(keys).agg(viol_rate=('is_viol', 'mean'), avg_age=('age', 'mean'))
+
+    # Map stats back to grid (점이 없는 칸은 0)
+    stats = pd.concat([c_counts, b_stats], axis=1)
+    grid = grid.join(stats, on=keys)
+    grid[['cctv_count', 'viol_rate', 'avg_age']] = grid[['cctv_count', 'viol_rate', 'avg_age']].fillna(0)
+    return grid
+
+def fill_district_stats(stats, boundaries):
+    """
+    Every district of boundaries gets a row: missing counts are 0, missing rates/means
+    are interpolated from neighbouring districts (adjacency_fill) instead of 0.
+    """
+    rows = stats.reindex(boundaries['ADM_NM'].to_numpy())
+    rows[COUNT_COLUMNS] = rows[COUNT_COLUMNS].fillna(0).astype(np.int64)
+    rate_columns = RATE_COLUMNS + [c for c in SLOPE_COLUMNS if c in rows.columns]
+    rows = fill_frame(rows, load_adjacency(boundaries), rate_columns)
+    return rows[~rows.index.duplicated()].sort_index()
+
+def load_slope_stats(boundaries):
+    """
+    mean_slope / steep_ratio per ADM_NM from the analyze_slope table (matched on ADM_CD),
+    or None if analyze_slope has not been run.
+    """
+    if not has_dataset(SLOPE_DATASET):
+        print("   - No slope table (run analyze_slope.py): steep_slope penalty inactive")
+        return None
+    slope = read_dataset(SLOPE_DATASET, columns=['adm_cd'] + SLOPE_COLUMNS)
+    slope['adm_cd'] = slope['adm_cd'].astype(str)
+    names = pd.DataFrame({'ADM_CD': boundaries['ADM_CD'].astype(str).to_numpy(),
+                          'ADM_NM': boundaries['ADM_NM'].to_numpy()}).drop_duplicates('ADM_NM')
+    return names.merge(slope, left_on='ADM_CD', right_on='adm_cd').set_index('ADM_NM')[SLOPE_COLUMNS]
+
+def join_points(boundaries, points):
+    """Cleans the (cctv, infra, bld) points and joins each to its district (ADM_NM)"""
+    cctv, infra, bld = points
     
     # 2. Pre-processing (Clean Data)
     print("2. Pre-processing...")
     # Filter only OPEN businesses (Already done in generation mostly, but strict check)
     infra = infra[infra[LicenseSchema.TRD_STATE_GBN] == '01'].copy()
     
-    # Calc building age
+    # Calc building age (다른 단계와 공유하는 입력이므로 복사본에 추가)
+    bld = bld.copy()
     bld['age'] = bld[BuildingSchema.USE_APR_DAY].apply(calculate_building_age)
     
     # 3. Spatial Join (Points -> ADM)
+    # 경계 레이어로 한 번 만든 locator (디스크 캐시) 를 세 데이터셋이 공유
     print("3. Spatial Join (Global)...")
-    cctv_joined = gpd.sjoin(cctv, boundaries, how='inner', predicate='within')
-    infra_joined = gpd.sjoin(infra, boundaries, how='inner', predicate='within')
-    bld_joined = gpd.sjoin(bld, boundaries, how='inner', predicate='within')
+    locator = load_locator(boundaries)
+    attrs = boundaries.drop(columns=boundaries.geometry.name)
+    return tuple(locate_join(points, locator, attrs) for points in (cctv, infra, bld))
+
+def locate_join(points, locator, attrs):
+    """
+    Inner join of points to their district, like gpd.sjoin(predicate='within'):
+    rows outside every district are dropped, the district's attributes are added.
+    """
+    idx = locator.locate_points(points)
+    inside = idx >= 0
+    joined = points[inside].copy()
+    matched = attrs.iloc[idx[inside]]
+    joined['index_right'] = matched.index.to_numpy()
+    for col in matched.columns:
+        joined[col] = matched[col].to_numpy()
+    return joined
+
+def run_aggregation(grid_all_zones=False, boundaries=None, points=None, slope=None):
+    """
+    boundaries / points (cctv, infra, bld) / slope (load_slope_stats) 는 pipeline_dag 에서
+    넘겨받고, 직접 실행하면 새로 로드/생성한다.
+    """
+    # 1. Load Data
+    print("1. Loading & Generating Data...")
+    if boundaries is None:
+        boundaries = process_boundaries() # ADM_CD, ADM_NM, geometry, is_target_zone
+    if points is None:
+        points = generate_mock_dataset(boundaries)
+    cctv_joined, infra_joined, bld_joined = join_points(boundaries, points)
     
     # 4. Global Aggregation (By ADM_CD/ADM_NM)
     print("4. Aggregating by Admin District...")
@@ -81,76 +165,51 @@ def run_aggregation():
         'age': 'mean'
     }).rename(columns={'geometry': 'bld_count', 'is_viol': 'viol_rate', 'age': 'avg_age'})
     
+    # Slope (경사 과락 규칙용, analyze_slope 결과가 있을 때만)
+    if slope is None:
+        slope = load_slope_stats(boundaries)
+
     # Merge all results
-    final_stats = pd.concat([agg_cctv, agg_infra, agg_bld], axis=1).fillna(0)
+    final_stats = pd.concat([agg_cctv, agg_infra, agg_bld] + ([slope] if slope is not None else []), axis=1)
+    # 0점 처리 방지: 비율/평균 지표의 결측은 인접 행정동 평균으로 보간
+    final_stats = fill_district_stats(final_stats, boundaries)
     print("\n[Admin District Aggregation Result]")
     print(final_stats)
 
-    # 5. Target Zone Grid Analysis
-    print("\n5. Target Zone Grid Analysis (100m)...")
-    target_zones = boundaries[boundaries['is_target_zone']]
-    
-    all_grid_stats = []
-    
-    for idx, row in target_zones.iterrows():
-        adm_nm = row['ADM_NM']
-        print(f"   -> Analyzing Grid for {adm_nm}...")
-        
-        # Create Grid
-        grid = create_grid(row['geometry'], cell_size=100)
-        grid['ADM_NM'] = adm_nm
-        
-        # Spatial Join Grid -> Points
-        # We join Points to Grid this time
-        # Note: Using previously generated points limited to this polygon for efficiency? 
-        # Or just global join. Global join is safer but slower. 
-        # Using global points intersecting the specific Admin Polygon first to speed up.
-        
-        # Filter points for this admin area first to speed up sjoin
-        local_cctv = cctv[cctv.geometry.within(row['geometry'])]
-        local_bld = bld[bld.geometry.within(row['geometry'])]
-        
-        # Join
-        grid_cctv = gpd.sjoin(local_cctv, grid, how='inner', predicate='within')
-        grid_bld = gpd.sjoin(local_bld, grid, how='inner', predicate='within')
-        
-        # Aggregation per Grid Cell (using index_right)
-        # Note: grid index is usually preserved in sjoin on left df if we do grid.sjoin(points)?
-        # Let's do grid.sjoin(points) is usually right way if we want to keep grid geometry? 
-        # Actually gpd.sjoin(left_df, right_df) keeps geometry of left.
-        # So gpd.sjoin(grid, points) -> keeps grid geometry.
-        
-        # Count CCTV in Grid
-        grid_cctv_counts = gpd.sjoin(grid, local_cctv, how='left', predicate='contains') \
-                              .groupby(level=0).size().rename('cctv_count')
-        # Fix: groupby size counts NaNs as 1 if not careful? 
-        # Better: use count of a specific column.
-        # But left join creates rows. If no match, index_right is NaN.
-        
-        # Let's use a simpler approach for stats: iterate is too slow for real data, but for mock okay.
-        # Vectorized approach:
-        join_c = gpd.sjoin(local_cctv, grid, how='inner', predicate='within')
-        c_counts = join_c.groupby('index_right').size()
-        
-        join_b = gpd.sjoin(local_bld, grid, how='inner', predicate='within')
-        join_b['is_viol'] = join_b[BuildingSchema.VIOL_BLD_YN] == 'Y'
-        b_stats = join_b.groupby('index_right').agg({'is_viol': 'mean', 'age': 'mean'})
-        
-        # Map stats back to grid
-        grid['cctv_count'] = grid.index.map(c_counts).fillna(0)
-        grid['viol_rate'] = grid.index.map(b_stats['is_viol']).fillna(0)
-        grid['avg_age'] = grid.index.map(b_stats['age']).fillna(0)
-        
-        all_grid_stats.append(grid)
-        
-    if all_grid_stats:
-        final_grid_gdf = pd.concat(all_grid_stats)
+    # 5. Grid Analysis (100m)
+    # 격자가 EPSG:5179 lattice 에 정렬되어 있으므로 점 -> 칸 은 좌표 나눗셈으로 바로 구함 (sjoin 불필요)
+    zones = boundaries if grid_all_zones else boundaries[boundaries['is_target_zone']]
+    print(f"\n5. Grid Analysis (100m, {len(zones)} zones)...")
+    final_grid_gdf = aggregate_grid(zones, cctv_joined, bld_joined, cell_size=100)
+    if final_grid_gdf is not None:
         print(f"   -> Generated {len(final_grid_gdf)} grid cells.")
         print(final_grid_gdf[['ADM_NM', 'cctv_count', 'viol_rate', 'avg_age']].head())
         # Ideally save this to geojson
         # final_grid_gdf.to_file("data_pipeline/output_grid.geojson", driver='GeoJSON')
-        
-    return final_stats, final_grid_gdf if all_grid_stats else None
+
+    return final_stats, final_grid_gdf
+
+def run_grid_hierarchy(boundaries=None, points=None, levels=GRID_LEVELS):
+    """
+    Whole-city multi-resolution grid (hierarchical_grid): points are joined and binned
+    once at the finest level, coarser levels are rolled up from it.
+    """
+    print("1. Loading & Generating Data...")
+    if boundaries is None:
+        boundaries = process_boundaries()
+    if points is None:
+        points = generate_mock_dataset(boundaries)
+    cctv_joined, infra_joined, bld_joined = join_points(boundaries, points)
+
+    print(f"4. Building Grid Hierarchy ({'/'.join(str(s) for s in sorted(levels))}m, {len(boundaries)} zones)...")
+    return build_grid_hierarchy(boundaries, cctv_joined, infra_joined, bld_joined, levels=levels)
 
 if __name__ == "__main__":
-    run_aggregation()
+    parser = argparse.ArgumentParser(description="Admin district & grid aggregation")
+    parser.add_argument('--all-zones', action='store_true', help="build grid stats for every district, not only target zones")
+    parser.add_argument('--hierarchy', action='store_true', help="build the whole-city 50/100/250/500m grid hierarchy")
+    args = parser.parse_args()
+    if args.hierarchy:
+        print(run_grid_hierarchy().groupby('cell_size').size())
+    else:
+        run_aggregation(grid_all_zones=args.all_zones)
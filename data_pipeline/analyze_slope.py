@@ -1,12 +1,22 @@
+import argparse
+import functools
+import hashlib
+import json
 import os
 import glob
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import geopandas as gpd
 import rasterio
 from rasterio.merge import merge
-from rasterio.warp import calculate_default_transform, reproject, Resampling
-from rasterstats import zonal_stats
+from xml.sax.saxutils import escape
+from rasterio.transform import Affine
+from rasterio.warp import calculate_default_transform
+from rasterio.windows import Window
+from pyproj import Transformer
+from zonal_engine import zonal_stats_by_label
+from intermediate_store import read_shapefile_cached, write_dataset
 from shapely.geometry import box
 
 # Configuration
@@ -15,6 +25,33 @@ DEM_DIR = os.path.join(DATA_DIR, 'dem')
 SHP_DIR = os.path.join(DATA_DIR, 'shp')
 DERIVED_DIR = os.path.join(DATA_DIR, 'derived')
 RESULT_CSV = os.path.join(DERIVED_DIR, 'seoul_slope_complete.csv')
+RASTER_CACHE_DIR = os.path.join(DERIVED_DIR, 'raster_cache')
+LABEL_CACHE_DIR = os.path.join(DERIVED_DIR, 'zonal_cache')
+SLOPE_DATASET = 'seoul_slope'
+
+# 서울 행정동 (ADM_CD 11...) 만 읽는 Parquet 행 필터
+SEOUL_ADM_FILTER = [('ADM_CD', '>=', '11'), ('ADM_CD', '<', '12')]
+
+# 경사 주의 기준 (PROJECT_CONTEXT 2.C)
+STEEP_SLOPE_DEG = 10
+
+# numpy dtype -> GDAL VRT dataType
+VRT_DATA_TYPES = {
+    'uint8': 'Byte', 'int16': 'Int16', 'uint16': 'UInt16', 'int32': 'Int32',
+    'uint32': 'UInt32', 'float32': 'Float32', 'float64': 'Float64',
+}
+
+# DEM 재투영 방식 (캐시 키에 포함). GDAL warp 는 청크마다 커널 배율을 다시 잡아서
+# 같은 픽셀도 블록 배치에 따라 값이 달라지므로, 픽셀 중심 정확 변환 + bilinear 를 직접 계산
+RESAMPLING = 'bilinear'
+# 재투영 좌표: COORD_STEP 픽셀마다 정확 변환, 사이는 bilinear (TM -> TM 에서 오차 1e-6 px 미만)
+COORD_STEP = 16
+
+# 경사 계산 로직이 바뀌면 올려서 캐시 무효화
+SLOPE_VERSION = 2
+
+# Tiled mode block size (pixels, multiple of the 256px GeoTIFF tile)
+BLOCK_SIZE = 1024
 
 # Target CRS
 TARGET_CRS = 'EPSG:5179'
@@ -57,6 +94,452 @@ def calculate_slope(dem_array, transform, nodata):
     
     return slope_deg
 
+def load_seoul_districts(reproject_vector=True):
+    """Step 2: 행정동 경계 로드 후 서울(11...)만 필터, 필요하면 TARGET_CRS 로 변환"""
+    print("Step 2: Loading and Filtering Shapefile...")
+    shp_path = get_shapefile_path()
+    # CP949 or EUC-KR. 처음 한 번만 파싱하고 이후에는 GeoParquet 사본에서 서울(11...) 행만 읽음
+    seoul_gdf = read_shapefile_cached(shp_path, filters=SEOUL_ADM_FILTER)
+    print(f"Filtered {len(seoul_gdf)} Seoul districts.")
+
+    if reproject_vector and seoul_gdf.crs != TARGET_CRS:
+        print(f"Reprojecting Vector from {seoul_gdf.crs} to {TARGET_CRS}")
+        seoul_gdf = seoul_gdf.to_crs(TARGET_CRS)
+    return seoul_gdf
+
+def save_results(seoul_gdf):
+    """Step 6: adm_cd, adm_nm, mean_slope, steep_ratio CSV 저장"""
+    print("Step 6: Saving Results...")
+    # Select columns
+    # SHP likely produces lowercase column names on read sometimes? Or keep original.
+    # Check column names. usually ADM_CD, ADM_NM.
+    
+    # Try to find correct columns case-insensitive
+    cols = seoul_gdf.columns
+    adm_cd_col = next((c for c in cols if c.upper() == 'ADM_CD'), 'ADM_CD')
+    adm_nm_col = next((c for c in cols if c.upper() == 'ADM_NM'), 'ADM_NM')
+    
+    output_df = seoul_gdf[[adm_cd_col, adm_nm_col, 'mean_slope', 'steep_ratio']].copy()
+    output_df.columns = ['adm_cd', 'adm_nm', 'mean_slope', 'steep_ratio']
+    
+    output_df.to_csv(RESULT_CSV, index=False, encoding='utf-8-sig')
+    # merge_slope_data / visualize_slope 는 Parquet 지표 테이블을 읽음 (CSV 는 사람이 보는 용도)
+    output_df['adm_cd'] = output_df['adm_cd'].astype(str)
+    write_dataset(SLOPE_DATASET, output_df)
+    print(f"Done! Saved to {RESULT_CSV}")
+
+# ---------------------------------------------------------
+# Tiled mode: 블록 단위 처리 (메모리 사용량 = 블록 크기에 비례)
+# ---------------------------------------------------------
+# 1. Virtual mosaic: 원본 타일 헤더만 읽어서 GDAL VRT 로 모자이크 (픽셀 복사 없음)
+# 2. 출력 격자(EPSG:5179)를 블록으로 나누고, 블록마다 VRT 에서 필요한 부분만 reproject
+#    (픽셀 중심 정확 변환 + bilinear -> 픽셀 값이 블록 배치와 무관, --in-memory 경로도 같은 resampler)
+# 3. 블록 + 1픽셀 halo 로 경사 계산 -> 블록 경계에서도 전체 배열 계산과 같은 이웃 픽셀 사용
+# 4. 결과는 타일 GeoTIFF 에 블록 단위로 기록, zonal stats 는 파일에서 폴리곤 창만 읽음
+
+def build_virtual_mosaic(dem_files, vrt_path):
+    """
+    Writes a GDAL VRT that mosaics the DEM tiles without copying pixels.
+    Only tile headers are read. Like merge(), the first tile wins where tiles overlap.
+    Returns the mosaic profile dict (crs, transform, width, height, nodata, dtype).
+    """
+    tiles = []
+    for fp in dem_files:
+        with rasterio.open(fp) as src:
+            tiles.append((fp, src.bounds, src.width, src.height, src.res, src.crs, src.nodata, src.dtypes[0]))
+
+    _, _, _, _, (res_x, res_y), crs, nodata, dtype = tiles[0]
+    left = min(t[1].left for t in tiles)
+    bottom = min(t[1].bottom for t in tiles)
+    right = max(t[1].right for t in tiles)
+    top = max(t[1].top for t in tiles)
+
+    # rasterio.merge 와 같은 방식으로 모자이크 크기 결정
+    width = int(round((right - left) / res_x))
+    height = int(round((top - bottom) / res_y))
+    transform = Affine.translation(left, top) * Affine.scale(res_x, -res_y)
+    if nodata is None:
+        nodata = -9999
+
+    data_type = VRT_DATA_TYPES.get(dtype, 'Float32')
+    sources = []
+    # VRT 는 뒤에 오는 source 가 위에 그려지므로, 첫 타일이 이기도록 역순으로 기록
+    for fp, b, w, h, _, _, tile_nodata, _ in reversed(tiles):
+        x_off = int(round((b.left - left) / res_x))
+        y_off = int(round((top - b.top) / res_y))
+        src_nodata = tile_nodata if tile_nodata is not None else nodata
+        sources.append(f"""    <ComplexSource>
+      <SourceFilename relativeToVRT="0">{escape(os.path.abspath(fp))}</SourceFilename>
+      <SourceBand>1</SourceBand>
+      <SrcRect xOff="0" yOff="0" xSize="{w}" ySize="{h}" />
+      <DstRect xOff="{x_off}" yOff="{y_off}" xSize="{w}" ySize="{h}" />
+      <NODATA>{src_nodata}</NODATA>
+    </ComplexSource>""")
+
+    vrt = f"""<VRTDataset rasterXSize="{width}" rasterYSize="{height}">
+  <SRS>{escape(crs.to_wkt())}</SRS>
+  <GeoTransform>{', '.join(repr(v) for v in transform.to_gdal())}</GeoTransform>
+  <VRTRasterBand dataType="{data_type}" band="1">
+    <NoDataValue>{nodata}</NoDataValue>
+{chr(10).join(sources)}
+  </VRTRasterBand>
+</VRTDataset>
+"""
+    with open(vrt_path, 'w', encoding='utf-8') as f:
+        f.write(vrt)
+
+    return {
+        'crs': crs,
+        'transform': transform,
+        'width': width,
+        'height': height,
+        'nodata': nodata,
+        'dtype': dtype,
+    }
+
+def compute_target_grid(mosaic, dst_crs=TARGET_CRS):
+    """
+    Output grid of the mosaic in dst_crs, same as calculate_default_transform() on the merged array.
+    Returns dict(transform, width, height, crs, nodata, dtype).
+    """
+    grid = dict(mosaic, crs=dst_crs)
+    if mosaic['crs'] != dst_crs:
+        height, width = mosaic['height'], mosaic['width']
+        transform, width, height = calculate_default_transform(
+            mosaic['crs'], dst_crs, width, height,
+            *rasterio.transform.array_bounds(height, width, mosaic['transform'])
+        )
+        grid.update({'transform': transform, 'width': width, 'height': height})
+    return grid
+
+def iter_blocks(width, height, block_size):
+    """Yields Windows covering the grid in row-major order"""
+    for row_off in range(0, height, block_size):
+        for col_off in range(0, width, block_size):
+            yield Window(col_off, row_off,
+                         min(block_size, width - col_off),
+                         min(block_size, height - row_off))
+
+@functools.lru_cache(maxsize=8)
+def _transformer(src_crs, dst_crs):
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+def source_pixel_coords(grid, window, src_crs, src_transform, step=None):
+    """
+    Fractional source pixel coordinates (cols, rows) of the centres of the grid pixels in
+    window. The CRS transform is exact at every step-th pixel of the whole grid and
+    bilinear in between. The control points are anchored to the grid, not the window,
+    so a pixel gets the same coordinates whichever window it is part of.
+    """
+    step = COORD_STEP if step is None else step
+    rows = np.arange(window.row_off, window.row_off + window.height)
+    cols = np.arange(window.col_off, window.col_off + window.width)
+    if src_crs == grid['crs']:
+        x, y = grid['transform'] * np.meshgrid(cols + 0.5, rows + 0.5)
+        return ~src_transform * (x, y)
+
+    # 창을 덮는 제어점 (전체 격자 기준 step 간격)
+    r0, c0 = rows[0] // step, cols[0] // step
+    ctrl_rows = np.arange(r0, rows[-1] // step + 2) * step + 0.5
+    ctrl_cols = np.arange(c0, cols[-1] // step + 2) * step + 0.5
+    x, y = grid['transform'] * np.meshgrid(ctrl_cols, ctrl_rows)
+    x, y = _transformer(str(grid['crs']), str(src_crs)).transform(x, y)
+    ctrl = ~src_transform * (np.asarray(x), np.asarray(y))
+
+    ri, ty = rows // step - r0, (rows % step / step)[:, None]
+    ci, tx = cols // step - c0, (cols % step / step)[None, :]
+    out = []
+    for q in ctrl:
+        top = q[ri][:, ci] * (1 - tx) + q[ri][:, ci + 1] * tx
+        bottom = q[ri + 1][:, ci] * (1 - tx) + q[ri + 1][:, ci + 1] * tx
+        out.append(top * (1 - ty) + bottom * ty)
+    return tuple(out)
+
+def bilinear_sample(source, row0, col0, cols, rows, nodata):
+    """
+    Bilinear interpolation at fractional source pixel coordinates (pixel centres at .5).
+    source holds the source raster from pixel (row0, col0) on. Neighbours that are nodata
+    or outside source get no weight (the others are renormalized); pixels without a valid
+    neighbour are nodata. The weights only depend on the absolute coordinates.
+    """
+    height, width = source.shape
+    # nodata 와 source 밖(1픽셀 테두리로 clip)은 NaN
+    padded = np.full((height + 2, width + 2), np.nan)
+    padded[1:-1, 1:-1] = source
+    if nodata is not None:
+        padded[padded == nodata] = np.nan
+
+    finite = np.isfinite(cols) & np.isfinite(rows)
+    v = np.where(finite, rows - 0.5, 0.0)
+    u = np.where(finite, cols - 0.5, 0.0)
+    i0 = np.floor(v)
+    j0 = np.floor(u)
+    fy = v - i0
+    fx = u - j0
+    i0 = i0.astype(np.int64) - row0 + 1
+    j0 = j0.astype(np.int64) - col0 + 1
+
+    total = np.zeros(u.shape)
+    weight = np.zeros(u.shape)
+    for di, dj, w in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                      (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+        value = padded[np.clip(i0 + di, 0, height + 1), np.clip(j0 + dj, 0, width + 1)]
+        valid = ~np.isnan(value)
+        total += np.where(valid, value * w, 0.0)
+        weight += np.where(valid, w, 0.0)
+    weight[~finite] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight > 0, total / weight, nodata if nodata is not None else np.nan)
+
+def read_dem_window(vrt_path, grid, window, strip_rows=128):
+    """
+    Reads one window of the grid from the virtual mosaic, resampled to grid['crs'].
+    Only the source pixels under the window (plus the 2 x 2 bilinear footprint) are read,
+    and the resampling runs strip_rows rows at a time to keep temporaries small.
+    Values do not depend on the block layout (see source_pixel_coords, bilinear_sample).
+    """
+    out = np.full((window.height, window.width), grid['nodata'], dtype=grid['dtype'])
+    with rasterio.open(vrt_path) as src:
+        # 연속 변환이므로 창의 네 변이 소스 범위를 결정 (+1 픽셀 여유)
+        edges = [Window(window.col_off, window.row_off, window.width, 1),
+                 Window(window.col_off, window.row_off + window.height - 1, window.width, 1),
+                 Window(window.col_off, window.row_off, 1, window.height),
+                 Window(window.col_off + window.width - 1, window.row_off, 1, window.height)]
+        cols, rows = (np.concatenate([c.ravel() for c in coords])
+                      for coords in zip(*(source_pixel_coords(grid, e, src.crs, src.transform) for e in edges)))
+        finite = np.isfinite(cols) & np.isfinite(rows)
+        if not finite.any():
+            return out
+        row0 = int(np.floor(rows[finite].min() - 0.5)) - 1
+        col0 = int(np.floor(cols[finite].min() - 0.5)) - 1
+        row1 = int(np.floor(rows[finite].max() - 0.5)) + 3
+        col1 = int(np.floor(cols[finite].max() - 0.5)) + 3
+        source = src.read(1, window=Window(col0, row0, col1 - col0, row1 - row0),
+                          boundless=True, fill_value=grid['nodata'])
+
+        for start in range(0, window.height, strip_rows):
+            height = min(strip_rows, window.height - start)
+            strip = Window(window.col_off, window.row_off + start, window.width, height)
+            cols, rows = source_pixel_coords(grid, strip, src.crs, src.transform)
+            out[start:start + height] = bilinear_sample(source, row0, col0, cols, rows, grid['nodata'])
+    return out
+
+def compute_block_slope(vrt_path, grid, window):
+    """
+    DEM and slope (float32, NaN = nodata) for one block. Slope is computed on the
+    block plus a one-pixel halo so np.gradient sees the same neighbours as on the
+    full array. At the outer edge of the grid there is no halo, so the one-sided
+    differences also match the full-array result. Together with read_dem_window
+    this makes the output independent of block_size.
+    """
+    row0 = max(0, window.row_off - 1)
+    col0 = max(0, window.col_off - 1)
+    row1 = min(grid['height'], window.row_off + window.height + 1)
+    col1 = min(grid['width'], window.col_off + window.width + 1)
+    halo = Window(col0, row0, col1 - col0, row1 - row0)
+
+    dem = read_dem_window(vrt_path, grid, halo)
+    slope = calculate_slope(dem, grid['transform'], grid['nodata'])
+    slope = np.ma.filled(np.ma.asarray(slope, dtype=np.float32), np.nan)
+
+    r = window.row_off - row0
+    c = window.col_off - col0
+    inner = (slice(r, r + window.height), slice(c, c + window.width))
+    return dem[inner], slope[inner]
+
+def _slope_block_task(task):
+    """
+    Process-pool worker: computes one block and writes it straight into the shared
+    memory-mapped outputs, so only the small task tuple crosses process boundaries.
+    """
+    vrt_path, grid, window, dem_npy, slope_npy = task
+    dem, slope = compute_block_slope(vrt_path, grid, window)
+    rows, cols = window.toslices()
+    for path, block in ((dem_npy, dem), (slope_npy, slope)):
+        out = np.load(path, mmap_mode='r+')
+        out[rows, cols] = block
+        out.flush()
+        del out
+    return window
+
+# ---------------------------------------------------------
+# Derived raster cache (data/derived/raster_cache/<key>/)
+# ---------------------------------------------------------
+# key = hash(DEM 타일 내용 + 처리 파라미터). 타일이 그대로면 mosaic/warp/slope 를 건너뛰고
+# dem_5179.npy, slope_5179.npy 를 memmap 으로 열어서 바로 zonal stats 로 간다.
+# meta.json 은 마지막에 기록 -> meta.json 이 있으면 완성된 캐시.
+
+def file_digest(path, memo):
+    """sha1 of the file content, memoized by (size, mtime) so unchanged tiles are not re-read"""
+    st = os.stat(path)
+    memo_key = os.path.abspath(path)
+    entry = memo.get(memo_key)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['sha1']
+
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b''):
+            h.update(chunk)
+    memo[memo_key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': h.hexdigest()}
+    return h.hexdigest()
+
+def raster_cache_key(dem_files):
+    """Content hash of the DEM tiles (in mosaic order) and the processing parameters"""
+    os.makedirs(RASTER_CACHE_DIR, exist_ok=True)
+    memo_path = os.path.join(RASTER_CACHE_DIR, 'file_digests.json')
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path, encoding='utf-8') as f:
+            memo = json.load(f)
+
+    h = hashlib.sha1()
+    for fp in dem_files:
+        h.update(file_digest(fp, memo).encode())
+    params = {
+        'crs': TARGET_CRS,
+        'resampling': RESAMPLING,
+        'coord_step': COORD_STEP,
+        'slope_version': SLOPE_VERSION,
+    }
+    h.update(json.dumps(params, sort_keys=True).encode())
+
+    with open(memo_path, 'w', encoding='utf-8') as f:
+        json.dump(memo, f)
+    return h.hexdigest()[:16]
+
+def load_cached_rasters(cache_dir):
+    """Returns (grid, dem memmap, slope memmap) if the cache entry is complete, else None"""
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    grid = dict(meta['grid'], transform=Affine(*meta['grid']['transform']))
+    dem = np.load(os.path.join(cache_dir, 'dem_5179.npy'), mmap_mode='r')
+    slope = np.load(os.path.join(cache_dir, 'slope_5179.npy'), mmap_mode='r')
+    return grid, dem, slope
+
+def compute_slope_tiled(dem_files, cache_dir, block_size=BLOCK_SIZE, jobs=1):
+    """
+    Builds the EPSG:5179 DEM and slope rasters block by block into cache_dir.
+    Blocks go into memory-mapped .npy files (shared by all workers when jobs > 1);
+    the slope is also copied to a tiled GeoTIFF for GIS use. Every block is computed
+    by the same function regardless of jobs, so serial and parallel results are identical.
+    Returns the grid dict.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    # 이전 meta.json 을 먼저 지움 -> 아래에서 .npy 를 다시 쓰는 동안 죽어도 완성된 캐시로 보이지 않음
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    vrt_path = os.path.join(cache_dir, 'dem_mosaic.vrt')
+    mosaic = build_virtual_mosaic(dem_files, vrt_path)
+    grid = compute_target_grid(mosaic)
+    print(f"Mosaic CRS: {mosaic['crs']} -> {grid['crs']} ({grid['width']} x {grid['height']} px, {len(dem_files)} tiles)")
+
+    shape = (grid['height'], grid['width'])
+    dem_npy = os.path.join(cache_dir, 'dem_5179.npy')
+    slope_npy = os.path.join(cache_dir, 'slope_5179.npy')
+    # 헤더만 만들고 닫음 (각 worker 가 r+ 로 다시 엶)
+    for path, dtype in ((dem_npy, grid['dtype']), (slope_npy, np.float32)):
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        del out
+
+    windows = list(iter_blocks(grid['width'], grid['height'], block_size))
+    tasks = [(vrt_path, grid, window, dem_npy, slope_npy) for window in windows]
+    if jobs > 1:
+        print(f"   - {len(windows)} blocks on {jobs} processes")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for i, _ in enumerate(pool.map(_slope_block_task, tasks, chunksize=4), start=1):
+                if i % 20 == 0 or i == len(windows):
+                    print(f"   - Block {i}/{len(windows)}")
+    else:
+        for i, task in enumerate(tasks, start=1):
+            _slope_block_task(task)
+            if i % 20 == 0 or i == len(windows):
+                print(f"   - Block {i}/{len(windows)}")
+
+    profile = {
+        'driver': 'GTiff',
+        'width': grid['width'],
+        'height': grid['height'],
+        'count': 1,
+        'dtype': 'float32',
+        'crs': grid['crs'],
+        'transform': grid['transform'],
+        'nodata': np.nan,
+        'tiled': True,
+        'blockxsize': 256,
+        'blockysize': 256,
+        'compress': 'deflate',
+        'BIGTIFF': 'IF_SAFER',
+    }
+    slope = np.load(slope_npy, mmap_mode='r')
+    with rasterio.open(os.path.join(cache_dir, 'slope_5179.tif'), 'w', **profile) as dst:
+        for window in windows:
+            rows, cols = window.toslices()
+            dst.write(slope[rows, cols], 1, window=window)
+    del slope
+
+    meta = {
+        'grid': dict(grid, crs=str(grid['crs']), transform=list(grid['transform'])[:6]),
+        'dem_files': [os.path.abspath(fp) for fp in dem_files],
+        'block_size': block_size,
+    }
+    # 마지막에 원자적으로 기록 (meta.json 이 있으면 완성된 캐시)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+    return grid
+
+def add_slope_zonal_stats(seoul_gdf, slope_values, transform):
+    """
+    Step 5: mean_slope, steep_ratio(>= 10도 비율 %) per district in one pass.
+    Uses the cached ADM_CD label raster (zonal_engine) instead of rasterizing per statistic.
+    """
+    print("Step 5: Calculating Zonal Statistics...")
+    stats = zonal_stats_by_label(
+        seoul_gdf,
+        slope_values,
+        transform,
+        nodata=np.nan, # Slope of nodata should be ignored
+        thresholds={'steep': STEEP_SLOPE_DEG},
+        cache_dir=LABEL_CACHE_DIR
+    )
+    seoul_gdf['mean_slope'] = stats['mean'].to_numpy()
+    # 유효 셀이 없는 동은 기존과 같이 0
+    seoul_gdf['steep_ratio'] = (stats['steep_ratio'] * 100).fillna(0).to_numpy()
+
+def main_tiled(block_size=BLOCK_SIZE, jobs=1, use_cache=True):
+    print(f"Starting Seoul Slope Analysis (tiled, block={block_size}px, jobs={jobs})...")
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+
+    dem_files = sorted(glob.glob(os.path.join(DEM_DIR, "*.img")))
+    if not dem_files:
+        raise FileNotFoundError(f"No .img files found in {DEM_DIR}")
+
+    # 2. Load & Filter SHP (vector 는 바로 TARGET_CRS 로)
+    seoul_gdf = load_seoul_districts()
+
+    # 1 + 3 + 4. Virtual mosaic -> 블록별 reproject -> 블록별 경사 계산 (캐시가 있으면 생략)
+    key = raster_cache_key(dem_files)
+    cache_dir = os.path.join(RASTER_CACHE_DIR, key)
+    cached = load_cached_rasters(cache_dir) if use_cache else None
+    if cached:
+        print(f"Step 1-4: Using cached EPSG:5179 DEM/slope rasters ({key})")
+        grid, _, slope = cached
+    else:
+        print("Step 1-4: Mosaic, reproject and slope per block...")
+        grid = compute_slope_tiled(dem_files, cache_dir, block_size, jobs)
+        _, _, slope = load_cached_rasters(cache_dir)
+
+    # 5. Zonal Stats (memmap 을 행 블록 단위로 읽음)
+    add_slope_zonal_stats(seoul_gdf, slope, grid['transform'])
+
+    # 6. Save Results
+    save_results(seoul_gdf)
+
 def main():
     print("Starting Seoul Slope Analysis...")
     os.makedirs(DERIVED_DIR, exist_ok=True)
@@ -98,13 +581,7 @@ def main():
     dem_array = mosaic[0]
     
     # 2. Load & Filter SHP
-    print("Step 2: Loading and Filtering Shapefile...")
-    shp_path = get_shapefile_path()
-    gdf = gpd.read_file(shp_path, encoding='euc-kr') # CP949 or EUC-KR
-    
-    # Filter Seoul (11...)
-    seoul_gdf = gdf[gdf['ADM_CD'].str.startswith('11')].copy()
-    print(f"Filtered {len(seoul_gdf)} Seoul districts.")
+    seoul_gdf = load_seoul_districts(reproject_vector=False)
 
     # 3. Reproject
     print(f"Step 3: Unifying Coordinate Systems to {TARGET_CRS}...")
@@ -144,17 +621,13 @@ def main():
             mosaic_crs, dst_crs, width, height, *rasterio.transform.array_bounds(height, width, out_trans)
         )
         
-        dst_array = np.zeros((dst_height, dst_width), dtype=dem_array.dtype)
-        
-        reproject(
-            source=dem_array,
-            destination=dst_array,
-            src_transform=out_trans,
-            src_crs=mosaic_crs,
-            dst_transform=dst_transform,
-            dst_crs=dst_crs,
-            resampling=Resampling.bilinear
-        )
+        # tiled 모드와 같은 resampler (DEM 밖과 nodata 는 0 이 아니라 nodata -> 경사 NaN)
+        nodata = src_meta.get('nodata')
+        nodata = -9999 if nodata is None else nodata
+        grid = {'crs': dst_crs, 'transform': dst_transform, 'width': dst_width, 'height': dst_height}
+        cols, rows = source_pixel_coords(grid, Window(0, 0, dst_width, dst_height), mosaic_crs, out_trans)
+        dst_array = bilinear_sample(dem_array, 0, 0, cols, rows, nodata).astype(dem_array.dtype)
+        src_meta['nodata'] = nodata
         
         working_array = dst_array
         working_transform = dst_transform
@@ -172,72 +645,21 @@ def main():
     slope_deg = calculate_slope(working_array, working_transform, nodata_val)
     
     # 5. Zonal Stats
-    print("Step 5: Calculating Zonal Statistics...")
-    
-    # Prepare inputs
-    # seoul_gdf geometry is ready
-    # slope_deg is numpy array
-    
-    # A. Mean Slope
-    print("   - Mean Slope")
-    stats_mean = zonal_stats(
-        seoul_gdf,
-        slope_deg,
-        affine=working_transform,
-        stats=['mean'],
-        nodata=np.nan # Slope of nodata should be ignored
-    )
-    seoul_gdf['mean_slope'] = [s['mean'] for s in stats_mean]
-    
-    # B. Steep Ratio (>10 deg)
-    print("   - Steep Ratio (> 10 degrees)")
-    # Create binary mask (1 if steep, 0 if not). Ignore NaNs.
-    # Handle NaNs in slope (fill with 0 or handle in mask)
-    # If slope_deg is masked array, fill_value might be needed.
-    
-    if np.ma.is_masked(slope_deg):
-        slope_filled = slope_deg.filled(0) # Treat nodata as 0 slope for the binary mask? No, should be ignored.
-        # Better: use rasterstats with nodata
-        steep_mask = (slope_filled >= 10).astype(int)
-        # But we must ensure the nodata areas are NOT counted in the total area.
-        # Rasterstats handles `nodata` argument.
-        # So we pass the binary mask, but tell rasterstats what the nodata value is (if we used one).
-        # Strategy: Use `affine` and keep `nodata` as distinct.
-        # Let's use a float array for steep_mask where 1.0=steep, 0.0=flat, and np.nan=nodata
-        
-        steep_float = np.where(slope_deg.mask, np.nan, (slope_deg.data >= 10).astype(float))
-        nodata_arg = np.nan
-    else:
-        # If no mask, assume pure array
-        steep_float = (slope_deg >= 10).astype(float)
-        nodata_arg = None # Or check if original DEM had nodata
-
-    stats_steep = zonal_stats(
-        seoul_gdf,
-        steep_float,
-        affine=working_transform,
-        stats=['mean'],
-        nodata=nodata_arg
-    )
-    # The 'mean' of 0s and 1s is exactly the ratio.
-    seoul_gdf['steep_ratio'] = [s['mean'] * 100 if s['mean'] is not None else 0 for s in stats_steep]
+    # slope_deg 는 masked array -> nodata 는 NaN 으로 채워서 넘김
+    slope_values = np.ma.filled(np.ma.asarray(slope_deg, dtype=np.float64), np.nan)
+    add_slope_zonal_stats(seoul_gdf, slope_values, working_transform)
 
     # 6. Save Results
-    print("Step 6: Saving Results...")
-    # Select columns
-    # SHP likely produces lowercase column names on read sometimes? Or keep original.
-    # Check column names. usually ADM_CD, ADM_NM.
-    
-    # Try to find correct columns case-insensitive
-    cols = seoul_gdf.columns
-    adm_cd_col = next((c for c in cols if c.upper() == 'ADM_CD'), 'ADM_CD')
-    adm_nm_col = next((c for c in cols if c.upper() == 'ADM_NM'), 'ADM_NM')
-    
-    output_df = seoul_gdf[[adm_cd_col, adm_nm_col, 'mean_slope', 'steep_ratio']].copy()
-    output_df.columns = ['adm_cd', 'adm_nm', 'mean_slope', 'steep_ratio']
-    
-    output_df.to_csv(RESULT_CSV, index=False, encoding='utf-8-sig')
-    print(f"Done! Saved to {RESULT_CSV}")
+    save_results(seoul_gdf)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Seoul slope analysis")
+    parser.add_argument('--in-memory', action='store_true', help="legacy path: merge and warp the whole DEM in RAM")
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help="block size in pixels")
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes for the block computation")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the derived raster cache")
+    args = parser.parse_args()
+    if args.in_memory:
+        main()
+    else:
+        main_tiled(args.block_size, args.jobs, use_cache=not args.rebuild)
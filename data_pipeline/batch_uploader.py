@@ -0,0 +1,488 @@
+"""
+Concurrent Batch Uploader (Supabase / PostgREST)
+Project: Tenant Note - Safety Grade Analysis
+
+upload_cctv.py, upload_to_supabase.py 가 공통으로 사용하는 업로더.
+- 여러 배치를 스레드 풀로 동시에 전송 (in-flight 개수 제한)
+- 레코드 크기(JSON bytes)에 맞춰 배치 행 수를 조절, 서버가 413(너무 큼)으로 거절하면
+  배치를 반으로 나눠 다시 보내고 이후 배치의 행 수 한도도 낮춤
+- 실패 시 지수 백오프로 재시도 (4xx / 타임아웃 난 insert 는 제외), 끝내 실패한 배치는
+  체크포인트(JSONL)에 기록 -> resume 가능 (중단된 resume 은 처리한 배치를 건너뜀)
+- 종료 시 처리량(rows/s)과 재시도 통계 출력
+"""
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_MAX_ROWS = 1000
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024  # PostgREST 요청 본문 기준 약 2MB
+SIZE_SAMPLE_ROWS = 50
+
+
+# PostgREST / Postgres 에러 코드 중 일시적인 것 (그 외 APIError 는 4xx 성격 -> 재시도 안 함)
+# 08 연결, 40 직렬화 실패/데드락, 53 자원 부족, 57 statement timeout 등 / PGRST000~003 DB 연결 실패
+RETRYABLE_SQLSTATE_PREFIXES = ('08', '40', '53', '57')
+RETRYABLE_PGRST_CODES = {'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003'}
+
+
+class NonRetryableError(Exception):
+    """요청 자체가 잘못된 경우 (4xx) - 재시도해도 결과가 같으므로 바로 체크포인트로 보냄"""
+
+
+class PayloadTooLargeError(NonRetryableError):
+    """413 - 배치가 서버 한도보다 큼. 같은 배치는 재시도하지 않고 반으로 나눠 보냄"""
+
+
+def is_retryable_api_error(error):
+    """supabase-py (postgrest) APIError: retry only transient database/connection errors"""
+    code = str(getattr(error, 'code', '') or '')
+    return code in RETRYABLE_PGRST_CODES or code.startswith(RETRYABLE_SQLSTATE_PREFIXES)
+
+
+def is_timeout(error):
+    """Request timed out: the server may or may not have applied it"""
+    reason = getattr(error, 'reason', None)
+    return (isinstance(error, TimeoutError) or isinstance(reason, TimeoutError)
+            or 'Timeout' in type(error).__name__)
+
+
+class UploadStats:
+    def __init__(self, label=''):
+        self.label = label
+        self.rows = 0
+        self.batches = 0
+        self.retries = 0
+        self.splits = 0
+        self.failed_batches = 0
+        self.failed_rows = 0
+        self.started = time.time()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        prefix = f"[{self.label}] " if self.label else ""
+        print(f"\n{prefix}Upload Summary")
+        print(f"   - Uploaded: {self.rows} rows in {self.batches} batches ({self.elapsed:.1f}s, {self.rows_per_sec:,.0f} rows/s)")
+        print(f"   - Retries: {self.retries} (oversize batches split: {self.splits})")
+        print(f"   - Failed: {self.failed_rows} rows in {self.failed_batches} batches")
+
+
+def _json_default(value):
+    """numpy 스칼라 등 json 기본 인코더가 모르는 값 처리"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_json_bytes(records):
+    return json.dumps(records, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+# --- Senders -------------------------------------------------------------
+# sender(batch) 는 성공하면 그냥 반환하고, 실패하면 예외를 던진다.
+
+# sender.idempotent: 같은 배치를 두 번 보내도 결과가 같은지 (upsert). insert 는 타임아웃 시
+# 서버에 이미 반영됐을 수 있으므로 재시도하지 않고 체크포인트로 보냄 (resume 은 upsert 로 할 것)
+
+def supabase_sender(client, table, method='insert', on_conflict=None):
+    """supabase-py Client 를 사용하는 sender"""
+    try:
+        from postgrest.exceptions import APIError
+    except ImportError:
+        APIError = None
+
+    def send(batch):
+        query = client.table(table)
+        try:
+            if method == 'upsert':
+                if on_conflict:
+                    query.upsert(batch, on_conflict=on_conflict).execute()
+                else:
+                    query.upsert(batch).execute()
+            else:
+                query.insert(batch).execute()
+        except Exception as e:
+            if APIError is not None and isinstance(e, APIError):
+                # JSON 이 아닌 에러 응답은 HTTP 상태 코드가 code 로 들어옴
+                if str(e.code) == '413':
+                    raise PayloadTooLargeError(f"APIError {e.code}: {e.message}") from e
+                if not is_retryable_api_error(e):
+                    raise NonRetryableError(f"APIError {e.code}: {e.message}") from e
+            raise
+    send.idempotent = method == 'upsert'
+    return send
+
+
+def postgrest_sender(base_url, key, table, method='insert', on_conflict=None, timeout=60):
+    """
+    PostgREST REST API 로 직접 POST 하는 sender (Supabase 또는 로컬 스텁 서버).
+    base_url 예: https://xxx.supabase.co 또는 http://127.0.0.1:54321
+    """
+    url = f"{base_url.rstrip('/')}/rest/v1/{table}"
+    if method == 'upsert' and on_conflict:
+        url += f"?on_conflict={on_conflict}"
+    prefer = 'return=minimal'
+    if method == 'upsert':
+        prefer += ',resolution=merge-duplicates'
+    headers = {
+        'Content-Type': 'application/json',
+        'Prefer': prefer,
+    }
+    if key:
+        headers['apikey'] = key
+        headers['Authorization'] = f"Bearer {key}"
+
+    def send(batch):
+        req = urllib.request.Request(url, data=to_json_bytes(batch), headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                resp.read()
+        except urllib.error.HTTPError as e:
+            body = e.read()[:200].decode('utf-8', 'replace')
+            if e.code == 413:
+                raise PayloadTooLargeError(f"HTTP 413: {body}") from e
+            # 408(timeout), 429(rate limit) 은 재시도 대상
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                raise NonRetryableError(f"HTTP {e.code}: {body}") from e
+            raise
+    send.idempotent = method == 'upsert'
+    return send
+
+
+# --- Batching ------------------------------------------------------------
+
+def iter_sized_batches(records, max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES, limits=None):
+    """
+    Re-batches an iterable of records (or of record lists) so each batch stays under
+    max_rows and roughly under max_bytes of JSON payload.
+    The row limit is re-estimated from a sample of each emitted batch.
+    limits: optional dict shared with the caller; limits['rows'] lowers max_rows while
+    iterating (upload_batches sets it when the server rejects a batch as too large).
+    """
+    rows_limit = max_rows
+    batch = []
+    for item in records:
+        items = item if isinstance(item, list) else [item]
+        for record in items:
+            batch.append(record)
+            ceiling = min(max_rows, limits['rows']) if limits is not None else max_rows
+            if len(batch) >= min(rows_limit, ceiling):
+                sample = batch[:SIZE_SAMPLE_ROWS]
+                row_bytes = max(1, len(to_json_bytes(sample)) // len(sample))
+                fit = max(1, min(ceiling, max_bytes // row_bytes))
+                if fit < len(batch):
+                    # 예상보다 레코드가 커서 한도를 넘음 -> 줄여서 내보내고 나머지는 다음 배치로
+                    yield batch[:fit]
+                    batch = batch[fit:]
+                else:
+                    yield batch
+                    batch = []
+                rows_limit = fit
+    if batch:
+        yield batch
+
+
+# --- Checkpoint ----------------------------------------------------------
+
+def append_checkpoint(path, label, batch, error):
+    with open(path, 'a', encoding='utf-8') as f:
+        line = {'label': label, 'error': str(error)[:300], 'records': batch}
+        f.write(json.dumps(line, ensure_ascii=False, default=_json_default) + '\n')
+
+
+def _read_entries(path):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_checkpoint(path):
+    """Yields (label, records) for every failed batch stored in the checkpoint file."""
+    for entry in _read_entries(path):
+        yield entry.get('label', ''), entry['records']
+
+
+# --- Upload --------------------------------------------------------------
+
+def _send_with_retry(send, batch, max_retries, backoff_base, backoff_max):
+    """
+    Returns (retries_used, failures, largest_sent). failures lists the (records, error)
+    parts that could not be sent. A timed-out request of a non-idempotent sender (insert)
+    is not retried: it may already be applied, so it goes to the checkpoint.
+    A batch rejected as too large is split in half and each half sent the same way;
+    largest_sent is the size of the largest request the server accepted (None if none).
+    """
+    idempotent = getattr(send, 'idempotent', False)
+    attempt = 0
+    while True:
+        try:
+            send(batch)
+            return attempt, [], len(batch)
+        except PayloadTooLargeError as e:
+            if len(batch) == 1:
+                return attempt, [(batch, e)], None
+            half = (len(batch) + 1) // 2
+            retries, failures, largest_sent = attempt, [], None
+            for part in (batch[:half], batch[half:]):
+                part_retries, part_failures, part_sent = _send_with_retry(
+                    send, part, max_retries, backoff_base, backoff_max)
+                retries += part_retries
+                failures += part_failures
+                if part_sent is not None:
+                    largest_sent = max(largest_sent or 0, part_sent)
+            return retries, failures, largest_sent
+        except NonRetryableError as e:
+            return attempt, [(batch, e)], None
+        except Exception as e:
+            if attempt >= max_retries or (not idempotent and is_timeout(e)):
+                return attempt, [(batch, e)], None
+            # Exponential backoff with jitter
+            delay = min(backoff_max, backoff_base * (2 ** attempt))
+            time.sleep(delay * (0.5 + random.random() / 2))
+            attempt += 1
+
+
+def upload_batches(records, send, label='', max_workers=4, max_in_flight=None,
+                   max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES,
+                   max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                   checkpoint_path=None, on_failed=None, on_done=None, rebatch=True, verbose=True):
+    """
+    Uploads records (an iterable of dicts or of dict lists) with a bounded thread pool.
+    Failed batches are appended to checkpoint_path (JSONL) and can be re-sent with
+    resume_checkpoint(); on_failed(batch, error) is also called for each of them.
+    on_done(batch_no, batch) is called once a batch is fully handled (sent or checkpointed).
+    rebatch=False sends every item of records (a record list) as one batch, as is.
+    If the upload is interrupted, the batches already in flight are still collected
+    before the exception propagates. Returns UploadStats.
+    """
+    stats = UploadStats(label)
+    max_in_flight = max_in_flight or max_workers * 2
+    in_flight = {}
+    limits = {'rows': max_rows}
+    interrupted = []
+
+    def collect(done):
+        for future in done:
+            batch_no, batch = in_flight.pop(future)
+            try:
+                retries, failures, largest_sent = future.result()
+            except BaseException as e:
+                # 전송 중 중단 (KeyboardInterrupt 등): 나머지 배치를 마저 기록한 뒤 다시 던짐
+                interrupted.append(e)
+                continue
+            stats.retries += retries
+            if largest_sent is not None and largest_sent < len(batch):
+                stats.splits += 1
+                if largest_sent < limits['rows']:
+                    limits['rows'] = largest_sent
+                    print(f"   ↘️ Batch [{batch_no}] too large for the server: batch limit lowered to {largest_sent} rows")
+            sent = len(batch) - sum(len(part) for part, _ in failures)
+            if sent:
+                stats.rows += sent
+                stats.batches += 1
+                if verbose and not failures:
+                    print(f"   ✅ Batch [{batch_no}] 완료 ({len(batch)} rows, retries={retries})")
+            for part, error in failures:
+                stats.failed_rows += len(part)
+                stats.failed_batches += 1
+                print(f"   ❌ Batch [{batch_no}] 실패 ({len(part)} rows): {error}")
+                if checkpoint_path:
+                    append_checkpoint(checkpoint_path, label, part, error)
+                if on_failed:
+                    on_failed(part, error)
+            if on_done:
+                on_done(batch_no, batch)
+
+    if rebatch:
+        batches = iter_sized_batches(records, max_rows, max_bytes, limits)
+    else:
+        batches = (list(item) for item in records)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            batch_no = 0
+            while not interrupted:
+                # 자리가 난 뒤에 다음 배치를 만듦 -> 낮아진 행 수 한도가 바로 반영됨
+                while len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                batch_no += 1
+                future = pool.submit(_send_with_retry, send, batch, max_retries, backoff_base, backoff_max)
+                in_flight[future] = (batch_no, batch)
+        finally:
+            # 중단되어도 이미 보낸 배치의 결과는 기록 (resume 이 같은 행을 다시 보내지 않도록)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+    if interrupted:
+        raise interrupted[0]
+
+    stats.elapsed = time.time() - stats.started
+    if checkpoint_path and stats.failed_batches:
+        print(f"   💾 실패한 배치를 {checkpoint_path} 에 저장했습니다. (resume_checkpoint 로 재전송)")
+    stats.report()
+    return stats
+
+
+def resume_checkpoint(checkpoint_path, send, **kwargs):
+    """
+    Re-sends every batch stored in the checkpoint file, one request per stored batch.
+    Batches that fail again are written back, so the file always holds exactly the
+    still-missing rows. The batches being re-sent are kept in <checkpoint>.resuming and
+    each one is logged in <checkpoint>.resuming.done once handled, so an interrupted
+    resume continues with the remaining batches instead of sending everything again.
+    Only a batch in flight when the process is killed can be sent twice, so send should
+    still be idempotent (an upsert sender).
+    """
+    resuming_path = checkpoint_path + '.resuming'
+    done_path = resuming_path + '.done'
+    done_ids = set()
+    if os.path.exists(done_path):
+        with open(done_path, encoding='utf-8') as f:
+            done_ids = {line.strip() for line in f}
+    # 이전 resume 이 중간에 끊겼으면 아직 처리하지 않은 배치도 함께 보냄
+    pending = [entry for entry in _read_entries(resuming_path) if entry['id'] not in done_ids]
+    pending += [dict(entry, id=uuid.uuid4().hex) for entry in _read_entries(checkpoint_path)]
+    if not pending:
+        print(f"   - Nothing to resume in {checkpoint_path}")
+        for path in (resuming_path, done_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return None
+
+    # 합친 목록을 .resuming 에 먼저 안전하게 기록한 뒤 체크포인트를 비움
+    # (남아 있는 .done 의 id 는 새 목록과 겹치지 않으므로 지워도 되고 남아도 무해)
+    tmp_path = resuming_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in pending:
+            line = {'id': entry['id'], 'label': entry.get('label', ''), 'records': entry['records']}
+            f.write(json.dumps(line, ensure_ascii=False, default=_json_default) + '\n')
+    os.replace(tmp_path, resuming_path)
+    for path in (done_path, checkpoint_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    label = pending[0].get('label') or 'resume'
+    completed = False
+    with open(done_path, 'a', encoding='utf-8') as done_log:
+        def mark_done(batch_no, batch):
+            done_log.write(pending[batch_no - 1]['id'] + '\n')
+            done_log.flush()
+
+        try:
+            stats = upload_batches((entry['records'] for entry in pending), send, label=label,
+                                   checkpoint_path=checkpoint_path, on_done=mark_done, rebatch=False, **kwargs)
+            completed = True
+        finally:
+            if not completed:
+                print(f"   ⚠️ Resume interrupted: unsent rows are kept in {resuming_path} (next --resume retries them)")
+    if completed:
+        # 다시 실패한 배치는 이미 checkpoint_path 에 기록됨
+        os.remove(resuming_path)
+        os.remove(done_path)
+    return stats
+
+
+# --- Local PostgREST stand-in ----------------------------------------------
+
+def run_stub_server(port=0, fail_rate=0.0, latency=0.0, fail_first=0, max_rows=None):
+    """
+    Starts a minimal PostgREST-like HTTP server on 127.0.0.1 for local testing.
+    POST /rest/v1/<table> accepts a JSON array. The first `fail_first` requests and
+    `fail_rate` of the others answer 503; arrays longer than `max_rows` answer 413.
+    Returns (server, base_url). Received rows are kept in server.received[table] and
+    counted in server.rows[table]; server.rejected counts 413 answers and
+    server.peak_requests the most requests handled at the same time.
+    server.fail_rate / server.max_rows can be changed while it runs.
+    """
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            server = self.server
+            table = self.path.split('?')[0].rstrip('/').split('/')[-1]
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with lock:
+                server.requests += 1
+                server.active += 1
+                server.peak_requests = max(server.peak_requests, server.active)
+                failing = server.requests <= fail_first or random.random() < server.fail_rate
+            try:
+                if latency:
+                    time.sleep(latency)
+                if failing:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                try:
+                    rows = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                if server.max_rows is not None and len(rows) > server.max_rows:
+                    with lock:
+                        server.rejected += 1
+                    self.send_response(413)
+                    self.end_headers()
+                    return
+                with lock:
+                    server.rows[table] = server.rows.get(table, 0) + len(rows)
+                    server.received.setdefault(table, []).extend(rows)
+                self.send_response(201)
+                self.end_headers()
+            finally:
+                with lock:
+                    server.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.fail_rate = fail_rate
+    server.max_rows = max_rows
+    server.rows = {}
+    server.received = {}
+    server.requests = 0
+    server.active = 0
+    server.peak_requests = 0
+    server.rejected = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    # 로컬 스텁 서버로 동작 확인 (실패율 20%)
+    server, base_url = run_stub_server(fail_rate=0.2, latency=0.02)
+    mock_rows = ({'name': f'CCTV {i}', 'lat': 37.5, 'lng': 127.0, 'count': i % 4} for i in range(20000))
+    checkpoint = 'upload_failed_batches.jsonl'
+    upload_batches(mock_rows, postgrest_sender(base_url, None, 'cctv'), label='stub',
+                   max_retries=3, backoff_base=0.05, checkpoint_path=checkpoint, verbose=False)
+    print(f"Stub received: {server.rows}")
+    if os.path.exists(checkpoint):
+        resume_checkpoint(checkpoint, postgrest_sender(base_url, None, 'cctv'), verbose=False)
+        print(f"Stub received after resume: {server.rows}")
+    server.shutdown()
@@ -0,0 +1,478 @@
+"""
+Pipeline Stage Benchmark (Seoul-scale synthetic fixture)
+Project: Tenant Note - Safety Grade Analysis
+
+서울 규모의 합성 데이터로 파이프라인 단계 (aggregate_data, calculate_grade, export_data,
+analyze_slope) 를 하나씩 따로 실행해서 wall time / peak RSS / rows/s 를 기록하고,
+저장된 baseline 보다 기준 이상 느려지거나 메모리를 더 쓰면 실패(exit 1)한다.
+
+- fixture: 행정동 426개 (Voronoi, 25개 구), 점 데이터는 synthetic_dataset 의 기준 밀도
+  (CCTV 약 8만, 인허가 약 20만, 건물 약 50만), 합성 DEM (EPSG:5186, 4096 x 4096 px, 2x2 타일)
+  -> data/derived/benchmarks/fixture-<key>/ 에 한 번만 만들고 재사용 (파라미터가 같으면 같은 데이터)
+- 단계마다 새 프로세스 (spawn) + 새 작업 디렉터리에서 실행 -> peak RSS 가 단계별로 분리되고
+  locator / adjacency / label raster 같은 파생 캐시는 항상 cold 상태에서 측정
+- 상위 단계의 결과는 run 디렉터리에 pickle 로 넘김 (로드 시간은 측정에서 제외)
+- 기록: history.json (실행마다 추가), baseline.json (fixture key 별, 첫 실행 또는 --update-baseline)
+"""
+import argparse
+import contextlib
+import gc
+import glob
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely import affinity
+from pyproj import Transformer
+from generate_mock_points import generate_random_points_in_polygon
+from intermediate_store import read_frame, write_frame
+from synthetic_dataset import generate_synthetic_dataset, load_synthetic_points
+from schema_config import CRS_ANALYSIS
+
+BENCH_DIR = os.path.join(os.getcwd(), 'data', 'derived', 'benchmarks')
+HISTORY_PATH = os.path.join(BENCH_DIR, 'history.json')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+FIXTURE_VERSION = 1
+
+# fixture 크기 (서울 운영 규모)
+FIXTURE_DISTRICTS = 426
+FIXTURE_GU = 25
+FIXTURE_TARGET_ZONES = 5
+FIXTURE_SEED = 20260101
+SEOUL_CENTER = (953_000, 1_951_000)      # EPSG:5179
+SEOUL_AXES_M = (16_500, 11_700)          # 타원 반지름 -> 면적 약 605km²
+DEM_CRS = 'EPSG:5186'                    # 국토지리정보원 DEM 과 같은 좌표계 (EPSG:5179 로 warp 됨)
+DEM_SIZE_PX = 4096
+DEM_TILES = 2                            # 2 x 2 타일
+DEM_NODATA = -9999.0
+DEM_HILLS = 40
+
+# 회귀 판정: baseline 대비 배율, 아주 짧은 단계의 흔들림은 무시
+WALL_THRESHOLD = 1.25
+RSS_THRESHOLD = 1.25
+MIN_REGRESSION_S = 0.2
+
+# 단계 함수가 쓰는 모듈 (타이머 시작 전에 import)
+STAGE_MODULES = ['aggregate_data', 'calculate_grade', 'export_data', 'analyze_slope']
+
+# ---------------------------------------------------------
+# Fixture
+# ---------------------------------------------------------
+
+def fixture_params(scale=1.0, districts=FIXTURE_DISTRICTS, dem_size=DEM_SIZE_PX, seed=FIXTURE_SEED):
+    return {'version': FIXTURE_VERSION, 'districts': districts, 'scale': scale, 'dem_size': dem_size, 'seed': seed}
+
+
+def fixture_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def make_fixture_boundaries(n_districts, seed):
+    """
+    n_districts Voronoi 행정동 inside a Seoul-sized ellipse (EPSG:5179), grouped into
+    FIXTURE_GU 구 by nearest 구 center. Same columns as load_boundaries.process_boundaries().
+    """
+    rng = np.random.default_rng(seed)
+    region = affinity.scale(shapely.Point(SEOUL_CENTER).buffer(1.0, quad_segs=64), *SEOUL_AXES_M)
+    x, y = generate_random_points_in_polygon(region, n_districts, rng)
+    seeds = shapely.points(x, y)
+    cells = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(seeds), extend_to=region, ordered=True))
+    # 실제 경계처럼 꼭짓점이 많도록 20m 간격으로 나눔
+    cells = shapely.segmentize(shapely.intersection(cells, region), 20.0)
+
+    # 구: 임의의 구 중심 중 가장 가까운 것, 동 번호는 구 안에서 x 순서
+    gu_x, gu_y = generate_random_points_in_polygon(region, FIXTURE_GU, rng)
+    gu = np.argmin((x[:, None] - gu_x) ** 2 + (y[:, None] - gu_y) ** 2, axis=1)
+    order = np.lexsort((x, gu))
+    dong = np.empty(n_districts, dtype=np.int64)
+    dong[order] = np.concatenate([np.arange(n) for n in np.bincount(gu, minlength=FIXTURE_GU)])
+
+    sig_cd = np.array([f"11{110 + 10 * g:03d}" for g in gu])
+    gdf = gpd.GeoDataFrame({
+        'ADM_CD': [f"{s}{d + 1:03d}00" for s, d in zip(sig_cd, dong)],
+        'ADM_NM': [f"벤치{g + 1:02d}구{d + 1:02d}동" for g, d in zip(gu, dong)],
+        'SIG_CD': sig_cd,
+        'is_target_zone': False,
+    }, geometry=cells, crs=CRS_ANALYSIS)
+    # 타겟 동: 첫 번째 구의 앞쪽 동 몇 개 (격자 분석 대상)
+    gdf.loc[(gu == 0) & (dong < FIXTURE_TARGET_ZONES), 'is_target_zone'] = True
+    return gdf.sort_values('ADM_CD', ignore_index=True)
+
+
+def synthetic_elevation(x, y, hills):
+    """Smooth terrain (m): base plain plus Gaussian hills, evaluated on coordinate grids"""
+    z = np.full(np.broadcast_shapes(x.shape, y.shape), 20.0, dtype=np.float32)
+    for hx, hy, height, sigma in hills:
+        z += (height * np.exp(-((x - hx) ** 2 + (y - hy) ** 2) / (2 * sigma ** 2))).astype(np.float32)
+    return z
+
+
+def write_fixture_dem(boundaries, dem_dir, size_px, seed, tiles=DEM_TILES):
+    """
+    Writes a tiles x tiles mosaic of GeoTIFF DEM tiles (DEM_CRS, float32) covering the
+    boundaries, size_px pixels square in total. Returns the tile paths.
+    """
+    import rasterio
+    from rasterio.transform import from_origin
+
+    rng = np.random.default_rng([seed, 1])
+    to_dem = Transformer.from_crs(CRS_ANALYSIS, DEM_CRS, always_xy=True)
+    left, bottom, right, top = to_dem.transform_bounds(*boundaries.total_bounds)
+    res = float(np.ceil(max(right - left, top - bottom) * 1.02 / size_px))
+    left, top = np.floor(left / res) * res - res * 8, np.ceil(top / res) * res + res * 8
+
+    hills = np.column_stack([
+        rng.uniform(left, left + size_px * res, DEM_HILLS),
+        rng.uniform(top - size_px * res, top, DEM_HILLS),
+        rng.uniform(40, 600, DEM_HILLS),
+        rng.uniform(400, 3000, DEM_HILLS),
+    ])
+
+    os.makedirs(dem_dir, exist_ok=True)
+    tile_px = size_px // tiles
+    paths = []
+    for row in range(tiles):
+        for col in range(tiles):
+            tile_left = left + col * tile_px * res
+            tile_top = top - row * tile_px * res
+            xs = tile_left + (np.arange(tile_px) + 0.5) * res
+            ys = tile_top - (np.arange(tile_px) + 0.5) * res
+            dem = synthetic_elevation(xs[None, :], ys[:, None], hills)
+            # 한강처럼 값이 없는 띠 (nodata 처리 경로도 측정)
+            river = np.abs(ys[:, None] - (top - size_px * res * 0.55) - 0.08 * (xs[None, :] - left)) < 300
+            dem[np.broadcast_to(river, dem.shape)] = DEM_NODATA
+
+            path = os.path.join(dem_dir, f"dem_{row}{col}.tif")
+            profile = {
+                'driver': 'GTiff', 'width': tile_px, 'height': tile_px, 'count': 1, 'dtype': 'float32',
+                'crs': DEM_CRS, 'transform': from_origin(tile_left, tile_top, res, res), 'nodata': DEM_NODATA,
+                'tiled': True, 'blockxsize': 256, 'blockysize': 256, 'compress': 'deflate',
+            }
+            with rasterio.open(path, 'w', **profile) as dst:
+                dst.write(dem, 1)
+            paths.append(path)
+    return paths
+
+
+def ensure_fixture(params, jobs=1, bench_dir=BENCH_DIR):
+    """
+    Builds the fixture once (boundaries GeoParquet, partitioned point datasets, DEM tiles).
+    fixture.json is written last, so a directory with it is complete. Returns the directory.
+    """
+    fixture_dir = os.path.join(bench_dir, f"fixture-{fixture_key(params)}")
+    manifest_path = os.path.join(fixture_dir, 'fixture.json')
+    if os.path.exists(manifest_path):
+        return fixture_dir
+
+    started = time.time()
+    print(f"[Fixture] Building {fixture_dir} ({params})")
+    boundaries = make_fixture_boundaries(params['districts'], params['seed'])
+    write_frame(os.path.join(fixture_dir, 'boundaries.parquet'), boundaries)
+    totals = generate_synthetic_dataset(boundaries, os.path.join(fixture_dir, 'points'),
+                                        scale=params['scale'], jobs=jobs, seed=params['seed'])
+    dem_files = write_fixture_dem(boundaries, os.path.join(fixture_dir, 'dem'), params['dem_size'], params['seed'])
+
+    manifest = dict(params, districts_written=len(boundaries), points=totals,
+                    dem_files=[os.path.basename(p) for p in dem_files])
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"[Fixture] Done in {time.time() - started:.1f}s: {totals}")
+    return fixture_dir
+
+# ---------------------------------------------------------
+# Stages (각 함수는 (결과, 처리한 입력 행 수) 를 돌려줌)
+# ---------------------------------------------------------
+
+def bench_aggregation(boundaries, points):
+    from aggregate_data import run_aggregation
+    return run_aggregation(boundaries=boundaries, points=points), sum(len(p) for p in points)
+
+
+def bench_grid_hierarchy(boundaries, points):
+    from aggregate_data import run_grid_hierarchy
+    return run_grid_hierarchy(boundaries=boundaries, points=points), sum(len(p) for p in points)
+
+
+def bench_grades(aggregation):
+    from calculate_grade import calculate_grades
+    df_admin, df_grid = aggregation
+    return calculate_grades(aggregation), len(df_admin) + (len(df_grid) if df_grid is not None else 0)
+
+
+def bench_grid_grades(grid_hierarchy):
+    from calculate_grade import grade_grid
+    return grade_grid(grid_hierarchy), len(grid_hierarchy)
+
+
+def bench_profile_grades(aggregation, grid_hierarchy):
+    from calculate_grade import calculate_profile_grades
+    return calculate_profile_grades(aggregation, grid_hierarchy), len(aggregation[0]) + len(grid_hierarchy)
+
+
+def bench_export_geojson(boundaries, grades, cctv):
+    from export_data import write_hybrid_geojson
+    path = os.path.join(os.getcwd(), 'seoul_hybrid_data.json')
+    features = write_hybrid_geojson(boundaries, grades[0], cctv, path)
+    return {'path': path, 'features': features, 'bytes': os.path.getsize(path)}, len(boundaries) + len(cctv)
+
+
+def bench_export_tiles(boundaries, grades, grid_grades):
+    from export_data import write_tile_archive
+    path = os.path.join(os.getcwd(), 'seoul_hybrid_data.pmtiles')
+    tiles = write_tile_archive(boundaries, grades[0], grid_grades, path)
+    return {'path': path, 'tiles': tiles, 'bytes': os.path.getsize(path)}, len(boundaries) + len(grid_grades)
+
+
+def bench_slope_raster(dem_files):
+    from analyze_slope import compute_slope_tiled
+    cache_dir = os.path.join(os.getcwd(), 'raster_cache')
+    grid = compute_slope_tiled(dem_files, cache_dir)
+    return cache_dir, grid['width'] * grid['height']
+
+
+def bench_slope_zonal(boundaries, slope_raster):
+    from analyze_slope import add_slope_zonal_stats, load_cached_rasters
+    grid, _, slope = load_cached_rasters(slope_raster)
+    districts = boundaries.copy()
+    add_slope_zonal_stats(districts, slope, grid['transform'])
+    return districts[['ADM_CD', 'ADM_NM', 'mean_slope', 'steep_ratio']], slope.size
+
+
+# {단계 이름: (함수, 입력)}. 입력은 fixture (boundaries / points / cctv / dem_files) 또는 앞 단계 이름
+BENCH_STAGES = {
+    'aggregation': (bench_aggregation, ['boundaries', 'points']),
+    'grid_hierarchy': (bench_grid_hierarchy, ['boundaries', 'points']),
+    'grades': (bench_grades, ['aggregation']),
+    'grid_grades': (bench_grid_grades, ['grid_hierarchy']),
+    'profile_grades': (bench_profile_grades, ['aggregation', 'grid_hierarchy']),
+    'export_geojson': (bench_export_geojson, ['boundaries', 'grades', 'cctv']),
+    'export_tiles': (bench_export_tiles, ['boundaries', 'grades', 'grid_grades']),
+    'slope_raster': (bench_slope_raster, ['dem_files']),
+    'slope_zonal': (bench_slope_zonal, ['boundaries', 'slope_raster']),
+}
+
+
+def stage_order(names):
+    """Requested stages plus everything upstream of them, in BENCH_STAGES order"""
+    unknown = set(names) - set(BENCH_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark stages: {sorted(unknown)}")
+    needed = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(dep for dep in BENCH_STAGES[name][1] if dep in BENCH_STAGES)
+    return [name for name in BENCH_STAGES if name in needed]
+
+
+def load_input(name, fixture_dir, run_dir):
+    if name == 'boundaries':
+        return read_frame(os.path.join(fixture_dir, 'boundaries.parquet'))
+    if name == 'points':
+        return load_synthetic_points(os.path.join(fixture_dir, 'points'))
+    if name == 'cctv':
+        return load_synthetic_points(os.path.join(fixture_dir, 'points'), datasets=('cctv',))[0]
+    if name == 'dem_files':
+        return sorted(glob.glob(os.path.join(fixture_dir, 'dem', '*.tif')))
+    with open(os.path.join(run_dir, f"{name}.pkl"), 'rb') as f:
+        return pickle.load(f)
+
+
+def peak_rss_mb():
+    # Linux: ru_maxrss 는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_stage(name, fixture_dir, run_dir):
+    """
+    Worker (fresh spawned process): loads the stage inputs, times the stage function
+    and pickles its result for downstream stages. Stage output goes to <stage dir>/stage.log.
+    """
+    stage_dir = os.path.join(run_dir, name)
+    os.makedirs(stage_dir, exist_ok=True)
+    # 모듈 수준 캐시 경로 (data/derived/...) 가 cwd 기준이므로 import 전에 이동
+    os.chdir(stage_dir)
+    func, deps = BENCH_STAGES[name]
+    with open('stage.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        for module in STAGE_MODULES:
+            importlib.import_module(module)
+        inputs = {dep: load_input(dep, fixture_dir, run_dir) for dep in deps}
+        gc.collect()
+        start_rss = peak_rss_mb()
+        started = time.perf_counter()
+        result, rows = func(**inputs)
+        wall = time.perf_counter() - started
+
+    with open(os.path.join(run_dir, f"{name}.pkl"), 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return {
+        'wall_s': round(wall, 4),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'start_rss_mb': round(start_rss, 1),
+        'rows': int(rows),
+        'rows_per_s': round(rows / max(wall, 1e-9), 1),
+    }
+
+
+def run_stage(name, fixture_dir, run_dir, repeat=1):
+    """Best (fastest) of `repeat` runs, each in its own spawned process"""
+    samples = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            try:
+                samples.append(pool.submit(_run_stage, name, fixture_dir, run_dir).result())
+            except Exception:
+                print(f"   ! {name} failed, see {os.path.join(run_dir, name, 'stage.log')}")
+                raise
+    best = min(samples, key=lambda s: s['wall_s'])
+    best['peak_rss_mb'] = min(s['peak_rss_mb'] for s in samples)
+    return best
+
+# ---------------------------------------------------------
+# History / baseline
+# ---------------------------------------------------------
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(value, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(stages, baseline, wall_threshold=WALL_THRESHOLD, rss_threshold=RSS_THRESHOLD,
+                     min_delta_s=MIN_REGRESSION_S):
+    """Messages for every stage slower / larger than baseline x threshold (stages missing from the baseline are skipped)"""
+    regressions = []
+    for name, metrics in stages.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        wall, base_wall = metrics['wall_s'], base['wall_s']
+        if wall > base_wall * wall_threshold and wall - base_wall > min_delta_s:
+            regressions.append(f"{name}: wall time {base_wall:.2f}s -> {wall:.2f}s (x{wall / base_wall:.2f})")
+        rss, base_rss = metrics['peak_rss_mb'], base['peak_rss_mb']
+        if rss > base_rss * rss_threshold:
+            regressions.append(f"{name}: peak RSS {base_rss:.0f}MB -> {rss:.0f}MB (x{rss / base_rss:.2f})")
+    return regressions
+
+
+def print_report(stages, baseline):
+    print(f"\n{'stage':<16}{'wall (s)':>10}{'base (s)':>10}{'peak RSS (MB)':>15}{'rows':>12}{'rows/s':>14}")
+    for name, m in stages.items():
+        base = baseline.get(name, {}).get('wall_s')
+        base = f"{base:.2f}" if base is not None else '-'
+        print(f"{name:<16}{m['wall_s']:>10.2f}{base:>10}{m['peak_rss_mb']:>15.0f}{m['rows']:>12,}{m['rows_per_s']:>14,.0f}")
+
+
+def run_benchmarks(stages=None, scale=1.0, dem_size=DEM_SIZE_PX, repeat=1, jobs=1, wall_threshold=WALL_THRESHOLD,
+                   rss_threshold=RSS_THRESHOLD, update_baseline=False, keep_run=False, bench_dir=BENCH_DIR):
+    """
+    Runs the benchmark stages on the fixture, appends the run to history.json and compares
+    it with the fixture's baseline (created on the first run). Returns the list of regressions.
+    """
+    params = fixture_params(scale=scale, dem_size=dem_size)
+    key = fixture_key(params)
+    fixture_dir = ensure_fixture(params, jobs=jobs, bench_dir=bench_dir)
+    order = stage_order(stages or list(BENCH_STAGES))
+
+    run_dir = tempfile.mkdtemp(prefix='run-', dir=bench_dir)
+    results = {}
+    try:
+        for name in order:
+            print(f"[Bench] {name}...", flush=True)
+            results[name] = run_stage(name, fixture_dir, run_dir, repeat)
+            m = results[name]
+            print(f"   -> {m['wall_s']:.2f}s, peak {m['peak_rss_mb']:.0f}MB, {m['rows_per_s']:,.0f} rows/s")
+    finally:
+        if not keep_run:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    baseline_path = os.path.join(bench_dir, os.path.basename(BASELINE_PATH))
+    history_path = os.path.join(bench_dir, os.path.basename(HISTORY_PATH))
+    baselines = read_json(baseline_path, {})
+    baseline = baselines.get(key, {}).get('stages', {})
+    regressions = find_regressions(results, baseline, wall_threshold, rss_threshold)
+    print_report(results, baseline)
+
+    entry = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': git_revision(),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'fixture': dict(params, key=key),
+        'repeat': repeat,
+        'stages': results,
+        'regressions': regressions,
+    }
+    history = read_json(history_path, [])
+    history.append(entry)
+    write_json(history_path, history)
+
+    if update_baseline or not baseline:
+        # 기존 baseline 의 다른 단계는 유지하고 이번에 측정한 단계만 교체
+        merged = dict(baseline, **results)
+        baselines[key] = {k: entry[k] for k in ('recorded_at', 'revision', 'host')}
+        baselines[key]['stages'] = merged
+        write_json(baseline_path, baselines)
+        print(f"\n[Bench] Baseline {'updated' if baseline else 'recorded'} for fixture {key} -> {baseline_path}")
+        return []
+
+    if regressions:
+        print("\n[Bench] REGRESSIONS against baseline:")
+        for message in regressions:
+            print(f"   - {message}")
+    else:
+        print(f"\n[Bench] No regressions (threshold: wall x{wall_threshold}, RSS x{rss_threshold})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on a Seoul-scale synthetic fixture")
+    parser.add_argument('--stages', nargs='*', default=None, choices=list(BENCH_STAGES),
+                        help="stages to time (upstream stages are run too; default: all)")
+    parser.add_argument('--scale', type=float, default=1.0, help="point density multiplier (1 = Seoul production volume)")
+    parser.add_argument('--dem-size', type=int, default=DEM_SIZE_PX, help="synthetic DEM width/height in pixels")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per stage, the fastest is recorded")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="processes for fixture generation")
+    parser.add_argument('--threshold', type=float, default=WALL_THRESHOLD, help="fail if wall time > baseline x threshold")
+    parser.add_argument('--rss-threshold', type=float, default=RSS_THRESHOLD, help="fail if peak RSS > baseline x threshold")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--keep-run', action='store_true', help="keep stage outputs and logs of this run")
+    args = parser.parse_args()
+
+    found = run_benchmarks(stages=args.stages, scale=args.scale, dem_size=args.dem_size, repeat=args.repeat, jobs=args.jobs,
+                           wall_threshold=args.threshold, rss_threshold=args.rss_threshold,
+                           update_baseline=args.update_baseline, keep_run=args.keep_run)
+    raise SystemExit(1 if found else 0)
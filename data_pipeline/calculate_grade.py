@@ -1,88 +1,60 @@
 import pandas as pd
 import numpy as np
 from aggregate_data import run_aggregation
-
-def normalize_series(series, is_negative=False):
-    """
-    Min-Max Scaling.
-    If is_negative is True, result is inverted (1 - scaled), so higher input means lower score.
-    """
-    min_val = series.min()
-    max_val = series.max()
-    
-    if max_val == min_val:
-        return pd.Series(1.0 if not is_negative else 0.0, index=series.index)
-        
-    scaled = (series - min_val) / (max_val - min_val)
-    if is_negative:
-        return 1.0 - scaled
-    return scaled
+from penalty_rules import rule_counts
+from scoring_engine import GRADE_LABELS, ScoringEngine, grade_codes, profile_grades
 
 def assign_grade(score, quantiles):
     """
     Assign Grade based on score percentile.
     quantiles: { 'A': 0.85, 'B': 0.55, 'C': 0.20 } -> These are cutoffs
     Score is assumed to be higher = better.
+    Vectorized: cutoff values of the population + searchsorted (missing score -> D).
+    """
+    values = np.asarray(score, dtype=float)
+    thresholds = np.nanquantile(values, [quantiles['C'], quantiles['B'], quantiles['A']])
+    grades = GRADE_LABELS[grade_codes(values[:, None], thresholds[None, :])[:, 0]]
+    if isinstance(score, pd.Series):
+        return pd.Series(grades, index=score.index, name=score.name)
+    return grades
+
+def grade_grid(df_grid):
+    """
+    Grades grid cells relative to the other cells of the same size.
+    A hierarchical_grid result (cell_size column) is graded level by level.
     """
-    # Just simple rank based assignment
-    # But usually we compare the score value against the percentile threshold values of the population
-    pass 
+    if 'cell_size' in df_grid.columns:
+        graded = [grade_grid(level.drop(columns='cell_size')) for _, level in df_grid.groupby('cell_size', sort=False)]
+        return df_grid.join(pd.concat(graded)[['safety_score', 'safety_grade', 'penalty_flags']])
+
+    df_grid = df_grid.copy()
+    # 격자 점수/등급은 격자 모집단 기준 (scoring_engine 의 default 가중치 + 과락 규칙)
+    df_grid['safety_score'], df_grid['safety_grade'], df_grid['penalty_flags'] = ScoringEngine(df_grid).default_grades()
+    return df_grid
 
-def calculate_grades():
-    # 1. Get Aggregated Data
+def calculate_grades(aggregation=None):
+    # 1. Get Aggregated Data (pipeline_dag 에서는 aggregation 단계 결과를 넘겨받음)
     print("1. Fetching Aggregated Data...")
-    df_admin, df_grid = run_aggregation()
+    if aggregation is None:
+        aggregation = run_aggregation()
+    df_admin, df_grid = aggregation
+    # 캐시된 단계 결과를 직접 수정하지 않도록 복사
+    df_admin = df_admin.copy()
+    df_grid = df_grid.copy() if df_grid is not None else None
     
     # Process Admin Level First
     print("\n2. Processing Admin District Grades...")
     
-    # 2. Normalization
-    # Indicators:
-    # - cctv_count (Positive)
-    # - harmful_count (Negative)
-    # - viol_rate (Negative)
-    # - avg_age (Negative)
-    
-    scores = pd.DataFrame(index=df_admin.index)
-    scores['norm_cctv'] = normalize_series(df_admin['cctv_count'], is_negative=False)
-    scores['norm_harm'] = normalize_series(df_admin['harmful_count'], is_negative=True)
-    scores['norm_viol'] = normalize_series(df_admin['viol_rate'], is_negative=True)
-    scores['norm_age'] = normalize_series(df_admin['avg_age'], is_negative=True)
-    
-    # 3. Weighted Score
-    # Weights: Safety(30%), Property(25%), Comfort(15%), Etc(10%)
-    # Total 80% mentioned, treating as sum score.
-    
-    w_safety = 0.30
-    w_prop = 0.25
-    w_comfort = 0.15
-    w_etc = 0.10
-    
-    scores['final_score'] = (
-        scores['norm_cctv'] * w_safety + 
-        scores['norm_viol'] * w_prop + 
-        scores['norm_harm'] * w_comfort + 
-        scores['norm_age'] * w_etc
-    )
-    
-    # 4. Grading
-    # A: Top 15% (85th percentile)
-    # B: Next 30% (55th percentile)
-    # C: Next 35% (20th percentile)
-    # D: Bottom 20%
-    
-    q85 = scores['final_score'].quantile(0.85)
-    q55 = scores['final_score'].quantile(0.55)
-    q20 = scores['final_score'].quantile(0.20)
-    
-    def get_grade(x):
-        if x >= q85: return 'A'
-        elif x >= q55: return 'B'
-        elif x >= q20: return 'C'
-        else: return 'D'
-        
-    df_admin['safety_score'] = scores['final_score'].round(3)
-    df_admin['safety_grade'] = scores['final_score'].apply(get_grade)
+    # 2. Normalization + 3. Weighted Score + 4. Grading (scoring_engine)
+    # Indicators: cctv_count (Positive), harmful_count / viol_rate / avg_age (Negative)
+    # Weights: Safety(30%), Property(25%), Comfort(15%), Etc(10%), Environment(10%)
+    # Grades: A >= q85, B >= q55, C >= q20, D otherwise
+    # Penalty (penalty_rules): 치안 하위 20%(40점 미만) -> D, 경사 -> 쾌적성 -30, 소음 -> 환경 -20
+    engine = ScoringEngine(df_admin)
+    df_admin['safety_score'], df_admin['safety_grade'], df_admin['penalty_flags'] = engine.default_grades()
+    print(f"   - Penalty rules fired: {rule_counts(engine.flags)}")
+    # 정규화 지표도 함께 반환 (export_data 의 scores 차트용)
+    df_admin = df_admin.join(engine.norm_frame())
     
     print("\n[Admin Safety Grades]")
     print(df_admin[['cctv_count', 'viol_rate', 'safety_score', 'safety_grade']].sort_values('safety_score', ascending=False))
@@ -90,43 +62,30 @@ def calculate_grades():
     # Process Grid Level if exists
     if df_grid is not None:
         print("\n3. Processing Grid Cell Grades (Target Zones)...")
-        # Same logic for grids
-        g_scores = pd.DataFrame(index=df_grid.index)
-        g_scores['norm_cctv'] = normalize_series(df_grid['cctv_count'], is_negative=False)
-        g_scores['norm_viol'] = normalize_series(df_grid['viol_rate'], is_negative=True)
-        g_scores['norm_age'] = normalize_series(df_grid['avg_age'], is_negative=True)
-        # Grid usually doesn't have harmful count in this simple mock, assuming 0 or add logic. 
-        # Using 0 for harmful if col missing or just omit weight?
-        # Let's assume defaults for now.
-        
-        g_scores['final_score'] = (
-            g_scores['norm_cctv'] * w_safety + 
-            g_scores['norm_viol'] * w_prop + 
-            # Comfort missing in grid aggregation previously? Let's check logic.
-            # aggregate_data.py didn't map harmful_count to grid.
-            # We'll skip comfort for grid or treat as 0 (perfect score).
-            (1.0 * w_comfort) + 
-            g_scores['norm_age'] * w_etc
-        )
-        
-        # Grid Grading Thresholds might be different or same? Using relative to Grid population
-        ga_q85 = g_scores['final_score'].quantile(0.85)
-        ga_q55 = g_scores['final_score'].quantile(0.55)
-        ga_q20 = g_scores['final_score'].quantile(0.20)
-        
-        def get_grid_grade(x):
-            if x >= ga_q85: return 'A'
-            elif x >= ga_q55: return 'B'
-            elif x >= ga_q20: return 'C'
-            else: return 'D'
-
-        df_grid['safety_score'] = g_scores['final_score'].round(3)
-        df_grid['safety_grade'] = g_scores['final_score'].apply(get_grid_grade)
+        df_grid = grade_grid(df_grid)
         
         print("\n[Grid Safety Grades Preview]")
         print(df_grid[['ADM_NM', 'cctv_count', 'safety_score', 'safety_grade']].head())
     
     return df_admin, df_grid
 
+def calculate_profile_grades(aggregation=None, grid_hierarchy=None):
+    """
+    Personalized grades (default + 16 MBTI types) for every 행정동 and every grid cell,
+    precomputed in one matrix multiply per population.
+    Returns (admin grades indexed by ADM_NM, grid grades with cell_size/ADM_NM/cell_id) or None parts.
+    """
+    if aggregation is None:
+        aggregation = run_aggregation()
+    df_admin, _ = aggregation
+    admin_profiles = profile_grades(df_admin)
+    grid_profiles = None
+    if grid_hierarchy is not None:
+        keys = grid_hierarchy[['cell_size', 'ADM_NM', 'cell_id']]
+        grid_profiles = pd.concat([pd.DataFrame(keys), profile_grades(grid_hierarchy)], axis=1)
+    print(f"   -> {admin_profiles.shape[1]} profiles graded for {len(admin_profiles)} districts"
+          + (f" and {len(grid_profiles)} grid cells" if grid_profiles is not None else ""))
+    return admin_profiles, grid_profiles
+
 if __name__ == "__main__":
     calculate_grades()
@@ -0,0 +1,156 @@
+"""
+District Locator (Point -> 행정동 / 격자 칸)
+Project: Tenant Note - Safety Grade Analysis
+
+경계 레이어로 한 번 만들어 두고 (디스크 캐시) 좌표 배열을 받아 ADM_CD 와 격자 cell id 를 한 번에 돌려준다.
+집계, export, 매물 업로드가 각자 gpd.sjoin 을 다시 하지 않고 이 객체를 공유한다.
+
+- 1차: 250m 격자 (grid_lattice) 중 폴리곤 하나에 완전히 들어가고 다른 폴리곤과는 닿지 않는 칸
+  -> 칸 번호만으로 바로 결정
+- 2차: 나머지 점만 STRtree 후보 + prepared 폴리곤 contains_properly 검사
+  (sjoin predicate='within' 과 같음, 경계선 위의 점은 제외)
+- 입력 좌표는 EPSG:5179 또는 임의의 CRS (예: WGS84 경위도) -> 내부에서 EPSG:5179 로 변환
+- pickle 가능 (STRtree / prepared geometry 는 로드 시 다시 생성)
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+from grid_lattice import DEFAULT_CELL_SIZE, grid_for_geometries, cell_polygons, point_cell_ids
+from schema_config import CRS_ANALYSIS
+
+LOCATOR_CACHE_DIR = os.path.join(os.getcwd(), 'data', 'derived', 'locator')
+COARSE_CELL_SIZE = 250  # 1차 필터 격자 크기 (m)
+
+_transformers = {}
+
+
+def _to_analysis(x, y, crs):
+    """Coordinates in crs -> EPSG:5179 (transformer cached per CRS)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if crs is None or CRS.from_user_input(crs) == CRS.from_user_input(CRS_ANALYSIS):
+        return x, y
+    key = CRS.from_user_input(crs).to_string()
+    if key not in _transformers:
+        _transformers[key] = Transformer.from_crs(crs, CRS_ANALYSIS, always_xy=True)
+    return _transformers[key].transform(x, y)
+
+
+class DistrictLocator:
+    def __init__(self, boundaries, coarse_size=COARSE_CELL_SIZE):
+        gdf = boundaries.to_crs(CRS_ANALYSIS) if boundaries.crs is not None else boundaries
+        self.adm_cd = gdf['ADM_CD'].astype(str).to_numpy(dtype=object)
+        self.adm_nm = gdf['ADM_NM'].astype(str).to_numpy(dtype=object)
+        self.geoms = np.asarray(gdf.geometry.values, dtype=object)
+        self.coarse_size = coarse_size
+
+        # 폴리곤 내부에 완전히 들어가는 coarse 칸 -> 폴리곤 번호 (정렬된 배열, searchsorted 로 조회)
+        # 겹치는 폴리곤이 있으면 칸 안의 점마다 답이 다를 수 있으므로 폴리곤 하나와만 닿는 칸만 사용
+        geom_idx, cell_ids = grid_for_geometries(self.geoms, coarse_size)
+        unique_ids, counts = np.unique(cell_ids, return_counts=True)
+        single = counts[np.searchsorted(unique_ids, cell_ids)] == 1
+        inside = single & shapely.contains_properly(self.geoms[geom_idx], cell_polygons(cell_ids, coarse_size))
+        order = np.argsort(cell_ids[inside], kind='stable')
+        self.interior_cells = cell_ids[inside][order]
+        self.interior_geom = geom_idx[inside][order]
+        self._build_index()
+
+    def _build_index(self):
+        shapely.prepare(self.geoms)
+        self.tree = shapely.STRtree(self.geoms)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('tree', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_index()
+
+    def __len__(self):
+        return len(self.geoms)
+
+    def locate_index(self, x, y, crs=CRS_ANALYSIS):
+        """Row position in the boundary layer for every point (-1 if in no district)"""
+        x, y = _to_analysis(x, y, crs)
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        result = np.full(len(x), -1, dtype=np.int64)
+        if len(x) == 0:
+            return result
+
+        # 1차: coarse 칸 번호로 바로 결정
+        coarse = point_cell_ids(x, y, self.coarse_size)
+        if len(self.interior_cells):
+            pos = np.minimum(np.searchsorted(self.interior_cells, coarse), len(self.interior_cells) - 1)
+            hit = self.interior_cells[pos] == coarse
+            result[hit] = self.interior_geom[pos[hit]]
+        else:
+            hit = np.zeros(len(x), dtype=bool)
+
+        # 2차: 나머지 점만 STRtree (bbox) -> prepared polygon 의 contains_properly (= 점이 내부에 있음)
+        rest = np.flatnonzero(~hit)
+        if len(rest):
+            points = shapely.points(x[rest], y[rest])
+            point_idx, geom_idx = self.tree.query(points)
+            inside = shapely.contains_properly(self.geoms[geom_idx], points[point_idx])
+            point_idx, geom_idx = point_idx[inside], geom_idx[inside]
+            # 겹치는 폴리곤이 있으면 번호가 작은 쪽 (역순으로 써서 첫 번째가 남도록)
+            order = np.lexsort((-geom_idx, point_idx))
+            result[rest[point_idx[order]]] = geom_idx[order]
+        return result
+
+    def locate(self, x, y, crs=CRS_ANALYSIS, cell_size=DEFAULT_CELL_SIZE):
+        """
+        (ADM_CD, cell_id) arrays for the points: ADM_CD is None outside every district,
+        cell_id is the grid_lattice id of the cell_size cell (EPSG:5179 lattice).
+        """
+        x, y = _to_analysis(x, y, crs)
+        idx = self.locate_index(x, y)
+        return self.codes_for(idx), point_cell_ids(x, y, cell_size)
+
+    def codes_for(self, idx):
+        return np.where(idx >= 0, self.adm_cd[np.maximum(idx, 0)], None)
+
+    def names_for(self, idx):
+        return np.where(idx >= 0, self.adm_nm[np.maximum(idx, 0)], None)
+
+    def locate_points(self, points):
+        """locate_index for a point GeoDataFrame in any CRS"""
+        return self.locate_index(points.geometry.x.to_numpy(), points.geometry.y.to_numpy(), crs=points.crs)
+
+
+def _locator_key(boundaries, coarse_size):
+    h = hashlib.sha1(f"coarse={coarse_size}|crs={boundaries.crs}".encode())
+    h.update('|'.join(boundaries['ADM_CD'].astype(str)).encode())
+    h.update('|'.join(boundaries['ADM_NM'].astype(str)).encode())
+    for wkb in shapely.to_wkb(np.asarray(boundaries.geometry.values, dtype=object)):
+        h.update(wkb)
+    return h.hexdigest()[:16]
+
+
+def load_locator(boundaries, coarse_size=COARSE_CELL_SIZE, cache_dir=LOCATOR_CACHE_DIR):
+    """DistrictLocator for the boundary layer, pickled on disk and reused while the boundaries are unchanged"""
+    path = os.path.join(cache_dir, f"locator-{_locator_key(boundaries, coarse_size)}.pkl")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    print(f"   - Building district locator ({len(boundaries)} polygons)...")
+    locator = DistrictLocator(boundaries, coarse_size)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 스레드/프로세스마다 다른 임시 파일 (동시에 빌드해도 서로 덮어쓰지 않도록)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.pkl.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(locator, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return locator
@@ -1,150 +1,140 @@
-import geopandas as gpd
-import pandas as pd
-import json
+import numpy as np
 import os
-from calculate_grade import calculate_grades
+import shapely
+from pipeline_dag import read_default, run_default
 from schema_config import CRS_OUTPUT
+from geojson_writer import DEFAULT_PRECISION, geometry_json, write_feature_collection
+from vector_tiles import make_layer, write_pmtiles
+from hierarchical_grid import LEVEL_ZOOMS
+from district_locator import load_locator
 
-def export_geojson():
+SCORE_COLUMNS = {
+    # frontend key: normalized indicator (0~1) -> x100 for the chart
+    "safety": 'norm_cctv',
+    "comfort": 'norm_harm',
+    "living": 'norm_viol',  # Property/Living
+    "infra": 'norm_age',
+}
+
+def group_point_coords(keys, coords, precision=DEFAULT_PRECISION):
+    """
+    {key: [[lng, lat], ...]} in one pass: a single sort by key,
+    then the coordinate array is split per key.
+    """
+    if len(keys) == 0:
+        return {}
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    coords = np.round(np.asarray(coords, dtype=float)[order], precision)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return {k: c.tolist() for k, c in zip(keys[starts], np.split(coords, starts[1:]))}
+
+def export_geojson(precision=DEFAULT_PRECISION, gzip_copy=False):
     print("1. Calculating Grades...")
-    df_admin, df_grid = calculate_grades()
-    
-    print("\n2. Transforming to WGS84 (EPSG:4326)...")
-    # Reproject geometry
-    df_admin_wgs = df_admin.to_crs(CRS_OUTPUT)
-    
-    # Grid is optional, but if used, reproject too
-    if df_grid is not None:
-        df_grid_wgs = df_grid.to_crs(CRS_OUTPUT)
-    
-    print("3.ructuring GeoJSON Properties...")
-    features = []
-    
-    # Iterate over Admin Polygons
-    for idx, row in df_admin_wgs.iterrows():
-        # Basic Properties
-        props = {
-            "adm_id": str(idx), # ADM_CD probably index? or col? calculate_grade preserves index which is from aggregate_data
-            # In aggregation, index was not set explicitly to CD, but group by ADM_NM creates index ADM_NM?
-            # Let's check keys. In aggregate_data: groupby('ADM_NM').
-            # So index is ADM_NM.
-            "adm_nm": row.name, # Index name
-            "grade": row['safety_grade'],
-            "final_score": float(row['safety_score']),
-            "is_target": bool(row['is_target_zone']) if 'is_target_zone' in row else False 
-            # Note: aggregate_data groupby might have lost non-aggregated cols like is_target_zone.
-            # We need to recover it.
-            # aggregate_data joins points to boundaries, then groups by ADM_NM.
-            # boundaries itself has is_target_zone. 
-            # We should probably merge back with boundaries to get is_target_zone or keep it during agg.
-            # The current aggregate_data returns df_admin which is just stats. 
-            # Wait, calculate_grades returns df_admin with stats.
-            # Geometry is lost in df_admin stats? 
-            # Review aggregate_data.py: 
-            # agg_cctv, agg_infra, agg_bld are Series/DFs. 
-            # final_stats = concat... -> geometry is lost! 
-            # This is a Logic Gap in previous steps. 
-            # We need geometry from boundaries.
-        }
-        
-        # Recover Geometry & Static Props
-        # Ideally aggregate_data should have returned geo-aggregated df. 
-        # But we can recover by joining with original boundaries if available.
-        # Since I can't easily modify previous scripts in this one-shot without re-writing them or importing boundaries again.
-        # I will import boundaries again here.
-    
-    print("   -> (Refetching boundaries to restore geometry)...")
-    from load_boundaries import process_boundaries
-    boundaries = process_boundaries()
-    # boundaries has ADM_NM, geometry, is_target_zone
-    
-    # Merge stats (df_admin) into boundaries
-    # df_admin index is ADM_NM
+    # boundaries / mock points / grades 는 pipeline_dag 에서 한 번만 계산 (캐시 재사용)
+    stages = run_default('grades', 'boundaries')
+    df_admin, _ = stages['grades']
+    # We only need CCTV for visualization as requested -> CCTV part, geometry column only
+    cctv = read_default('mock_points', part=0, columns=['geometry'])
+
+    output_dir = "../data" # Relative to data_pipeline/
+    output_path = os.path.join(output_dir, "seoul_hybrid_data.json")
+    write_hybrid_geojson(stages['boundaries'], df_admin, cctv, output_path, precision=precision, gzip_copy=gzip_copy)
+    print("Done.")
+
+def write_hybrid_geojson(boundaries, df_admin, cctv, output_path, precision=DEFAULT_PRECISION, gzip_copy=False):
+    """
+    Writes the web map GeoJSON: one feature per 행정동 with grade / scores / stats,
+    plus CCTV coordinates for the target zones. Returns the number of features.
+    """
+    print("\n2. Restoring geometry & transforming to WGS84 (EPSG:4326)...")
+    # df_admin index is ADM_NM; geometry and is_target_zone come from the boundaries stage
     merged = boundaries.merge(df_admin, left_on='ADM_NM', right_index=True, how='left')
     merged_wgs = merged.to_crs(CRS_OUTPUT)
 
-    print("   -> (Generating Mock Points for Detailed View)...")
-    from generate_mock_points import generate_mock_dataset
-    # We only need CCTV for visualization as requested
-    cctv_gdf, _, _ = generate_mock_dataset()
-    cctv_wgs = cctv_gdf.to_crs(CRS_OUTPUT)
-    
-    # Pre-assign points to admin districts for faster lookup? 
-    # Or just spatial join?
-    # Spatial join is better.
-    cctv_joined = gpd.sjoin(cctv_wgs, merged_wgs[['geometry', 'ADM_NM']], how='inner', predicate='within')
-    
-    # Now construct output features
-    output_geojson = {
-        "type": "FeatureCollection",
-        "features": []
-    }
-    
-    for _, row in merged_wgs.iterrows():
-        # Detail Data for Target Zones
-        if row['is_target_zone']:
-            # Fetch raw points for this area
-            # Note: This is inefficient to regenerate random points every time if we wanted persistence, 
-            # but for this mock pipeline it's acceptable. Ideally we should have saved intermediate points.
-            # To avoid re-generating different points than aggregation used (if random), we really should have saved them.
-            # But `aggregate_data` didn't save points to disk. 
-            # So I will re-call generate_mock_dataset() ONCE outside the loop or mock it here?
-            # Better: generate_mock_dataset() returns ALL points. I can filter them by geometry.
-            
-            # Since I can't easily change the architecture to save intermediate files now, 
-            # I will trust that for this demo, regenerating or filtering from a global generation is fine.
-            # Let's assume we generated them once at start of this function.
-            pass # Logic moved to outside loop for efficiency
+    print("3. Structuring GeoJSON Properties...")
+    is_target = merged_wgs['is_target_zone'].fillna(False).to_numpy(dtype=bool)
+    # 점 -> 행정동 은 공유 locator 로 (EPSG:5179 에서 판정), 좌표는 WGS84 로 출력
+    cctv_idx = load_locator(boundaries).locate_points(cctv)
+    keep = cctv_idx >= 0
+    keep[keep] = boundaries['is_target_zone'].to_numpy(dtype=bool)[cctv_idx[keep]]
+    cctv_wgs = shapely.get_coordinates(cctv[keep].to_crs(CRS_OUTPUT).geometry.values)
+    cctv_by_adm = group_point_coords(boundaries['ADM_NM'].to_numpy()[cctv_idx[keep]], cctv_wgs, precision)
+
+    # Properties column-wise (행 단위 접근 없음)
+    adm_nm = merged_wgs['ADM_NM'].tolist()
+    grade = merged_wgs['safety_grade'].astype(object).where(merged_wgs['safety_grade'].notna(), None).tolist()
+    scores = {key: (merged_wgs[col] * 100).tolist() for key, col in SCORE_COLUMNS.items()}
+    cctv = merged_wgs['cctv_count'].fillna(0).astype(int).tolist()
+    infra = merged_wgs['infra_count'].fillna(0).astype(int).tolist()
+    viol_rate = merged_wgs['viol_rate'].tolist()
+    geometry = geometry_json(merged_wgs.geometry.values, precision)
 
-        
-        feature = {
-            "type": "Feature",
-            "geometry": row['geometry'].__geo_interface__,
-            "properties": {
-                "adm_nm": row['ADM_NM'],
-                "grade": row['safety_grade'],
-                "is_target": bool(row['is_target_zone']),
-                "scores": {
-                    "safety": float(row['norm_cctv']) * 100, # Approx scale to 100 for chart
-                    "comfort": float(row['norm_harm']) * 100,
-                    "living": float(row['norm_viol']) * 100, # Property/Living? Map to frontend keys
-                    "infra": float(row['norm_age']) * 100 # Approx
-                },
-                "stats": {
-                    "cctv": int(row['cctv_count']),
-                    "infra": int(row['infra_count']),
-                    "viol_rate": float(row['viol_rate'])
-                },
-                "detail_data": {
-                    "cctv": []
+    def iter_features():
+        for i in range(len(merged_wgs)):
+            yield {
+                "geometry": geometry[i],
+                "properties": {
+                    "adm_nm": adm_nm[i],
+                    "grade": grade[i],
+                    "is_target": bool(is_target[i]),
+                    "scores": {key: values[i] for key, values in scores.items()},
+                    "stats": {
+                        "cctv": cctv[i],
+                        "infra": infra[i],
+                        "viol_rate": viol_rate[i],
+                    },
+                    # Detail Data (CCTV 좌표) only for target zones
+                    "detail_data": {
+                        "cctv": cctv_by_adm.get(adm_nm[i], []) if is_target[i] else []
+                    }
                 }
             }
-        }
-        
-        # Populate Detail Data if Target
-        if row['is_target_zone']:
-             # Filter cctv for this district
-             local_cctv = cctv_joined[cctv_joined['ADM_NM'] == row['ADM_NM']]
-             # Extract coordinates
-             coords = []
-             for _, pt in local_cctv.iterrows():
-                 coords.append([pt.geometry.x, pt.geometry.y]) # lng, lat
-             feature["properties"]["detail_data"]["cctv"] = coords
-             
-        output_geojson["features"].append(feature)
 
     # 4. Save
-    output_dir = "../data" # Relative to data_pipeline/
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        
-    output_path = os.path.join(output_dir, "seoul_hybrid_data.json")
     print(f"\n4. Saving to {output_path}...")
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_geojson, f, ensure_ascii=False, indent=2)
-        
+    count = write_feature_collection(output_path, iter_features(), precision=precision, gzip_copy=gzip_copy)
+    print(f"   -> {count} features ({os.path.getsize(output_path) / 1024:.1f} KB)")
+    return count
+
+def export_tiles(output_path=None):
+    """
+    Zoom-pyramided vector tiles (PMTiles) for the 행정동 choropleth and the grid cells.
+    Each grid level (hierarchical_grid) is its own layer, shown only in its LEVEL_ZOOMS range,
+    so the map switches from 500m to 50m cells while zooming in.
+    """
+    print("1. Calculating Grades...")
+    stages = run_default('grades', 'boundaries', 'grid_grades')
+    df_admin, _ = stages['grades']
+    output_path = output_path or os.path.join("../data", "seoul_hybrid_data.pmtiles")
+    write_tile_archive(stages['boundaries'], df_admin, stages['grid_grades'], output_path)
     print("Done.")
 
+def write_tile_archive(boundaries, df_admin, grid_grades, output_path):
+    """District layer + one layer per grid level into a PMTiles archive. Returns the number of tiles."""
+    merged = boundaries.merge(df_admin, left_on='ADM_NM', right_index=True, how='left')
+
+    print("2. Building vector tiles...")
+    layers = [make_layer('districts', merged, ['ADM_CD', 'ADM_NM', 'safety_grade', 'safety_score',
+                                               'cctv_count', 'infra_count', 'viol_rate', 'is_target_zone'])]
+    for cell_size, level in grid_grades.groupby('cell_size'):
+        min_zoom, max_zoom = LEVEL_ZOOMS[cell_size]
+        layers.append(make_layer(f'grid_{cell_size}m', level, ['cell_id', 'ADM_NM', 'safety_grade', 'safety_score',
+                                                               'cctv_count', 'viol_rate', 'avg_age'],
+                                 min_zoom=min_zoom, max_zoom=max_zoom))
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    return write_pmtiles(layers, output_path)
+
 if __name__ == "__main__":
-    export_geojson()
+    import argparse
+    parser = argparse.ArgumentParser(description="Export grades for the web map")
+    parser.add_argument('--tiles', action='store_true', help="write a PMTiles vector tile archive instead of GeoJSON")
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help="coordinate decimals (6 = ~10cm)")
+    parser.add_argument('--gzip', action='store_true', help="also write a precompressed .gz copy")
+    args = parser.parse_args()
+    if args.tiles:
+        export_tiles()
+    else:
+        export_geojson(precision=args.precision, gzip_copy=args.gzip)
@@ -1,25 +1,71 @@
 import geopandas as gpd
 import pandas as pd
 import numpy as np
-from shapely.geometry import Point
+import shapely
 from load_boundaries import process_boundaries
 from schema_config import CRS_ANALYSIS, BuildingSchema, LicenseSchema, CCTVSchema
 
-def generate_random_points_in_polygon(polygon, num_points):
+# 재현 가능한 mock 데이터를 위한 기본 seed
+MOCK_SEED = 2026
+# rng 를 넘기지 않은 호출이 함께 쓰는 난수열 (프로세스마다 한 번만 seed -> 호출마다 다른 점, 실행마다 같은 결과)
+_DEFAULT_RNG = np.random.default_rng(MOCK_SEED)
+
+def generate_random_points_in_polygon(polygon, num_points, rng=None, max_rounds=50):
     """
-    Generate random points within a polygon.
+    Generate random points within a polygon (batch rejection sampling).
+    Candidates are drawn in numpy batches from the bounding box and tested at once
+    with shapely.contains_xy on the prepared polygon. The batch size is scaled by the
+    polygon area / bbox area ratio, so thin or concave polygons need only a few rounds.
+    rng defaults to a module-level Generator seeded once with MOCK_SEED, so repeated
+    calls give different points and a run gives the same sequence every time.
+    The polygon is only prepared for the duration of the call.
+    Returns (x, y) float arrays.
     """
-    points = []
+    rng = rng if rng is not None else _DEFAULT_RNG
     min_x, min_y, max_x, max_y = polygon.bounds
-    while len(points) < num_points:
-        random_point = Point([np.random.uniform(min_x, max_x), np.random.uniform(min_y, max_y)])
-        if random_point.within(polygon):
-            points.append(random_point)
-    return points
+    bbox_area = (max_x - min_x) * (max_y - min_y)
+    hit_ratio = polygon.area / bbox_area if bbox_area > 0 else 0.0
+    if num_points > 0 and hit_ratio <= 0:
+        raise ValueError("Cannot sample points inside an empty or degenerate polygon")
+    # 호출한 쪽의 geometry 상태를 바꾸지 않도록, 원래 prepared 가 아니었으면 끝나고 해제
+    was_prepared = shapely.is_prepared(polygon)
+    shapely.prepare(polygon)
+    try:
+        xs, ys = [], []
+        found = 0
+        for _ in range(max_rounds):
+            need = num_points - found
+            if need <= 0:
+                break
+            # 기대 적중률로 필요한 후보 수를 잡고 20% 여유
+            n = int(need / max(hit_ratio, 1e-4) * 1.2) + 16
+            cand_x = rng.uniform(min_x, max_x, n)
+            cand_y = rng.uniform(min_y, max_y, n)
+            inside = shapely.contains_xy(polygon, cand_x, cand_y)
+            xs.append(cand_x[inside][:need])
+            ys.append(cand_y[inside][:need])
+            found += len(xs[-1])
+    finally:
+        if not was_prepared:
+            shapely.destroy_prepared(polygon)
+    if found < num_points:
+        raise ValueError(f"Only sampled {found}/{num_points} points after {max_rounds} rounds")
+    if not xs:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(xs), np.concatenate(ys)
+
+def _to_point_gdf(frames):
+    """Concatenates per-district frames with x/y columns into a point GeoDataFrame"""
+    df = pd.concat(frames, ignore_index=True)
+    geometry = gpd.points_from_xy(df.pop('x'), df.pop('y'), crs=CRS_ANALYSIS)
+    return gpd.GeoDataFrame(df, geometry=geometry, crs=CRS_ANALYSIS)
 
-def generate_mock_dataset():
-    # 1. Load Boundaries (EPSG:5179)
-    boundaries = process_boundaries()
+def generate_mock_dataset(boundaries=None, seed=MOCK_SEED):
+    """Mock CCTV / infra / building points per district. The same seed gives the same dataset."""
+    # 1. Load Boundaries (EPSG:5179) - pipeline_dag 에서는 이미 로드된 boundaries 를 넘겨받음
+    if boundaries is None:
+        boundaries = process_boundaries()
+    rng = np.random.default_rng(seed)
     
     cctv_list = []
     infra_list = []
@@ -46,53 +92,46 @@ def generate_mock_dataset():
         print(f" -> Generating for {adm_nm} (Target: {is_target}): CCTV={c_count}, Infra={i_count}, Bld={b_count}")
         
         # --- 1. CCTV Data ---
-        points = generate_random_points_in_polygon(poly, c_count)
-        for p in points:
-            cctv_list.append({
-                'geometry': p,
-                CCTVSchema.INSTALL_PURPOSE: np.random.choice(['방범용', '다목적', '교통단속용'], p=[0.8, 0.1, 0.1]),
-                'adm_nm': adm_nm
-                # lat/lon columns are usually for WGS84, but we keep geometry in 5179. 
-                # If needed, we can project back to WGS84 to fill these columns, 
-                # but for analysis, geometry is key.
-            })
+        x, y = generate_random_points_in_polygon(poly, c_count, rng)
+        cctv_list.append(pd.DataFrame({
+            'x': x, 'y': y,
+            CCTVSchema.INSTALL_PURPOSE: rng.choice(['방범용', '다목적', '교통단속용'], size=c_count, p=[0.8, 0.1, 0.1]),
+            'adm_nm': adm_nm,
+            # lat/lon columns are usually for WGS84, but we keep geometry in 5179.
+            # If needed, we can project back to WGS84 to fill these columns,
+            # but for analysis, geometry is key.
+        }))
 
         # --- 2. Infrastructure Data (License) ---
-        points = generate_random_points_in_polygon(poly, i_count)
+        x, y = generate_random_points_in_polygon(poly, i_count, rng)
         types = ['편의점', '일반음식점', '단란주점', '병원', '약국']
-        for p in points:
-            infra_list.append({
-                'geometry': p,
-                LicenseSchema.TRD_STATE_GBN: '01', # 영업중만 생성
-                'category': np.random.choice(types),
-                'adm_nm': adm_nm
-            })
+        infra_list.append(pd.DataFrame({
+            'x': x, 'y': y,
+            LicenseSchema.TRD_STATE_GBN: '01', # 영업중만 생성
+            'category': rng.choice(types, size=i_count),
+            'adm_nm': adm_nm,
+        }))
 
         # --- 3. Building Data ---
-        points = generate_random_points_in_polygon(poly, b_count)
-        for p in points:
-            # Random Year 1990-2024
-            year = np.random.randint(1990, 2025)
-            month = np.random.randint(1, 13)
-            day = np.random.randint(1, 29)
-            date_str = f"{year}{month:02d}{day:02d}"
-            
-            # Violate Y/N (Target Area might have slightly more? Random for now)
-            is_viol = 'N'
-            if np.random.random() < 0.1: # 10% Violation rate
-                is_viol = 'Y'
-
-            building_list.append({
-                'geometry': p,
-                BuildingSchema.USE_APR_DAY: date_str,
-                BuildingSchema.VIOL_BLD_YN: is_viol,
-                'adm_nm': adm_nm
-            })
+        x, y = generate_random_points_in_polygon(poly, b_count, rng)
+        # Random Year 1990-2024
+        year = rng.integers(1990, 2025, size=b_count)
+        month = rng.integers(1, 13, size=b_count)
+        day = rng.integers(1, 29, size=b_count)
+        date_str = (year * 10000 + month * 100 + day).astype(str)
+        # Violate Y/N (Target Area might have slightly more? Random for now)
+        is_viol = np.where(rng.random(b_count) < 0.1, 'Y', 'N') # 10% Violation rate
+        building_list.append(pd.DataFrame({
+            'x': x, 'y': y,
+            BuildingSchema.USE_APR_DAY: date_str,
+            BuildingSchema.VIOL_BLD_YN: is_viol,
+            'adm_nm': adm_nm,
+        }))
 
     # Convert to GeoDataFrames
-    gdf_cctv = gpd.GeoDataFrame(cctv_list, crs=CRS_ANALYSIS)
-    gdf_infra = gpd.GeoDataFrame(infra_list, crs=CRS_ANALYSIS)
-    gdf_bld = gpd.GeoDataFrame(building_list, crs=CRS_ANALYSIS)
+    gdf_cctv = _to_point_gdf(cctv_list)
+    gdf_infra = _to_point_gdf(infra_list)
+    gdf_bld = _to_point_gdf(building_list)
     
     print(f"\n[Generation Complete]")
     print(f"Total CCTV: {len(gdf_cctv)}")
@@ -0,0 +1,137 @@
+"""
+Streaming Compact GeoJSON Writer
+Project: Tenant Note - Safety Grade Analysis
+
+FeatureCollection 전체를 dict 로 만들지 않고 feature 를 하나씩 파일에 바로 쓴다.
+- 공백 없는 구분자 (indent 없음), 한글은 그대로 (ensure_ascii=False)
+- 좌표는 precision 자리로 반올림 (6자리 ~ 10cm) 후 shapely.to_geojson 으로 일괄 직렬화
+- gzip_copy=True 면 같은 내용을 <path>.gz 로 동시에 기록 (서버에서 바로 Content-Encoding: gzip 으로 제공)
+- 메모리 사용량은 CHUNK_ROWS 행 분량으로 고정
+"""
+import gzip
+import io
+import json
+import os
+
+import numpy as np
+import shapely
+
+DEFAULT_PRECISION = 6
+CHUNK_ROWS = 10_000
+
+_SEPARATORS = (',', ':')
+
+
+def _json_default(value):
+    """numpy 스칼라/배열 처리"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _nan_to_none(value):
+    """NaN -> None (JSON null) in nested dict/list properties"""
+    if isinstance(value, dict):
+        return {k: _nan_to_none(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_nan_to_none(v) for v in value]
+    if isinstance(value, (float, np.floating)) and np.isnan(value):
+        return None
+    return value
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=_SEPARATORS, default=_json_default)
+
+
+def round_coords(coords, precision=DEFAULT_PRECISION):
+    """Array-like of coordinates -> nested lists rounded to precision decimals"""
+    return np.round(np.asarray(coords, dtype=float), precision).tolist()
+
+
+def geometry_json(geoms, precision=DEFAULT_PRECISION):
+    """GeoJSON geometry strings for an array of shapely geometries ('null' for missing)"""
+    geoms = np.asarray(geoms, dtype=object)
+    rounded = shapely.transform(geoms, lambda c: np.round(c, precision))
+    out = shapely.to_geojson(rounded)
+    out[shapely.is_missing(geoms)] = 'null'
+    return out
+
+
+def _feature_json(geometry, properties, precision):
+    if geometry is None or isinstance(geometry, str):
+        geom = geometry or 'null'
+    elif isinstance(geometry, dict):
+        geom = dumps(geometry)
+    else:
+        geom = geometry_json([geometry], precision)[0]
+    return '{"type":"Feature","geometry":' + geom + ',"properties":' + dumps(properties) + '}'
+
+
+def iter_gdf_features(gdf, properties=None, precision=DEFAULT_PRECISION, chunk_rows=CHUNK_ROWS):
+    """Feature JSON strings for every row of gdf, built CHUNK_ROWS rows at a time"""
+    columns = [c for c in (properties or gdf.columns) if c != gdf.geometry.name]
+    for start in range(0, len(gdf), chunk_rows):
+        chunk = gdf.iloc[start:start + chunk_rows]
+        geoms = geometry_json(chunk.geometry.values, precision)
+        # NaN 은 JSON null 로
+        records = chunk[columns].astype(object).where(chunk[columns].notna(), None).to_dict('records')
+        for geom, props in zip(geoms, records):
+            yield _feature_json(geom, props, precision)
+
+
+class _TeeWriter:
+    """Writes the same text to the output file and (optionally) a gzip sibling"""
+    def __init__(self, path, gzip_copy):
+        self.paths = [path] + ([path + '.gz'] if gzip_copy else [])
+        self.files = [open(path + '.tmp', 'w', encoding='utf-8')]
+        if gzip_copy:
+            raw = gzip.GzipFile(path + '.gz.tmp', 'wb', compresslevel=9, mtime=0)
+            self.files.append(io.TextIOWrapper(raw, encoding='utf-8'))
+
+    def write(self, text):
+        for f in self.files:
+            f.write(text)
+
+    def close(self, ok=True):
+        for f in self.files:
+            f.close()
+        for path in self.paths:
+            if ok:
+                os.replace(path + '.tmp', path)
+            elif os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+
+
+def write_feature_collection(path, features, precision=DEFAULT_PRECISION, gzip_copy=False):
+    """
+    Streams features to a compact GeoJSON FeatureCollection.
+    features: iterable of feature JSON strings (iter_gdf_features) or of
+    {'geometry': shapely geometry | GeoJSON dict, 'properties': {...}} dicts.
+    Returns the number of features written.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    out = _TeeWriter(path, gzip_copy)
+    count = 0
+    try:
+        out.write('{"type":"FeatureCollection","features":[')
+        for feature in features:
+            if not isinstance(feature, str):
+                properties = _nan_to_none(feature.get('properties', {}))
+                feature = _feature_json(feature.get('geometry'), properties, precision)
+            out.write(feature if count == 0 else ',' + feature)
+            count += 1
+        out.write(']}')
+    except BaseException:
+        out.close(ok=False)
+        raise
+    out.close()
+    return count
+
+
+def write_gdf(gdf, path, properties=None, precision=DEFAULT_PRECISION, gzip_copy=False):
+    """GeoDataFrame (already in the output CRS) -> compact GeoJSON file"""
+    return write_feature_collection(path, iter_gdf_features(gdf, properties, precision),
+                                    precision=precision, gzip_copy=gzip_copy)
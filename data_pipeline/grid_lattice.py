@@ -0,0 +1,83 @@
+"""
+Global Grid Lattice (EPSG:5179)
+Project: Tenant Note - Safety Grade Analysis
+
+모든 격자는 EPSG:5179 원점(0, 0)에 맞춘 하나의 전역 격자(lattice) 위에 놓인다.
+- row = floor(y / cell_size), col = floor(x / cell_size)
+- cell_id = row * LATTICE_COLS + col  (같은 cell_size 라면 행정동이 달라도 같은 칸은 같은 id)
+- 점 -> 칸 은 나눗셈 한 번, 칸 -> 폴리곤 은 shapely.box 배열로 한 번에 생성
+"""
+import numpy as np
+import geopandas as gpd
+import shapely
+from schema_config import CRS_ANALYSIS
+
+DEFAULT_CELL_SIZE = 100
+
+# col 이 가질 수 있는 범위보다 큰 값 (EPSG:5179 의 x 는 남한 전역에서 < 2,000,000 m)
+LATTICE_COLS = 10_000_000
+
+
+def cell_index(x, y, cell_size=DEFAULT_CELL_SIZE):
+    """(row, col) int64 arrays of the lattice cells containing points (x, y)"""
+    row = np.floor(np.asarray(y, dtype=float) / cell_size).astype(np.int64)
+    col = np.floor(np.asarray(x, dtype=float) / cell_size).astype(np.int64)
+    return row, col
+
+
+def to_cell_id(row, col):
+    return np.asarray(row, dtype=np.int64) * LATTICE_COLS + np.asarray(col, dtype=np.int64)
+
+
+def from_cell_id(cell_id):
+    """Inverse of to_cell_id -> (row, col)"""
+    return np.divmod(np.asarray(cell_id, dtype=np.int64), LATTICE_COLS)
+
+
+def point_cell_ids(x, y, cell_size=DEFAULT_CELL_SIZE):
+    """Lattice cell id for every point (points on a cell edge belong to the upper/right cell)"""
+    return to_cell_id(*cell_index(x, y, cell_size))
+
+
+def cell_polygons(cell_ids, cell_size=DEFAULT_CELL_SIZE):
+    """Square polygons (shapely array) for the given cell ids"""
+    row, col = from_cell_id(cell_ids)
+    x0 = col * float(cell_size)
+    y0 = row * float(cell_size)
+    return shapely.box(x0, y0, x0 + cell_size, y0 + cell_size)
+
+
+def cells_in_bounds(bounds, cell_size=DEFAULT_CELL_SIZE):
+    """All lattice cell ids covering (min_x, min_y, max_x, max_y), row-major order"""
+    min_x, min_y, max_x, max_y = bounds
+    row0, col0 = cell_index(min_x, min_y, cell_size)
+    # max 가 칸 경계에 딱 걸리면 그 다음 칸은 bounds 밖 -> ceil - 1
+    row1 = np.int64(np.ceil(max_y / cell_size)) - 1
+    col1 = np.int64(np.ceil(max_x / cell_size)) - 1
+    rows = np.arange(row0, max(row0, row1) + 1, dtype=np.int64)
+    cols = np.arange(col0, max(col0, col1) + 1, dtype=np.int64)
+    return to_cell_id(rows[:, None], cols[None, :]).ravel()
+
+
+def grid_for_geometries(geometries, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Lattice cells intersecting each geometry, found with one bulk STRtree query.
+    Returns (geom_idx, cell_ids): positional index into `geometries` and the cell id,
+    sorted by geometry then cell id. A cell on a shared border appears once per geometry.
+    """
+    geoms = np.asarray(geometries, dtype=object)
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    if not valid.any():
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    candidate_ids = cells_in_bounds(shapely.total_bounds(geoms[valid]), cell_size)
+    boxes = cell_polygons(candidate_ids, cell_size)
+    tree = shapely.STRtree(boxes)
+    geom_idx, box_idx = tree.query(geoms, predicate='intersects')
+
+    order = np.lexsort((candidate_ids[box_idx], geom_idx))
+    return geom_idx[order].astype(np.int64), candidate_ids[box_idx[order]]
+
+
+def create_grid_gdf(cell_ids, cell_size=DEFAULT_CELL_SIZE, crs=CRS_ANALYSIS):
+    return gpd.GeoDataFrame({'cell_id': cell_ids}, geometry=cell_polygons(cell_ids, cell_size), crs=crs)
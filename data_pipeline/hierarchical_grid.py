@@ -0,0 +1,136 @@
+"""
+Multi-Resolution Hierarchical Grid (EPSG:5179 lattice)
+Project: Tenant Note - Safety Grade Analysis
+
+50 / 100 / 250 / 500 m 격자를 grid_lattice 의 같은 원점 위에 겹쳐 놓는다.
+모든 크기가 50 의 배수이므로 50m 칸은 상위 레벨의 칸 하나에 정확히 포함된다.
+
+- 점 -> 50m 칸 은 좌표 나눗셈 한 번 (grid_lattice.point_cell_ids)
+- 50m 칸의 합계(개수, 위반 건수, 연식 합)를 한 번만 구하고
+  상위 레벨은 부모 cell id 로 groupby-sum 만 해서 만든다 (추가 spatial join 없음)
+- 비율/평균(viol_rate, avg_age)은 레벨마다 합계 / 개수 로 다시 계산
+- 결과는 레벨을 cell_size 컬럼으로 구분한 하나의 GeoDataFrame
+  -> intermediate_store 에서 filters=[('cell_size', '==', 250)] 으로 한 레벨만 읽을 수 있음
+"""
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from grid_lattice import from_cell_id, to_cell_id, point_cell_ids, grid_for_geometries, cell_polygons
+from schema_config import CRS_ANALYSIS, BuildingSchema
+
+GRID_LEVELS = (50, 100, 250, 500)
+
+# 레벨별 지도 표시 zoom 범위 (vector_tiles 의 grid layer 용)
+LEVEL_ZOOMS = {
+    500: (11, 12),
+    250: (13, 13),
+    100: (14, 14),
+    50: (15, 15),
+}
+
+# 합산 가능한 컬럼 (상위 레벨로 그대로 더함)
+SUM_COLUMNS = ['cctv_count', 'infra_count', 'harmful_count', 'bld_count', 'viol_count', 'age_sum']
+
+
+def parent_cell_ids(cell_ids, cell_size, parent_size):
+    """Cell ids of the parent_size cells containing the given cell_size cells"""
+    if parent_size % cell_size:
+        raise ValueError(f"{parent_size}m cells are not made of whole {cell_size}m cells")
+    factor = parent_size // cell_size
+    row, col = from_cell_id(cell_ids)
+    return to_cell_id(row // factor, col // factor)
+
+
+def _check_levels(levels):
+    levels = sorted(set(levels))
+    base = levels[0]
+    for size in levels[1:]:
+        if size % base:
+            raise ValueError(f"Grid level {size}m is not a multiple of the base level {base}m")
+    return levels
+
+
+def base_cell_stats(zones, cctv_joined, infra_joined, bld_joined, cell_size):
+    """
+    Additive statistics per (ADM_NM, cell_id) at the finest level, for every lattice cell
+    intersecting the zones (cells without points get 0).
+    *_joined are points already joined to their district (ADM_NM column).
+    """
+    zone_idx, cell_ids = grid_for_geometries(zones.geometry.values, cell_size)
+    keys = ['ADM_NM', 'cell_id']
+    cells = pd.DataFrame({
+        'ADM_CD': zones['ADM_CD'].to_numpy()[zone_idx],
+        'ADM_NM': zones['ADM_NM'].to_numpy()[zone_idx],
+        'cell_id': cell_ids,
+    })
+
+    def binned(points, **columns):
+        return pd.DataFrame({
+            'ADM_NM': points['ADM_NM'].to_numpy(),
+            'cell_id': point_cell_ids(points.geometry.x, points.geometry.y, cell_size),
+            **columns,
+        })
+
+    c_stats = binned(cctv_joined).groupby(keys).size().rename('cctv_count')
+    i_stats = binned(
+        infra_joined,
+        is_harmful=infra_joined['category'].isin(['단란주점', '유흥주점']).to_numpy(),
+    ).groupby(keys).agg(infra_count=('is_harmful', 'size'), harmful_count=('is_harmful', 'sum'))
+    b_stats = binned(
+        bld_joined,
+        is_viol=(bld_joined[BuildingSchema.VIOL_BLD_YN] == 'Y').to_numpy(),
+        age=bld_joined['age'].to_numpy(),
+    ).groupby(keys).agg(bld_count=('is_viol', 'size'), viol_count=('is_viol', 'sum'), age_sum=('age', 'sum'))
+
+    stats = pd.concat([c_stats, i_stats, b_stats], axis=1)
+    cells = cells.join(stats, on=keys)
+    cells[SUM_COLUMNS] = cells[SUM_COLUMNS].fillna(0)
+    return cells
+
+
+def roll_up(cells, cell_size, parent_size):
+    """Sums a level's additive statistics into its parent level (no spatial operations)"""
+    parents = cells.assign(cell_id=parent_cell_ids(cells['cell_id'].to_numpy(), cell_size, parent_size))
+    return parents.groupby(['ADM_CD', 'ADM_NM', 'cell_id'], as_index=False, sort=False)[SUM_COLUMNS].sum()
+
+
+def finalize_level(cells, cell_size, crs=CRS_ANALYSIS):
+    """Adds cell_size, derived rates/means and the cell polygons"""
+    out = cells.copy()
+    out.insert(0, 'cell_size', np.int32(cell_size))
+    for col in ['cctv_count', 'infra_count', 'harmful_count', 'bld_count']:
+        out[col] = out[col].astype(np.int64)
+    bld_count = out['bld_count'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 건물이 없는 칸은 0 (기존 격자 집계와 동일)
+        out['viol_rate'] = np.where(bld_count > 0, out['viol_count'] / bld_count, 0.0)
+        out['avg_age'] = np.where(bld_count > 0, out['age_sum'] / bld_count, 0.0)
+    return gpd.GeoDataFrame(out, geometry=cell_polygons(out['cell_id'].to_numpy(), cell_size), crs=crs)
+
+
+def build_grid_hierarchy(zones, cctv_joined, infra_joined, bld_joined, levels=GRID_LEVELS):
+    """
+    Grid statistics at every level in `levels` (meters), computed once at the finest level
+    and rolled up. Returns one GeoDataFrame with a cell_size column
+    (cell_size, ADM_CD, ADM_NM, cell_id, counts/sums, viol_rate, avg_age, geometry).
+    A cell crossing a district border appears once per district, as in aggregate_grid.
+    """
+    levels = _check_levels(levels)
+    base = levels[0]
+    cells = base_cell_stats(zones, cctv_joined, infra_joined, bld_joined, base)
+
+    frames = [finalize_level(cells, base)]
+    print(f"   - {base}m level: {len(frames[0])} cells")
+    for size in levels[1:]:
+        # 항상 가장 세밀한 레벨에서 바로 합산 (250m 처럼 100m 의 배수가 아닌 레벨도 가능)
+        frames.append(finalize_level(roll_up(cells, base, size), size))
+        print(f"   - {size}m level: {len(frames[-1])} cells")
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+
+def grid_level(hierarchy, cell_size):
+    """One level of a build_grid_hierarchy result"""
+    level = hierarchy[hierarchy['cell_size'] == cell_size]
+    if level.empty:
+        raise KeyError(f"No {cell_size}m level in the grid hierarchy")
+    return level.reset_index(drop=True)
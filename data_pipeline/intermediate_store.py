@@ -0,0 +1,157 @@
+"""
+Columnar Intermediate Store (GeoParquet / Parquet)
+Project: Tenant Note - Safety Grade Analysis
+
+단계 사이의 중간 결과(경계, 점 데이터, 격자, 지표 테이블)를 Parquet 로 저장하고
+필요한 컬럼 / 영역(bbox) / 행 조건만 골라서 읽는다.
+
+- GeoDataFrame -> GeoParquet (bbox covering 컬럼 포함 -> bbox 읽기 시 row group 단위로 건너뜀)
+- DataFrame    -> Parquet (index 보존)
+- shapefile 은 처음 한 번만 파싱해서 GeoParquet 로 변환 (파일 크기/수정시각이 바뀌면 다시 변환)
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+import geopandas as gpd
+import pyarrow.parquet as pq
+
+STORE_DIR = os.path.join(os.getcwd(), 'data', 'derived', 'store')
+ROW_GROUP_SIZE = 50_000
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+
+def dataset_path(name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{name}.parquet")
+
+
+def has_dataset(name, store_dir=STORE_DIR):
+    return os.path.exists(dataset_path(name, store_dir))
+
+
+def dataset_version(name, store_dir=STORE_DIR):
+    """'<size>-<mtime_ns>' of a stored dataset (None if missing), for cache keys of readers"""
+    path = dataset_path(name, store_dir)
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def is_geo_file(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return b'geo' in metadata
+
+
+def file_columns(path):
+    return [c for c in pq.read_schema(path).names if not c.startswith('__index_level_')]
+
+
+def write_frame(path, df, sort_spatially=False):
+    """
+    Writes a (Geo)DataFrame to path. sort_spatially orders rows along a Hilbert curve
+    so nearby features share row groups and bbox reads skip more of the file.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    if isinstance(df, gpd.GeoDataFrame):
+        if sort_spatially and len(df) > 1:
+            df = df.iloc[df.hilbert_distance().argsort(kind='stable')]
+        df.to_parquet(tmp, write_covering_bbox=True, row_group_size=ROW_GROUP_SIZE)
+    else:
+        df.to_parquet(tmp, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, path)
+    return path
+
+
+def read_frame(path, columns=None, bbox=None, filters=None):
+    """
+    Reads only the requested columns / rows.
+    bbox: (min_x, min_y, max_x, max_y) in the stored CRS (GeoParquet only).
+    filters: pyarrow filters, e.g. [('ADM_CD', '>=', '11'), ('ADM_CD', '<', '12')].
+    """
+    if is_geo_file(path):
+        if columns is not None:
+            geometry_col = json.loads(pq.read_schema(path).metadata[b'geo'])['primary_column']
+            columns = list(dict.fromkeys(list(columns) + [geometry_col]))
+        return gpd.read_parquet(path, columns=columns, bbox=bbox, filters=filters)
+    if bbox is not None:
+        raise ValueError(f"bbox filter needs a GeoParquet file: {path}")
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+def write_dataset(name, df, store_dir=STORE_DIR, sort_spatially=False):
+    return write_frame(dataset_path(name, store_dir), df, sort_spatially=sort_spatially)
+
+
+def read_dataset(name, columns=None, bbox=None, filters=None, store_dir=STORE_DIR):
+    return read_frame(dataset_path(name, store_dir), columns=columns, bbox=bbox, filters=filters)
+
+
+def read_shapefile_cached(shp_path, columns=None, bbox=None, filters=None, encoding='euc-kr', store_dir=STORE_DIR):
+    """
+    gpd.read_file(shp_path) with a GeoParquet copy in the store: the shapefile is parsed
+    once, later calls only read the requested columns / bbox / rows from the copy.
+    """
+    # .shp 뿐 아니라 속성(.dbf), 좌표계(.prj), 인코딩(.cpg), 인덱스(.shx) 가 바뀌어도 다시 변환
+    h = hashlib.sha1(f"{os.path.abspath(shp_path)}|{encoding}".encode())
+    stem = os.path.splitext(shp_path)[0]
+    for ext in SHAPEFILE_PARTS:
+        for path in (stem + ext, stem + ext.upper()):
+            if os.path.exists(path):
+                st = os.stat(path)
+                h.update(f"|{os.path.basename(path)}|{st.st_size}|{st.st_mtime_ns}".encode())
+    key = h.hexdigest()[:12]
+    base = os.path.splitext(os.path.basename(shp_path))[0]
+    path = dataset_path(f"{base}-{key}", store_dir)
+    if not os.path.exists(path):
+        print(f"   - Converting {os.path.basename(shp_path)} to GeoParquet (one-time)...")
+        write_frame(path, gpd.read_file(shp_path, encoding=encoding))
+    return read_frame(path, columns=columns, bbox=bbox, filters=filters)
+
+
+# --- Pipeline stage results ------------------------------------------------
+# pipeline_dag 의 단계 결과 중 (Geo)DataFrame 또는 그 tuple 은 Parquet 로 저장
+
+def is_frame_result(result):
+    if isinstance(result, pd.DataFrame):
+        return True
+    return (isinstance(result, tuple) and len(result) > 0
+            and all(r is None or isinstance(r, pd.DataFrame) for r in result)
+            and any(r is not None for r in result))
+
+
+def write_frames(dir_path, result, sort_spatially=False):
+    """Stores a frame or a tuple of frames (None allowed) as part-<i>.parquet + parts.json"""
+    os.makedirs(dir_path, exist_ok=True)
+    single = isinstance(result, pd.DataFrame)
+    parts = (result,) if single else result
+    for i, part in enumerate(parts):
+        if part is not None:
+            write_frame(os.path.join(dir_path, f"part-{i}.parquet"), part, sort_spatially=sort_spatially)
+    layout = {'single': single, 'parts': len(parts), 'none': [i for i, p in enumerate(parts) if p is None]}
+    # parts.json 을 마지막에 기록 -> 이 파일이 있으면 완성된 결과
+    with open(os.path.join(dir_path, 'parts.json'), 'w', encoding='utf-8') as f:
+        json.dump(layout, f)
+
+
+def has_frames(dir_path):
+    return os.path.exists(os.path.join(dir_path, 'parts.json'))
+
+
+def read_frames(dir_path, part=None, columns=None, bbox=None, filters=None):
+    """Reads back what write_frames stored; part selects one element of a tuple result"""
+    with open(os.path.join(dir_path, 'parts.json'), encoding='utf-8') as f:
+        layout = json.load(f)
+
+    def load(i):
+        if i in layout['none']:
+            return None
+        return read_frame(os.path.join(dir_path, f"part-{i}.parquet"), columns=columns, bbox=bbox, filters=filters)
+
+    if part is not None:
+        return load(part)
+    if layout['single']:
+        return load(0)
+    return tuple(load(i) for i in range(layout['parts']))
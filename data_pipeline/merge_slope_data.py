@@ -1,6 +1,11 @@
 import os
 import pandas as pd
 import geopandas as gpd
+from adjacency_fill import fill_frame, load_adjacency
+from intermediate_store import has_dataset, read_dataset, read_shapefile_cached
+from geojson_writer import DEFAULT_PRECISION, write_gdf
+from topology_export import write_topojson_levels
+from vector_tiles import make_layer, write_pmtiles
 
 # Configuration
 DATA_DIR = os.path.join(os.getcwd(), 'data')
@@ -10,6 +15,10 @@ PUBLIC_DATA_DIR = os.path.join(os.getcwd(), 'public', 'data')
 
 CSV_PATH = os.path.join(DERIVED_DIR, 'seoul_slope_complete.csv')
 OUTPUT_GEOJSON = os.path.join(PUBLIC_DATA_DIR, 'seoul_slope_v2.json')
+OUTPUT_PMTILES = os.path.join(PUBLIC_DATA_DIR, 'seoul_slope_v2.pmtiles')
+OUTPUT_TOPOJSON_BASE = os.path.join(PUBLIC_DATA_DIR, 'seoul_slope_v2')
+SLOPE_DATASET = 'seoul_slope'
+SEOUL_ADM_FILTER = [('ADM_CD', '>=', '11'), ('ADM_CD', '<', '12')]
 
 def get_shapefile_path():
     p = os.path.join(SHP_DIR, 'BND_ADM_DONG.shp')
@@ -18,37 +27,43 @@ def get_shapefile_path():
     if os.path.exists(p_pg): return p_pg
     raise FileNotFoundError("Shapefile not found in data/shp")
 
-def main():
+def load_slope_table(columns):
+    """analyze_slope 의 지표 테이블 (Parquet store, 없으면 CSV)"""
+    if has_dataset(SLOPE_DATASET):
+        print("Loading slope table (Parquet)...")
+        return read_dataset(SLOPE_DATASET, columns=columns)
+    print("Loading CSV...")
+    df = pd.read_csv(CSV_PATH, usecols=columns)
+    # Ensure adm_cd is string for matching
+    df['adm_cd'] = df['adm_cd'].astype(str)
+    return df
+
+def main(tiles=False, precision=DEFAULT_PRECISION, gzip_copy=False, topo=False):
     print("Starting Data Merge for Map Visualization...")
     
     # Ensure public/data exists
     os.makedirs(PUBLIC_DATA_DIR, exist_ok=True)
 
     # 1. Load Data
-    print("Loading CSV...")
-    df = pd.read_csv(CSV_PATH)
-    # Ensure adm_cd is string for matching
-    df['adm_cd'] = df['adm_cd'].astype(str)
+    df = load_slope_table(['adm_cd', 'adm_nm', 'mean_slope', 'steep_ratio'])
 
     print("Loading Shapefile...")
     shp_path = get_shapefile_path()
-    gdf = gpd.read_file(shp_path, encoding='euc-kr')
-    
-    # Filter Seoul (11...)
-    gdf = gdf[gdf['ADM_CD'].str.startswith('11')].copy()
-
-    # 2. Reproject to WGS84 (EPSG:4326) for Web Map
-    print("Reprojecting to EPSG:4326...")
-    gdf = gdf.to_crs("EPSG:4326")
+    # Filter Seoul (11...) - 필요한 컬럼과 행만 GeoParquet 사본에서 읽음
+    gdf = read_shapefile_cached(shp_path, columns=['ADM_CD', 'ADM_NM'], filters=SEOUL_ADM_FILTER)
 
-    # 3. Merge
+    # 2. Merge
     print("Merging spatial data with slope statistics...")
     # gdf key: ADM_CD, csv key: adm_cd
     merged = gdf.merge(df, left_on='ADM_CD', right_on='adm_cd', how='left')
     
-    # Fill NaN slopes with 0 (safe fallback)
-    merged['mean_slope'] = merged['mean_slope'].fillna(0)
-    merged['steep_ratio'] = merged['steep_ratio'].fillna(0)
+    # Fill NaN slopes from neighbouring districts (0 would read as "flat")
+    # 인접 행렬은 경계 데이터 기준으로 캐시됨 (미터 좌표계에서 계산)
+    merged = fill_frame(merged, load_adjacency(merged), ['mean_slope', 'steep_ratio'])
+
+    # 3. Reproject to WGS84 (EPSG:4326) for Web Map
+    print("Reprojecting to EPSG:4326...")
+    merged = merged.to_crs("EPSG:4326")
 
     # 4. Cleanup & Select Columns
     # We keep Geometry, ADM_NM, ADM_CD, mean_slope, steep_ratio
@@ -64,11 +79,33 @@ def main():
     final_gdf = merged[columns_to_keep]
 
     # 5. Export
+    if tiles:
+        # 줌 레벨별로 단순화된 벡터 타일 (지도는 보이는 타일만 받음)
+        print(f"Exporting vector tiles to {OUTPUT_PMTILES}...")
+        layer = make_layer('slope', final_gdf, ['ADM_CD', 'ADM_NM', 'mean_slope', 'steep_ratio'])
+        write_pmtiles([layer], OUTPUT_PMTILES)
+        print("Done!")
+        return
+
+    if topo:
+        # 공유 경계 arc 단위로 단순화한 TopoJSON (fine / medium / coarse)
+        print(f"Exporting TopoJSON levels to {OUTPUT_TOPOJSON_BASE}.*.topojson...")
+        write_topojson_levels(final_gdf, OUTPUT_TOPOJSON_BASE, object_name='slope')
+        print("Done!")
+        return
+
     print(f"Exporting to {OUTPUT_GEOJSON}...")
-    # Use standard precision to save space, maybe? keep default.
-    final_gdf.to_file(OUTPUT_GEOJSON, driver='GeoJSON')
+    # Compact GeoJSON, 좌표 precision 자리 반올림 (6 = ~10cm)
+    write_gdf(final_gdf, OUTPUT_GEOJSON, precision=precision, gzip_copy=gzip_copy)
     
     print("Done!")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Merge slope statistics into district boundaries")
+    parser.add_argument('--tiles', action='store_true', help="write PMTiles vector tiles instead of GeoJSON")
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION, help="coordinate decimals (6 = ~10cm)")
+    parser.add_argument('--gzip', action='store_true', help="also write a precompressed .gz copy")
+    parser.add_argument('--topojson', action='store_true', help="write simplified TopoJSON levels instead of GeoJSON")
+    args = parser.parse_args()
+    main(tiles=args.tiles, precision=args.precision, gzip_copy=args.gzip, topo=args.topojson)
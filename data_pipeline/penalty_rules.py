@@ -0,0 +1,137 @@
+"""
+Penalty Rule Engine (Kill Switch - 과락)
+Project: Tenant Note - Safety Grade Analysis
+
+PROJECT_CONTEXT 2.C 의 페널티 규칙을 선언형으로 적어 두고, 지표 테이블 전체에 대한
+벡터 마스크로 컴파일해서 한 번에 적용한다 (행 단위 apply 없음).
+
+- 규칙 = 조건 (컬럼, 비교 연산자, 기준값) + 효과 (등급 상한 / 카테고리 점수 가감)
+- 조건 컬럼은 원본 지표 컬럼 또는 score_<카테고리> (정규화 점수 0~100)
+- 'quantile' 이 있으면 기준값을 모집단 분위수로 한 번 더 조인다 (하위/상위 N% 규칙)
+- 조건 컬럼이 없는 데이터에서는 그 규칙은 적용되지 않음 (예: 소음 데이터가 아직 없음)
+- 어떤 규칙이 걸렸는지는 행마다 bitmask (규칙 순서 = bit 순서) 로 기록
+"""
+import numpy as np
+
+# 선언형 규칙 목록 (순서 = bit 위치, 새 규칙은 끝에 추가)
+PENALTY_RULES = [
+    # 🚨 치안 과락: 치안 점수 하위 20% (40점 미만) -> 즉시 D 등급
+    #    기준값 = min(40, 모집단의 20% 분위수). 격자는 CCTV 0 인 칸이 대부분이라 20% 분위수가 0 점이 되고,
+    #    그러면 동점인 0 점 칸들은 하위 20% 로 구분되지 않으므로 과락 대상이 아님
+    {'name': 'security_fail', 'when': ('score_safety', '<', 40), 'quantile': 0.20, 'max_grade': 'D'},
+    # ⛰️ 경사 주의: 경사도 10도 이상 비율 30% 초과 -> 쾌적성 -30점
+    #    (steep_ratio 는 analyze_slope 결과를 aggregate_data 가 행정동 테이블에 붙임)
+    {'name': 'steep_slope', 'when': ('steep_ratio', '>', 30), 'adjust': {'comfort': -30}},
+    # 🔊 소음 주의: 야간 평균 소음 55dB 이상 -> 환경 -20점
+    #    (night_noise_db 데이터는 아직 없음 -> 현재는 적용 안 됨)
+    {'name': 'night_noise', 'when': ('night_noise_db', '>=', 55), 'adjust': {'environment': -20}},
+]
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+GRADE_ORDER = ['D', 'C', 'B', 'A']  # grade code = 위치 (scoring_engine 과 동일)
+
+# quantile 기준: 작은 쪽 비교는 기준값과 분위수 중 작은 값, 큰 쪽 비교는 큰 값을 사용
+QUANTILE_BOUND = {'<': np.minimum, '<=': np.minimum, '>': np.maximum, '>=': np.maximum}
+
+
+def compile_rules(rules=None, categories=None):
+    """
+    Validates the rule list and assigns each rule its bit.
+    categories: score categories of the engine, checked up front so a rule adjusting an
+    unknown category fails before its data ever arrives.
+    """
+    rules = PENALTY_RULES if rules is None else rules
+    if len(rules) > 32:
+        raise ValueError("At most 32 penalty rules fit in the bitmask")
+    compiled = []
+    for bit, rule in enumerate(rules):
+        column, op, value = rule['when']
+        if op not in OPERATORS:
+            raise ValueError(f"Rule '{rule['name']}': unknown operator {op!r}")
+        max_grade = rule.get('max_grade')
+        if max_grade is not None and max_grade not in GRADE_ORDER:
+            raise ValueError(f"Rule '{rule['name']}': unknown grade {max_grade!r}")
+        quantile = rule.get('quantile')
+        if quantile is not None:
+            if op not in QUANTILE_BOUND:
+                raise ValueError(f"Rule '{rule['name']}': quantile needs an ordering operator, not {op!r}")
+            if not 0 < quantile < 1:
+                raise ValueError(f"Rule '{rule['name']}': quantile must be between 0 and 1")
+        unknown = set(rule.get('adjust', {})) - set(categories) if categories is not None else set()
+        if unknown:
+            raise ValueError(f"Rule '{rule['name']}' adjusts unknown score category {sorted(unknown)}")
+        compiled.append({
+            'name': rule['name'],
+            'bit': bit,
+            'column': column,
+            'test': OPERATORS[op],
+            'value': value,
+            'quantile': quantile,
+            'bound': QUANTILE_BOUND.get(op),
+            'max_code': GRADE_ORDER.index(max_grade) if max_grade is not None else None,
+            'adjust': dict(rule.get('adjust', {})),
+        })
+    return compiled
+
+
+def flag_dtype(compiled):
+    return np.uint8 if len(compiled) <= 8 else (np.uint16 if len(compiled) <= 16 else np.uint32)
+
+
+def evaluate_rules(columns, n_rows, categories, compiled=None):
+    """
+    Applies every rule to the whole table at once.
+    Quantile thresholds are taken over the rows passed in (one population, e.g. one grid level).
+    columns: {column name: array} (raw indicators + score_<category> in points)
+    categories: score categories in indicator-matrix order
+    Returns (flags bitmask, adjust (n_rows, n_categories) in points, max grade code per row).
+    """
+    compiled = compile_rules() if compiled is None else compiled
+    flags = np.zeros(n_rows, dtype=flag_dtype(compiled))
+    adjust = np.zeros((n_rows, len(categories)), dtype=float)
+    max_code = np.full(n_rows, len(GRADE_ORDER) - 1, dtype=np.int8)
+
+    for rule in compiled:
+        if rule['column'] not in columns:
+            continue
+        values = np.asarray(columns[rule['column']], dtype=float)
+        threshold = rule['value']
+        if rule['quantile'] is not None:
+            if np.isnan(values).all():
+                continue
+            threshold = rule['bound'](threshold, np.nanquantile(values, rule['quantile']))
+        with np.errstate(invalid='ignore'):
+            # NaN 은 어떤 비교에서도 False -> 규칙 미적용
+            fired = rule['test'](values, threshold)
+        if not fired.any():
+            continue
+        flags[fired] |= flags.dtype.type(1 << rule['bit'])
+        if rule['max_code'] is not None:
+            max_code[fired] = np.minimum(max_code[fired], rule['max_code'])
+        for category, points in rule['adjust'].items():
+            if category not in categories:
+                raise ValueError(f"Rule '{rule['name']}' adjusts unknown score category '{category}'")
+            adjust[fired, categories.index(category)] += points
+    return flags, adjust, max_code
+
+
+def rule_names(flags, compiled=None):
+    """Bitmask -> list of fired rule names per row (리포트/디버깅용)"""
+    compiled = compile_rules() if compiled is None else compiled
+    flags = np.asarray(flags)
+    return [[rule['name'] for rule in compiled if f & (1 << rule['bit'])] for f in flags.tolist()]
+
+
+def rule_counts(flags, compiled=None):
+    """{rule name: number of rows where it fired}"""
+    compiled = compile_rules() if compiled is None else compiled
+    flags = np.asarray(flags)
+    return {rule['name']: int(np.count_nonzero(flags & (1 << rule['bit']))) for rule in compiled}
@@ -0,0 +1,314 @@
+"""
+Memoized Pipeline Stage Graph
+Project: Tenant Note - Safety Grade Analysis
+
+boundaries -> mock_points -> aggregation -> grades 처럼 서로를 다시 호출하던 단계들을
+하나의 DAG 로 묶어서 각 단계를 한 번만 계산하고 디스크에 저장해 재사용한다.
+
+- 단계 key = hash(단계 이름 + 단계 함수가 정의된 모듈과 그 모듈이 (간접적으로) import 하는
+  로컬 모듈의 소스 + params + versions (파이프라인 밖에서 만들어지는 입력 파일의 버전) + 의존 단계 key)
+  -> 코드나 입력이 바뀐 단계와 그 하위 단계만 다시 계산
+- 결과가 (Geo)DataFrame 이나 그 tuple 이면 intermediate_store 로 (Geo)Parquet 저장
+  (data/derived/pipeline_cache/<name>-<key>/part-<i>.parquet), 그 외에는 pickle
+- 캐시된 단계는 실제로 필요한 것만 읽고, read() 로 컬럼/bbox 만 골라 읽을 수 있음
+- 의존성이 없는 단계들은 스레드 풀에서 동시에 실행
+  (각 단계의 print 는 단계별로 모아 두었다가 단계가 끝날 때 [단계 이름] 을 붙여 한 번에 출력)
+"""
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import intermediate_store
+
+PIPELINE_CACHE_DIR = os.path.join(os.getcwd(), 'data', 'derived', 'pipeline_cache')
+
+
+class Stage:
+    def __init__(self, name, func, deps=None, params=None, versions=None):
+        self.name = name
+        self.func = func
+        self.deps = dict(deps or {})          # {kwarg 이름: 의존 단계 이름}
+        self.params = dict(params or {})      # 고정 kwargs (key 에 포함)
+        self.versions = dict(versions or {})  # {외부 입력 이름: 버전} (key 에만 포함, 함수에는 안 넘김)
+
+
+def _local_imports(path):
+    """Paths of the sibling modules (same directory) imported anywhere in the file at path"""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    folder = os.path.dirname(path)
+    candidates = (os.path.join(folder, f"{name}.py") for name in names)
+    return sorted(p for p in candidates if os.path.exists(p))
+
+
+def _code_digest(func):
+    """
+    Hash of the source file defining func and of every local module it imports,
+    transitively (penalty_rules, scoring_engine, district_locator ... count too).
+    """
+    try:
+        root = inspect.getsourcefile(func)
+        seen, pending = set(), [os.path.abspath(root)]
+        while pending:
+            path = pending.pop()
+            if path not in seen:
+                seen.add(path)
+                pending.extend(os.path.abspath(p) for p in _local_imports(path))
+        h = hashlib.sha1()
+        for path in sorted(seen):
+            with open(path, 'rb') as f:
+                h.update(os.path.basename(path).encode())
+                h.update(hashlib.sha1(f.read()).digest())
+        return h.hexdigest()
+    except (TypeError, OSError, SyntaxError):
+        return hashlib.sha1(func.__qualname__.encode()).hexdigest()
+
+
+class _StageOutput:
+    """
+    sys.stdout proxy used while stages run in the thread pool: writes from a thread that
+    is running a stage go to that stage's buffer, everything else passes straight through.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.buffers = {}  # {thread id: list of written strings}
+
+    def write(self, text):
+        buffer = self.buffers.get(threading.get_ident())
+        if buffer is not None:
+            buffer.append(text)
+        else:
+            with self.lock:
+                self.stream.write(text)
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+
+    def capture(self):
+        self.buffers[threading.get_ident()] = []
+
+    def release(self, name):
+        """Stops capturing for this thread and writes its output in one block, each line prefixed with the stage name"""
+        text = ''.join(self.buffers.pop(threading.get_ident(), []))
+        if text:
+            block = ''.join(f"[{name}] {line}\n" for line in text.rstrip('\n').split('\n'))
+            with self.lock:
+                self.stream.write(block)
+                self.stream.flush()
+
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+
+class Pipeline:
+    def __init__(self, cache_dir=PIPELINE_CACHE_DIR, max_workers=4):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name, func, deps=None, params=None, versions=None):
+        self.stages[name] = Stage(name, func, deps, params, versions)
+        return self
+
+    # --- keys ----------------------------------------------------------------
+
+    def _order(self, targets):
+        """Stages needed for targets, dependencies first"""
+        order, seen = [], set()
+
+        def visit(name, path):
+            if name in path:
+                raise ValueError(f"Cycle in pipeline: {' -> '.join(path + (name,))}")
+            if name in seen:
+                return
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}'")
+            for dep in self.stages[name].deps.values():
+                visit(dep, path + (name,))
+            seen.add(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target, ())
+        return order
+
+    def stage_keys(self, targets):
+        keys = {}
+        for name in self._order(targets):
+            stage = self.stages[name]
+            h = hashlib.sha1(name.encode())
+            h.update(_code_digest(stage.func).encode())
+            h.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+            if stage.versions:
+                h.update(json.dumps(stage.versions, sort_keys=True, default=str).encode())
+            for kwarg, dep in sorted(stage.deps.items()):
+                h.update(f"{kwarg}={keys[dep]}".encode())
+            keys[name] = h.hexdigest()[:16]
+        return keys
+
+    def _cache_path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}")
+
+    def _is_cached(self, name, key):
+        path = self._cache_path(name, key)
+        return intermediate_store.has_frames(path) or os.path.exists(path + '.pkl')
+
+    def _save(self, name, key, result):
+        path = self._cache_path(name, key)
+        if intermediate_store.is_frame_result(result):
+            intermediate_store.write_frames(path, result)
+        else:
+            # 임시 파일에 쓰고 교체 (중간에 죽어도 깨진 캐시가 남지 않도록)
+            with open(path + '.pkl.tmp', 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.pkl.tmp', path + '.pkl')
+
+    def _load(self, name, key, **read_kwargs):
+        path = self._cache_path(name, key)
+        if intermediate_store.has_frames(path):
+            return intermediate_store.read_frames(path, **read_kwargs)
+        if read_kwargs:
+            raise ValueError(f"Stage '{name}' is pickled; column/bbox reads need a frame result")
+        with open(path + '.pkl', 'rb') as f:
+            return pickle.load(f)
+
+    # --- run -----------------------------------------------------------------
+
+    def run(self, *targets, force=()):
+        """
+        Computes (or loads) every stage needed for targets and returns {target: result}.
+        Cached upstream stages are only read when a stage that has to run needs them.
+        force: stage names to recompute even if cached (their dependents are recomputed too).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        order = self._order(targets)
+        keys = self.stage_keys(targets)
+        results = {}
+
+        pending = []
+        for name in order:
+            stale = name in force or any(dep in pending for dep in self.stages[name].deps.values())
+            if stale or not self._is_cached(name, keys[name]):
+                pending.append(name)
+
+        needed = set(targets)
+        for name in pending:
+            needed.update(self.stages[name].deps.values())
+        for name in order:
+            if name not in pending:
+                if name in needed:
+                    results[name] = self._load(name, keys[name])
+                print(f"[pipeline] {name}: cached ({keys[name]})")
+
+        output = _StageOutput(sys.stdout)
+
+        def execute(name):
+            stage = self.stages[name]
+            kwargs = dict(stage.params)
+            kwargs.update({kwarg: results[dep] for kwarg, dep in stage.deps.items()})
+            started = time.time()
+            output.capture()
+            try:
+                result = stage.func(**kwargs)
+            finally:
+                output.release(name)
+            self._save(name, keys[name], result)
+            return result, time.time() - started
+
+        running = {}
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while pending or running:
+                    # 의존 단계가 모두 끝난 단계부터 제출
+                    for name in list(pending):
+                        if all(dep in results for dep in self.stages[name].deps.values()):
+                            pending.remove(name)
+                            print(f"[pipeline] {name}: running...")
+                            running[pool.submit(execute, name)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name], elapsed = future.result()
+                        print(f"[pipeline] {name}: done in {elapsed:.1f}s ({keys[name]})")
+        finally:
+            sys.stdout = output.stream
+
+        return {name: results[name] for name in targets}
+
+    def read(self, name, part=None, columns=None, bbox=None, filters=None):
+        """
+        Projected read of one stage result (computed first if not cached):
+        only the given tuple part, columns, bbox and rows are loaded from Parquet.
+        """
+        key = self.stage_keys([name])[name]
+        if not self._is_cached(name, key):
+            self.run(name)
+        read_kwargs = {k: v for k, v in
+                       {'part': part, 'columns': columns, 'bbox': bbox, 'filters': filters}.items() if v is not None}
+        return self._load(name, key, **read_kwargs)
+
+
+def default_pipeline():
+    """
+    boundaries -> mock_points -> aggregation -> grades
+    boundaries -> slope_stats (analyze_slope 테이블) -> aggregation
+                 mock_points -> grid_hierarchy -> grid_grades  (50/100/250/500m, 서울 전체)
+    aggregation + grid_hierarchy -> profile_grades (default + MBTI 16 유형)
+    """
+    from load_boundaries import process_boundaries
+    from generate_mock_points import generate_mock_dataset
+    from aggregate_data import SLOPE_DATASET, load_slope_stats, run_aggregation, run_grid_hierarchy
+    from intermediate_store import dataset_version
+    from calculate_grade import calculate_grades, calculate_profile_grades, grade_grid
+
+    return (
+        Pipeline()
+        .add('boundaries', process_boundaries)
+        .add('mock_points', generate_mock_dataset, deps={'boundaries': 'boundaries'})
+        # 경사 테이블은 파이프라인 밖 (analyze_slope) 에서 만들어지므로 파일 버전을 key 에 넣음
+        .add('slope_stats', load_slope_stats, deps={'boundaries': 'boundaries'},
+             versions={SLOPE_DATASET: dataset_version(SLOPE_DATASET)})
+        .add('aggregation', run_aggregation,
+             deps={'boundaries': 'boundaries', 'points': 'mock_points', 'slope': 'slope_stats'})
+        .add('grades', calculate_grades, deps={'aggregation': 'aggregation'})
+        .add('grid_hierarchy', run_grid_hierarchy, deps={'boundaries': 'boundaries', 'points': 'mock_points'})
+        .add('grid_grades', grade_grid, deps={'df_grid': 'grid_hierarchy'})
+        .add('profile_grades', calculate_profile_grades,
+             deps={'aggregation': 'aggregation', 'grid_hierarchy': 'grid_hierarchy'})
+    )
+
+
+def run_default(*targets, force=()):
+    return default_pipeline().run(*(targets or ('grades',)), force=force)
+
+
+def read_default(name, **read_kwargs):
+    """Projected read of a default-pipeline stage (see Pipeline.read)"""
+    return default_pipeline().read(name, **read_kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the memoized data pipeline")
+    parser.add_argument('targets', nargs='*', default=['grades'])
+    parser.add_argument('--force', nargs='*', default=[], help="stages to recompute")
+    args = parser.parse_args()
+    run_default(*args.targets, force=args.force)
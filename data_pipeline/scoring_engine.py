@@ -0,0 +1,224 @@
+"""
+Batch Multi-Profile Scoring Engine
+Project: Tenant Note - Safety Grade Analysis
+
+정규화 지표 행렬 X (행 = 행정동 또는 격자, 열 = 지표) 를 한 번만 만들고
+가중치 행렬 W (열 = 프로필: default, MBTI 16 유형, 사용자 지정) 를 곱해서
+모든 프로필의 점수를 행렬곱 한 번으로 계산한다.  S = X @ W
+
+- 정규화: Min-Max (부정 지표는 1 - 값), 값이 모두 같으면 긍정 1.0 / 부정 0.0
+- 등급: 프로필마다 q20 / q55 / q85 를 구하고 searchsorted 로 A~D 를 한 번에 부여
+  (x >= q85 -> A, >= q55 -> B, >= q20 -> C, 그 외 D)
+- 데이터에 없는 지표 컬럼은 만점(1.0)으로 처리 (기존 격자 점수와 동일)
+- 과락 규칙 (penalty_rules) 은 지표 행렬에 점수 가감 / 등급 상한으로 반영,
+  등급 기준(quantile)은 페널티 적용 전 점수 분포로 계산 -> 걸린 행만 강등됨
+"""
+import numpy as np
+import pandas as pd
+from penalty_rules import compile_rules, evaluate_rules
+
+# (가중치 카테고리, 지표 컬럼, 부정 지표 여부)
+INDICATORS = [
+    ('safety', 'cctv_count', False),
+    ('property', 'viol_rate', True),
+    ('comfort', 'harmful_count', True),
+    ('etc', 'avg_age', True),
+    ('environment', 'night_noise_db', True),
+]
+# 정규화 지표를 돌려줄 때 쓰는 컬럼 이름 (export_data 의 scores 차트용)
+NORM_COLUMNS = {
+    'safety': 'norm_cctv',
+    'property': 'norm_viol',
+    'comfort': 'norm_harm',
+    'etc': 'norm_age',
+    'environment': 'norm_noise',
+}
+
+# 기본 가중치: Safety(30%), Property(25%), Comfort(15%), Etc(10%), Environment(10%)
+# Environment(소음) 는 측정 데이터가 없으면 다른 빠진 지표처럼 만점(1.0) -> 모든 행에 같은 값이 더해짐
+DEFAULT_WEIGHTS = {'safety': 0.30, 'property': 0.25, 'comfort': 0.15, 'etc': 0.10, 'environment': 0.10}
+
+# MBTI 축별 가중치 조정 (기본 가중치에 더한 뒤 합계를 기본과 같게 맞춤)
+# - E/I: 번화가(유흥시설) 허용 vs 조용한 동네
+# - S/N: 건물 상태(위반건축물) 중시 vs 덜 중시
+# - T/F: 연식/시설 합리성 중시 vs 분위기
+# - J/P: 치안 중시 vs 유연
+MBTI_AXIS_WEIGHTS = {
+    'E': {'comfort': -0.05}, 'I': {'comfort': +0.05},
+    'S': {'property': +0.05}, 'N': {'property': -0.05},
+    'T': {'etc': +0.05}, 'F': {'etc': -0.05},
+    'J': {'safety': +0.05}, 'P': {'safety': -0.05},
+}
+MIN_WEIGHT = 0.05
+
+MBTI_TYPES = [a + b + c + d for a in 'EI' for b in 'SN' for c in 'TF' for d in 'JP']
+
+GRADE_QUANTILES = [0.20, 0.55, 0.85]
+GRADE_LABELS = np.array(['D', 'C', 'B', 'A'])
+
+
+def mbti_weights(mbti):
+    """Weight dict for an MBTI type such as 'INTJ'"""
+    mbti = mbti.upper()
+    if mbti not in MBTI_TYPES:
+        raise ValueError(f"Unknown MBTI type: {mbti}")
+    weights = dict(DEFAULT_WEIGHTS)
+    for letter in mbti:
+        for category, delta in MBTI_AXIS_WEIGHTS[letter].items():
+            weights[category] += delta
+    # 기본 가중치가 0 인 카테고리는 MBTI 조정 대상이 아님
+    weights = {k: max(v, MIN_WEIGHT) if DEFAULT_WEIGHTS[k] > 0 else 0.0 for k, v in weights.items()}
+    scale = sum(DEFAULT_WEIGHTS.values()) / sum(weights.values())
+    return {k: v * scale for k, v in weights.items()}
+
+
+def profile_weights(profile):
+    """
+    Weight vector (ordered like INDICATORS) for a profile:
+    'default', an MBTI type, a {category: weight} dict or a sequence of weights.
+    """
+    categories = [category for category, _, _ in INDICATORS]
+    if isinstance(profile, str):
+        weights = DEFAULT_WEIGHTS if profile == 'default' else mbti_weights(profile)
+    elif isinstance(profile, dict):
+        unknown = set(profile) - set(categories)
+        if unknown:
+            raise ValueError(f"Unknown weight categories: {sorted(unknown)}")
+        weights = profile
+    else:
+        vector = np.asarray(profile, dtype=float)
+        if vector.shape != (len(categories),):
+            raise ValueError(f"Weight vector must have {len(categories)} values ({', '.join(categories)})")
+        return vector
+    return np.array([weights.get(category, 0.0) for category in categories], dtype=float)
+
+
+def default_profiles():
+    """{name: profile} for 'default' and all 16 MBTI types"""
+    return {'default': 'default', **{mbti: mbti for mbti in MBTI_TYPES}}
+
+
+def weight_matrix(profiles):
+    """(names, W) with W of shape (n_indicators, n_profiles)"""
+    if not isinstance(profiles, dict):
+        profiles = {p if isinstance(p, str) else f'custom_{i}': p for i, p in enumerate(profiles)}
+    names = list(profiles)
+    return names, np.column_stack([profile_weights(profiles[name]) for name in names])
+
+
+def normalize_columns(values, is_negative):
+    """
+    Column-wise Min-Max scaling of a 2-D array (NaN ignored).
+    is_negative: bool per column, inverted (1 - scaled) so higher input means lower score.
+    """
+    values = np.asarray(values, dtype=float)
+    is_negative = np.asarray(is_negative, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        min_val = np.nanmin(values, axis=0)
+        span = np.nanmax(values, axis=0) - min_val
+        scaled = (values - min_val) / np.where(span > 0, span, 1.0)
+    scaled = np.where(is_negative, 1.0 - scaled, scaled)
+    # 값이 모두 같은 지표: 긍정 1.0 / 부정 0.0
+    flat = ~(span > 0)
+    scaled[:, flat] = np.where(is_negative[flat], 0.0, 1.0)
+    return scaled
+
+
+def indicator_matrix(df):
+    """(n_rows, n_indicators) normalized indicator matrix; missing columns are 1.0"""
+    present = [i for i, (_, col, _) in enumerate(INDICATORS) if col in df.columns]
+    matrix = np.ones((len(df), len(INDICATORS)), dtype=float)
+    if present:
+        columns = [INDICATORS[i][1] for i in present]
+        negative = [INDICATORS[i][2] for i in present]
+        matrix[:, present] = normalize_columns(df[columns].to_numpy(dtype=float), negative)
+    return matrix
+
+
+def grade_thresholds(scores):
+    """(n_profiles, 3) q20 / q55 / q85 of each score column"""
+    scores = np.asarray(scores, dtype=float)
+    if np.isnan(scores).all(axis=0).any():
+        raise ValueError("A profile has no scores to grade")
+    return np.nanquantile(scores, GRADE_QUANTILES, axis=0).T
+
+
+def grade_codes(scores, thresholds):
+    """
+    Grade codes (0=D .. 3=A) per score column: number of thresholds <= score,
+    via searchsorted(side='right'). Missing scores are graded D.
+    """
+    scores = np.asarray(scores, dtype=float)
+    codes = np.empty(scores.shape, dtype=np.int8)
+    for j in range(scores.shape[1]):
+        codes[:, j] = np.searchsorted(thresholds[j], scores[:, j], side='right')
+    codes[np.isnan(scores)] = 0
+    return codes
+
+
+class ScoringEngine:
+    """
+    Normalized indicator matrix of one population (행정동 또는 한 레벨의 격자), built once,
+    with the penalty rules already evaluated over it (rules=[] disables them).
+    Scoring any number of profiles is then one matrix multiply plus one quantile per profile.
+    """
+    def __init__(self, df, rules=None):
+        self.index = df.index
+        self.matrix = indicator_matrix(df)
+
+        categories = [category for category, _, _ in INDICATORS]
+        compiled = compile_rules(rules, categories)
+        needed = {rule['column'] for rule in compiled}
+        columns = {col: df[col].to_numpy(dtype=float) for col in needed if col in df.columns}
+        for i, category in enumerate(categories):
+            if f'score_{category}' in needed:
+                columns[f'score_{category}'] = self.matrix[:, i] * 100
+        self.flags, adjust, self.max_code = evaluate_rules(columns, len(df), categories, compiled)
+        # 페널티 점수(점 단위)를 정규화 지표(0~1)에 반영
+        self.penalized = np.clip(self.matrix + adjust / 100, 0.0, 1.0) if adjust.any() else self.matrix
+
+    def norm_frame(self):
+        """Normalized indicators (after penalty adjustments) as norm_* columns"""
+        return pd.DataFrame(self.penalized, index=self.index,
+                            columns=[NORM_COLUMNS[category] for category, _, _ in INDICATORS])
+
+    def score(self, profiles):
+        """(names, scores) with scores of shape (n_rows, n_profiles), penalties applied"""
+        names, weights = weight_matrix(profiles)
+        return names, self.penalized @ weights
+
+    def grade(self, profiles):
+        """
+        (names, scores, grade codes) for every profile. Cutoffs come from the scores
+        before penalties; grades are then capped by max_grade rules.
+        """
+        names, weights = weight_matrix(profiles)
+        base = self.matrix @ weights
+        scores = base if self.penalized is self.matrix else self.penalized @ weights
+        codes = grade_codes(scores, grade_thresholds(base))
+        np.minimum(codes, self.max_code[:, None], out=codes)
+        return names, scores, codes
+
+    def grade_frame(self, profiles=None):
+        """DataFrame of grade letters (categorical), one column per profile (default + 16 MBTI types)"""
+        names, _, codes = self.grade(profiles or default_profiles())
+        return pd.DataFrame({name: pd.Categorical.from_codes(codes[:, j], GRADE_LABELS)
+                             for j, name in enumerate(names)}, index=self.index)
+
+    def default_grades(self):
+        """(safety_score, safety_grade, penalty_flags) Series for the default weights"""
+        _, scores, codes = self.grade({'default': 'default'})
+        return (pd.Series(scores[:, 0], index=self.index).round(3),
+                pd.Series(GRADE_LABELS[codes[:, 0]], index=self.index),
+                pd.Series(self.flags, index=self.index))
+
+
+def profile_grades(df, profiles=None):
+    """
+    Grade letters for every row of df and every profile. A hierarchical_grid result
+    (cell_size column) is graded level by level.
+    """
+    if 'cell_size' in df.columns:
+        return pd.concat([ScoringEngine(level).grade_frame(profiles)
+                          for _, level in df.groupby('cell_size', sort=False)]).loc[df.index]
+    return ScoringEngine(df).grade_frame(profiles)
@@ -0,0 +1,205 @@
+"""
+Scale-Test Synthetic Dataset Generator
+Project: Tenant Note - Safety Grade Analysis
+
+운영 규모(또는 그 N배)의 CCTV / 인허가(LicenseSchema) / 건축물(BuildingSchema) 점 데이터를
+행정동별로 생성해서 파티션된 Parquet 로 바로 디스크에 쓴다.
+
+- 밀도: 면적(km²) x 기준 밀도 x scale (타겟 동은 가중). 서울 전체 기준 약 CCTV 8만, 인허가 20만, 건물 50만
+- 분포: 일부는 균일 배경, 나머지는 가우시안 클러스터 (역세권/상권처럼 몰려 있는 분포)
+- 행정동 단위로 프로세스 풀에서 실행, CHUNK_ROWS 행씩 나눠 쓰므로 메모리는 청크 크기로 제한
+- 출력: <out_dir>/<dataset>/adm_cd=<ADM_CD>/part-00000.parquet (x, y 는 EPSG:5179)
+- seed 와 행정동 순번으로 난수열을 나누므로 jobs 수와 상관없이 같은 데이터가 나온다
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from generate_mock_points import MOCK_SEED, generate_random_points_in_polygon
+from schema_config import CRS_ANALYSIS, BuildingSchema, LicenseSchema, CCTVSchema
+
+DATASETS = ('cctv', 'infra', 'bld')
+
+# 기준 밀도 (points / km², 서울 605km² 기준 대략적인 운영 규모)
+DENSITY_PER_KM2 = {
+    'cctv': 130,
+    'infra': 330,
+    'bld': 830,
+}
+TARGET_DENSITY_BOOST = 1.5
+
+# 클러스터 설정
+CLUSTER_SHARE = 0.7          # 클러스터에 속하는 점 비율 (나머지는 균일 배경)
+POINTS_PER_CLUSTER = 400
+CLUSTER_SIGMA_M = (60, 250)  # 클러스터 반경(표준편차) 범위
+
+CHUNK_ROWS = 200_000
+
+LICENSE_CATEGORIES = ['편의점', '일반음식점', '단란주점', '유흥주점', '병원', '약국', '숙박업']
+LICENSE_CATEGORY_P = [0.18, 0.45, 0.05, 0.02, 0.1, 0.08, 0.12]
+
+
+def sample_clustered_points(polygon, n, rng):
+    """
+    n points inside polygon: CLUSTER_SHARE of them around random cluster centers
+    (Gaussian offsets), the rest uniform. Returns (x, y) arrays in random order.
+    """
+    if n == 0:
+        return np.empty(0), np.empty(0)
+    n_cluster = int(n * CLUSTER_SHARE)
+    n_clusters = max(1, n_cluster // POINTS_PER_CLUSTER)
+
+    cx, cy = generate_random_points_in_polygon(polygon, n_clusters, rng)
+    # 클러스터마다 크기/반경이 다르도록 (몇몇 큰 핫스팟)
+    sizes = rng.multinomial(n_cluster, rng.dirichlet(np.full(n_clusters, 0.8)))
+    sigma = rng.uniform(*CLUSTER_SIGMA_M, size=n_clusters)
+    owner = np.repeat(np.arange(n_clusters), sizes)
+    x = cx[owner] + rng.normal(0, 1, n_cluster) * sigma[owner]
+    y = cy[owner] + rng.normal(0, 1, n_cluster) * sigma[owner]
+
+    # 폴리곤 밖으로 나간 점과 배경 점은 균일 샘플로 채움
+    inside = shapely.contains_xy(polygon, x, y)
+    x, y = x[inside], y[inside]
+    bx, by = generate_random_points_in_polygon(polygon, n - len(x), rng)
+    x = np.concatenate([x, bx])
+    y = np.concatenate([y, by])
+    order = rng.permutation(n)
+    return x[order], y[order]
+
+
+def make_attributes(dataset, n, sig_cd, rng):
+    """Schema columns for n synthetic rows of the given dataset"""
+    if dataset == 'cctv':
+        return {
+            CCTVSchema.INSTALL_PURPOSE: rng.choice(['방범용', '다목적', '교통단속용'], size=n, p=[0.8, 0.1, 0.1]),
+        }
+    if dataset == 'infra':
+        return {
+            LicenseSchema.OPN_SF_TEAM_CODE: np.full(n, sig_cd),
+            # 인허가 데이터에는 휴업/폐업 업소도 섞여 있음
+            LicenseSchema.TRD_STATE_GBN: rng.choice(['01', '02', '03'], size=n, p=[0.55, 0.05, 0.4]),
+            'category': rng.choice(LICENSE_CATEGORIES, size=n, p=LICENSE_CATEGORY_P),
+        }
+    # 건물: 준공 연도는 1970~2025, 최근일수록 조금 적게
+    year = 2025 - np.minimum(rng.gamma(2.0, 12.0, size=n).astype(np.int64), 55)
+    month = rng.integers(1, 13, size=n)
+    day = rng.integers(1, 29, size=n)
+    return {
+        BuildingSchema.USE_APR_DAY: (year * 10000 + month * 100 + day).astype(str),
+        BuildingSchema.VIOL_BLD_YN: np.where(rng.random(n) < 0.05, 'Y', 'N'),
+        BuildingSchema.OTHER_USE_YN: np.where(rng.random(n) < 0.08, 'Y', 'N'),
+    }
+
+
+def point_counts(area_m2, is_target, scale):
+    boost = TARGET_DENSITY_BOOST if is_target else 1.0
+    return {name: int(round(area_m2 / 1e6 * density * boost * scale)) for name, density in DENSITY_PER_KM2.items()}
+
+
+def _generate_district(task):
+    """
+    Process-pool worker: generates and writes every dataset for one district.
+    Returns {dataset: rows}.
+    """
+    district_no, district, out_dir, scale, seed, chunk_rows = task
+    rng = np.random.default_rng([seed, district_no])
+    polygon = district['geometry']
+    counts = point_counts(polygon.area, district['is_target_zone'], scale)
+
+    for dataset, n in counts.items():
+        part_dir = os.path.join(out_dir, dataset, f"adm_cd={district['ADM_CD']}")
+        os.makedirs(part_dir, exist_ok=True)
+        # 이전 실행의 part 파일 제거 (행 수가 줄었을 때 남지 않도록)
+        for name in os.listdir(part_dir):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(part_dir, name))
+        for part_no, start in enumerate(range(0, n, chunk_rows)):
+            size = min(chunk_rows, n - start)
+            x, y = sample_clustered_points(polygon, size, rng)
+            columns = {'x': x, 'y': y}
+            columns.update(make_attributes(dataset, size, district['SIG_CD'], rng))
+            columns['adm_nm'] = np.full(size, district['ADM_NM'])
+            table = pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+            pq.write_table(table, os.path.join(part_dir, f"part-{part_no:05d}.parquet"), compression='zstd')
+    return counts
+
+
+def generate_synthetic_dataset(boundaries, out_dir, scale=1.0, jobs=4, seed=MOCK_SEED, chunk_rows=CHUNK_ROWS):
+    """
+    Writes partitioned Parquet datasets for every district in boundaries (EPSG:5179,
+    ADM_CD / ADM_NM / SIG_CD / is_target_zone columns). Returns total rows per dataset.
+    """
+    started = time.time()
+    districts = boundaries[['ADM_CD', 'ADM_NM', 'SIG_CD', 'is_target_zone', 'geometry']].to_dict('records')
+    tasks = [(i, d, out_dir, scale, seed, chunk_rows) for i, d in enumerate(districts)]
+    totals = dict.fromkeys(DATASETS, 0)
+
+    print(f"[Synthetic] {len(districts)} districts, scale={scale}, jobs={jobs} -> {out_dir}")
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(_generate_district, tasks)
+            for i, counts in enumerate(results, start=1):
+                for name, n in counts.items():
+                    totals[name] += n
+                if i % 50 == 0 or i == len(tasks):
+                    print(f"   - {i}/{len(tasks)} districts")
+    else:
+        for i, task in enumerate(tasks, start=1):
+            for name, n in _generate_district(task).items():
+                totals[name] += n
+            if i % 50 == 0 or i == len(tasks):
+                print(f"   - {i}/{len(tasks)} districts")
+
+    elapsed = time.time() - started
+    rows = sum(totals.values())
+    print(f"[Synthetic] {totals} ({rows:,} rows in {elapsed:.1f}s, {rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return totals
+
+
+def load_synthetic_points(out_dir, datasets=DATASETS, columns=None):
+    """
+    Reads the generated datasets back as point GeoDataFrames (EPSG:5179), in the same
+    shape as generate_mock_dataset() so run_aggregation(points=...) can consume them.
+    columns: optional {dataset: [attribute columns]} to load (x, y, adm_nm are always read).
+    """
+    frames = []
+    for dataset in datasets:
+        wanted = (columns or {}).get(dataset)
+        cols = None if wanted is None else sorted(set(wanted) | {'x', 'y', 'adm_nm'})
+        df = pq.read_table(os.path.join(out_dir, dataset), columns=cols).to_pandas()
+        geometry = gpd.points_from_xy(df.pop('x'), df.pop('y'), crs=CRS_ANALYSIS)
+        frames.append(gpd.GeoDataFrame(df, geometry=geometry, crs=CRS_ANALYSIS))
+    return tuple(frames)
+
+
+def load_boundaries_for_scale_test(shp_path=None):
+    """Real 행정동 shapefile (all districts, EPSG:5179) if given, else the mock boundaries"""
+    if not shp_path:
+        from load_boundaries import process_boundaries
+        return process_boundaries()
+    gdf = gpd.read_file(shp_path).to_crs(CRS_ANALYSIS)
+    gdf['ADM_CD'] = gdf['ADM_CD'].astype(str)
+    if 'SIG_CD' not in gdf.columns:
+        gdf['SIG_CD'] = gdf['ADM_CD'].str[:5]
+    gdf['is_target_zone'] = False
+    return gdf
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate scale-test synthetic point datasets")
+    parser.add_argument('--out', default=os.path.join('data', 'synthetic'), help="output directory")
+    parser.add_argument('--shp', default=None, help="행정동 shapefile (default: mock boundaries)")
+    parser.add_argument('--scale', type=float, default=1.0, help="density multiplier (10 = 10x production volume)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=MOCK_SEED)
+    args = parser.parse_args()
+
+    boundaries = load_boundaries_for_scale_test(args.shp)
+    generate_synthetic_dataset(boundaries, args.out, scale=args.scale, jobs=args.jobs, seed=args.seed)
@@ -0,0 +1,42 @@
+"""
+Shared pytest setup for the data_pipeline scripts.
+
+The scripts import each other as top-level modules and build their cache paths
+(data/derived/...) from the working directory at import time, so the whole session
+runs from a scratch directory with data_pipeline on sys.path.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PIPELINE_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix='tenant-note-tests-')
+os.chdir(WORK_DIR)
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def mock_boundaries():
+    """The mock 행정동 layer (load_boundaries), EPSG:5179"""
+    from load_boundaries import process_boundaries
+    return process_boundaries()
+
+
+@pytest.fixture(scope='session')
+def mock_points(mock_boundaries):
+    """(cctv, infra, bld) mock points for mock_boundaries, always the same seed"""
+    from generate_mock_points import generate_mock_dataset
+    return generate_mock_dataset(mock_boundaries)
+
+
+@pytest.fixture(scope='session')
+def grid_hierarchy(mock_boundaries, mock_points):
+    """Whole-city 50/100/250/500 m grid of the mock data"""
+    from aggregate_data import run_grid_hierarchy
+    return run_grid_hierarchy(boundaries=mock_boundaries, points=mock_points)
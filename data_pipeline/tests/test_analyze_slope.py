@@ -0,0 +1,61 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.merge import merge
+from rasterio.windows import Window
+
+import analyze_slope
+from benchmark_pipeline import make_fixture_boundaries, write_fixture_dem
+
+
+@pytest.fixture(scope='module')
+def dem_files(tmp_path_factory):
+    """2 x 2 synthetic DEM tiles (EPSG:5186, with a nodata river) over a small fixture city"""
+    dem_dir = tmp_path_factory.mktemp('dem')
+    write_fixture_dem(make_fixture_boundaries(12, seed=3), str(dem_dir), size_px=330, seed=3)
+    return sorted(glob.glob(os.path.join(dem_dir, '*.tif')))
+
+
+def slope_raster(dem_files, cache_dir, **kwargs):
+    analyze_slope.compute_slope_tiled(dem_files, str(cache_dir), **kwargs)
+    _, dem, slope = analyze_slope.load_cached_rasters(str(cache_dir))
+    return np.array(dem), np.array(slope)
+
+
+def test_block_size_does_not_change_slope(dem_files, tmp_path):
+    dem_small, slope_small = slope_raster(dem_files, tmp_path / 'small', block_size=64)
+    dem_whole, slope_whole = slope_raster(dem_files, tmp_path / 'whole', block_size=4096)
+    assert np.array_equal(dem_small, dem_whole)
+    assert np.array_equal(slope_small, slope_whole, equal_nan=True)
+    assert np.isfinite(slope_whole).mean() > 0.5
+
+
+def test_in_memory_resampling_matches_tiled(dem_files, tmp_path):
+    # --in-memory 경로: merge() 한 전체 배열을 같은 resampler 로 재투영
+    dem_tiled, _ = slope_raster(dem_files, tmp_path / 'tiled', block_size=128)
+    grid = analyze_slope.load_cached_rasters(str(tmp_path / 'tiled'))[0]
+    sources = [rasterio.open(fp) for fp in dem_files]
+    try:
+        mosaic, transform = merge(sources)
+        crs, nodata = sources[0].crs, sources[0].nodata
+    finally:
+        for src in sources:
+            src.close()
+    cols, rows = analyze_slope.source_pixel_coords(grid, Window(0, 0, grid['width'], grid['height']), crs, transform)
+    dem_memory = analyze_slope.bilinear_sample(mosaic[0], 0, 0, cols, rows, nodata).astype(np.float32)
+    assert np.array_equal(dem_memory, dem_tiled)
+    # DEM 밖은 0 이 아니라 nodata
+    assert dem_tiled[0, 0] == nodata
+
+
+def test_parallel_matches_serial(dem_files, tmp_path):
+    dem_serial, slope_serial = slope_raster(dem_files, tmp_path / 'serial', block_size=96, jobs=1)
+    dem_parallel, slope_parallel = slope_raster(dem_files, tmp_path / 'parallel', block_size=96, jobs=3)
+    assert np.array_equal(dem_serial, dem_parallel)
+    assert np.array_equal(slope_serial, slope_parallel, equal_nan=True)
+    # 병렬 + 다른 block_size 도 같은 결과
+    _, slope_other = slope_raster(dem_files, tmp_path / 'other', block_size=200, jobs=2)
+    assert np.array_equal(slope_serial, slope_other, equal_nan=True)
@@ -0,0 +1,100 @@
+import os
+import threading
+
+import pytest
+
+from batch_uploader import postgrest_sender, read_checkpoint, resume_checkpoint, run_stub_server, upload_batches
+
+
+@pytest.fixture
+def stub():
+    server, base_url = run_stub_server()
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def make_rows(n):
+    return [{'id': i, 'name': f'CCTV {i}', 'lat': 37.5, 'lng': 127.0} for i in range(n)]
+
+
+def received_ids(server, table='cctv'):
+    return sorted(row['id'] for row in server.received.get(table, []))
+
+
+def interrupt_after(send, calls):
+    """Sender that raises KeyboardInterrupt instead of sending from call number calls + 1 on"""
+    lock = threading.Lock()
+    count = [0]
+
+    def wrapped(batch):
+        with lock:
+            count[0] += 1
+            stop = count[0] > calls
+        if stop:
+            raise KeyboardInterrupt
+        send(batch)
+    wrapped.idempotent = send.idempotent
+    return wrapped
+
+
+def test_failed_batch_is_retried(tmp_path):
+    server, base_url = run_stub_server(fail_first=2)
+    try:
+        checkpoint = str(tmp_path / 'failed.jsonl')
+        stats = upload_batches(make_rows(250), postgrest_sender(base_url, None, 'cctv'), max_workers=1,
+                               max_rows=100, backoff_base=0.01, checkpoint_path=checkpoint, verbose=False)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert stats.retries == 2
+    assert stats.failed_rows == 0
+    assert received_ids(server) == list(range(250))
+    assert not os.path.exists(checkpoint)
+
+
+def test_in_flight_limit():
+    slow, slow_url = run_stub_server(latency=0.05)
+    try:
+        upload_batches(make_rows(2000), postgrest_sender(slow_url, None, 'cctv'), max_workers=8, max_in_flight=3,
+                       max_rows=50, verbose=False)
+    finally:
+        slow.shutdown()
+        slow.server_close()
+    assert 1 < slow.peak_requests <= 3
+    assert received_ids(slow) == list(range(2000))
+
+
+def test_oversize_rejection_shrinks_batches(stub):
+    server, base_url = stub
+    server.max_rows = 300
+    stats = upload_batches(make_rows(3000), postgrest_sender(base_url, None, 'cctv'), max_workers=1,
+                           max_in_flight=1, max_rows=1000, verbose=False)
+    assert stats.failed_rows == 0
+    assert received_ids(server) == list(range(3000))
+    # 첫 배치만 1000 -> 500 x 2 -> 250 x 4 로 나뉘고 (413 세 번), 이후에는 250 행 배치만 보냄
+    assert stats.splits == 1
+    assert server.rejected == 3
+    assert server.requests == 3 + 4 + 2000 // 250
+
+
+def test_interrupted_resume_sends_each_row_once(stub, tmp_path):
+    server, base_url = stub
+    send = postgrest_sender(base_url, None, 'cctv', method='upsert')
+    checkpoint = str(tmp_path / 'failed.jsonl')
+
+    server.fail_rate = 1.0
+    upload_batches(make_rows(1000), send, max_rows=100, max_retries=0, checkpoint_path=checkpoint, verbose=False)
+    assert server.received == {}
+    assert sum(len(records) for _, records in read_checkpoint(checkpoint)) == 1000
+
+    server.fail_rate = 0.0
+    with pytest.raises(KeyboardInterrupt):
+        resume_checkpoint(checkpoint, interrupt_after(send, 4), max_workers=2, verbose=False)
+    assert 0 < len(received_ids(server)) < 1000
+    assert os.path.exists(checkpoint + '.resuming')
+
+    resume_checkpoint(checkpoint, send, verbose=False)
+    assert received_ids(server) == list(range(1000))
+    for path in (checkpoint, checkpoint + '.resuming', checkpoint + '.resuming.done'):
+        assert not os.path.exists(path)
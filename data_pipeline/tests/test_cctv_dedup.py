@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from pyproj import Geod
+
+from cctv_dedup import deduplicate
+
+_GEOD = Geod(ellps='WGS84')
+
+
+def legacy_merge(master_df, target_df):
+    """
+    The original O(N*M) loop of merge_cctv_deduplication.py (geodesic distance, first match
+    in result order wins, stats filled once), with pyproj's geodesic in place of geopy's.
+    """
+    result_list = master_df.to_dict('records')
+    added = duplicates = updates = 0
+    for row in target_df.to_dict('records'):
+        is_duplicate = False
+        for existing_item in result_list:
+            _, _, distance = _GEOD.inv(row['lng'], row['lat'], existing_item['lng'], existing_item['lat'])
+            if distance <= 20:
+                is_duplicate = True
+                if not existing_item['stats'] and row['stats']:
+                    existing_item['stats'] = row['stats']
+                    updates += 1
+                break
+        if not is_duplicate:
+            result_list.append(dict(row))
+            added += 1
+        else:
+            duplicates += 1
+    counters = {'added': added, 'duplicates': duplicates, 'updates': updates}
+    return pd.DataFrame(result_list, dtype=object), counters
+
+
+def cctv_fixture(n, source, seed, anchors=None):
+    """n cameras in a ~500 m box near 관악구, half of them jittered around anchors when given"""
+    rng = np.random.default_rng(seed)
+    lat = 37.4842 + rng.uniform(0, 0.0045, n)
+    lng = 126.9296 + rng.uniform(0, 0.0057, n)
+    if anchors is not None:
+        near = rng.random(n) < 0.5
+        pick = rng.integers(0, len(anchors), near.sum())
+        lat[near] = anchors['lat'].to_numpy()[pick] + rng.normal(0, 0.00012, near.sum())
+        lng[near] = anchors['lng'].to_numpy()[pick] + rng.normal(0, 0.00015, near.sum())
+    # 빈 stats 는 None (object 컬럼) - 원본 루프의 `not stats` 는 NaN 을 값이 있는 것으로 본다
+    stats = pd.Series(np.where(rng.random(n) < 0.4, None, rng.choice(['2MP', '4MP', '5MP'], n)), dtype=object)
+    return pd.DataFrame({
+        'id': [f"TN_{source}_{i}" for i in range(n)],
+        'source': source,
+        'lat': lat,
+        'lng': lng,
+        'type': 'Safety',
+        'stats': stats,
+    })
+
+
+def test_dedup_matches_legacy_loop():
+    master = cctv_fixture(150, 'Seoul', seed=1)
+    target = cctv_fixture(400, 'National', seed=2, anchors=master)
+
+    expected, expected_counters = legacy_merge(master, target)
+    result, counters = deduplicate(master, target)
+
+    assert counters == expected_counters
+    assert counters['duplicates'] > 100 and counters['updates'] > 10
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_dedup_chains_within_targets():
+    # 15 m 간격의 세 점: 두 번째는 첫 번째에 병합, 세 번째는 채택된 첫 번째와 30 m 라서 채택
+    lat = 37.5 + np.array([0, 15, 30]) / 111_000
+    target = pd.DataFrame({'id': ['a', 'b', 'c'], 'source': 'National', 'lat': lat, 'lng': 127.0,
+                           'type': 'Safety', 'stats': pd.Series([None, '4MP', None], dtype=object)})
+    master = target.iloc[:0]
+
+    result, counters = deduplicate(master, target)
+
+    assert result['id'].tolist() == ['a', 'c']
+    assert result['stats'].tolist() == ['4MP', None]
+    assert counters == {'added': 2, 'duplicates': 1, 'updates': 1}
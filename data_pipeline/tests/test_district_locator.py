@@ -0,0 +1,76 @@
+import os
+import pickle
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from benchmark_pipeline import make_fixture_boundaries
+from district_locator import DistrictLocator, load_locator
+from generate_mock_points import generate_random_points_in_polygon
+from schema_config import CRS_ANALYSIS, CRS_OUTPUT
+
+
+@pytest.fixture(scope='module')
+def boundaries():
+    return make_fixture_boundaries(60, seed=11)
+
+
+@pytest.fixture(scope='module')
+def points(boundaries):
+    """Random points over the whole layer, plus polygon vertices (on borders) and points outside it"""
+    rng = np.random.default_rng(4)
+    outline = shapely.union_all(boundaries.geometry.values)
+    x, y = generate_random_points_in_polygon(outline.envelope, 5000, rng)
+    vertices = shapely.get_coordinates(boundaries.geometry.values)[::25]
+    x = np.concatenate([x, vertices[:, 0]])
+    y = np.concatenate([y, vertices[:, 1]])
+    return gpd.GeoDataFrame(geometry=gpd.points_from_xy(x, y), crs=CRS_ANALYSIS)
+
+
+def sjoin_index(points, boundaries):
+    """Row position of the district containing each point (-1 if none), via gpd.sjoin"""
+    joined = gpd.sjoin(points, boundaries.reset_index(drop=True), how='left', predicate='within')
+    first = joined['index_right'].groupby(level=0).min()
+    return first.reindex(points.index).fillna(-1).astype(np.int64).to_numpy()
+
+
+def test_locate_matches_sjoin(boundaries, points):
+    locator = DistrictLocator(boundaries)
+    expected = sjoin_index(points, boundaries)
+    result = locator.locate_points(points)
+
+    assert (result == expected).all()
+    assert (expected == -1).sum() > 0 and len(locator.interior_cells) > 0
+    codes, _ = locator.locate(points.geometry.x, points.geometry.y)
+    assert (codes == np.where(expected >= 0, boundaries['ADM_CD'].to_numpy()[np.maximum(expected, 0)], None)).all()
+
+
+def test_locate_accepts_wgs84(boundaries, points):
+    # 경계선 위의 점은 재투영 반올림으로 어느 한쪽 안으로 들어갈 수 있으므로 임의의 점만 비교
+    lonlat = points.iloc[:5000].to_crs(CRS_OUTPUT)
+    expected = sjoin_index(points.iloc[:5000], boundaries)
+    result = DistrictLocator(boundaries).locate_index(lonlat.geometry.x, lonlat.geometry.y, crs=CRS_OUTPUT)
+    assert (result == expected).all()
+
+
+def test_overlapping_districts_resolve_to_the_first(mock_boundaries, mock_points):
+    # mock 경계는 서원동 / 신원동 처럼 서로 겹치는 폴리곤이 있음 -> sjoin 의 첫 번째 일치와 같아야 함
+    geoms = mock_boundaries.geometry.values
+    assert shapely.intersection(geoms[0], geoms[1]).area > 0
+    cctv = mock_points[0].reset_index(drop=True)
+    assert (DistrictLocator(mock_boundaries).locate_points(cctv) == sjoin_index(cctv, mock_boundaries)).all()
+
+
+def test_pickled_and_cached_locators_agree(boundaries, points, tmp_path):
+    locator = DistrictLocator(boundaries)
+    expected = locator.locate_points(points)
+    assert (pickle.loads(pickle.dumps(locator)).locate_points(points) == expected).all()
+
+    cache_dir = str(tmp_path / 'locator')
+    first = load_locator(boundaries, cache_dir=cache_dir)
+    second = load_locator(boundaries, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    assert (first.locate_points(points) == expected).all()
+    assert (second.locate_points(points) == expected).all()
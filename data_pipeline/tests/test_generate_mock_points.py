@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import shapely
+
+import generate_mock_points
+from generate_mock_points import generate_random_points_in_polygon
+
+
+def test_points_inside_and_seeded():
+    polygon = shapely.Polygon([(0, 0), (100, 0), (100, 10), (10, 10), (10, 100), (0, 100)])
+    x, y = generate_random_points_in_polygon(polygon, 500, np.random.default_rng(1))
+    # 호출한 쪽의 polygon 은 prepared 상태로 남지 않음
+    assert not shapely.is_prepared(polygon)
+    assert len(x) == 500
+    assert shapely.contains_xy(polygon, x, y).all()
+    again = generate_random_points_in_polygon(polygon, 500, np.random.default_rng(1))
+    assert np.array_equal(x, again[0]) and np.array_equal(y, again[1])
+
+
+def test_default_rng_differs_per_call_and_repeats_per_run():
+    polygon = shapely.box(0, 0, 10, 10)
+    first = generate_random_points_in_polygon(polygon, 20)
+    second = generate_random_points_in_polygon(polygon, 20)
+    assert not np.array_equal(first[0], second[0])
+
+    # 새 프로세스의 첫 호출은 항상 같은 점
+    code = ("import shapely; from generate_mock_points import generate_random_points_in_polygon as g; "
+            "print(g(shapely.box(0, 0, 10, 10), 20)[0].tolist())")
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(generate_mock_points.__file__))
+    runs = [subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=env).stdout
+            for _ in range(2)]
+    assert runs[0].startswith("[") and runs[0] == runs[1]
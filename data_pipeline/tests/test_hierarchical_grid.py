@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate_data import join_points
+from hierarchical_grid import GRID_LEVELS, build_grid_hierarchy, grid_level, parent_cell_ids
+from grid_lattice import point_cell_ids
+from schema_config import BuildingSchema
+
+
+@pytest.fixture(scope='module')
+def joined(mock_boundaries, mock_points):
+    return join_points(mock_boundaries, mock_points)
+
+
+@pytest.mark.parametrize('size', GRID_LEVELS[1:])
+def test_rollup_equals_direct_aggregation(mock_boundaries, joined, grid_hierarchy, size):
+    direct = build_grid_hierarchy(mock_boundaries, *joined, levels=(size,))
+    rolled = grid_level(grid_hierarchy, size)
+
+    direct = direct.sort_values(['ADM_NM', 'cell_id'], ignore_index=True)
+    rolled = rolled.sort_values(['ADM_NM', 'cell_id'], ignore_index=True)
+    columns = [c for c in direct.columns if c != 'geometry']
+    pd.testing.assert_frame_equal(pd.DataFrame(rolled[columns]), pd.DataFrame(direct[columns]), check_dtype=False)
+    assert rolled.geometry.geom_equals_exact(direct.geometry, tolerance=1e-6).all()
+
+
+def test_levels_keep_the_city_totals(grid_hierarchy, joined):
+    cctv, infra, bld = joined
+    for size in GRID_LEVELS:
+        level = grid_level(grid_hierarchy, size)
+        assert level['cctv_count'].sum() == len(cctv)
+        assert level['infra_count'].sum() == len(infra)
+        assert level['bld_count'].sum() == len(bld)
+        assert level['viol_count'].sum() == (bld[BuildingSchema.VIOL_BLD_YN] == 'Y').sum()
+
+
+def test_parent_cells_contain_their_children():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(940_000, 970_000, 1000)
+    y = rng.uniform(1_935_000, 1_965_000, 1000)
+    for size in GRID_LEVELS[1:]:
+        assert (parent_cell_ids(point_cell_ids(x, y, 50), 50, size) == point_cell_ids(x, y, size)).all()
+    with pytest.raises(ValueError):
+        parent_cell_ids(point_cell_ids(x, y, 100), 100, 250)
@@ -0,0 +1,82 @@
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+import intermediate_store
+from intermediate_store import read_frame, read_frames, read_shapefile_cached, write_frame, write_frames
+
+
+@pytest.fixture
+def points(mock_points):
+    return mock_points[0].reset_index(drop=True)
+
+
+def test_geoparquet_round_trip(points, tmp_path):
+    path = write_frame(str(tmp_path / 'cctv.parquet'), points, sort_spatially=True)
+    assert intermediate_store.is_geo_file(path)
+
+    back = read_frame(path).sort_index()
+    assert back.crs == points.crs
+    pd.testing.assert_frame_equal(pd.DataFrame(back), pd.DataFrame(points), check_dtype=False)
+
+
+def test_projected_reads(points, tmp_path):
+    path = write_frame(str(tmp_path / 'cctv.parquet'), points)
+    column = next(c for c in points.columns if c != 'geometry')
+
+    # 컬럼만 골라도 geometry 는 항상 함께 읽힘
+    assert list(read_frame(path, columns=[column]).columns) == [column, 'geometry']
+
+    minx, miny, maxx, maxy = points.total_bounds
+    area = (minx, miny, (minx + maxx) / 2, (miny + maxy) / 2)
+    inside = read_frame(path, bbox=area)
+    expected = points[points.intersects(box(*area))]
+    assert 0 < len(inside) < len(points)
+    assert sorted(inside.index) == sorted(expected.index)
+
+
+def test_plain_frame_keeps_index_and_rejects_bbox(tmp_path):
+    df = pd.DataFrame({'score': [1.5, 2.5, 3.5]}, index=pd.Index(['a', 'b', 'c'], name='ADM_NM'))
+    path = write_frame(str(tmp_path / 'scores.parquet'), df)
+    pd.testing.assert_frame_equal(read_frame(path), df)
+    assert read_frame(path, filters=[('score', '>', 2)]).index.tolist() == ['b', 'c']
+    with pytest.raises(ValueError):
+        read_frame(path, bbox=(0, 0, 1, 1))
+
+
+def test_tuple_results_with_missing_parts(points, tmp_path):
+    table = pd.DataFrame({'n': [1, 2]})
+    write_frames(str(tmp_path / 'stage'), (points, None, table))
+
+    cctv, missing, back = read_frames(str(tmp_path / 'stage'))
+    assert missing is None
+    assert len(cctv) == len(points)
+    pd.testing.assert_frame_equal(back, table)
+    pd.testing.assert_frame_equal(read_frames(str(tmp_path / 'stage'), part=2), table)
+
+
+def test_shapefile_copy_is_refreshed_when_attributes_change(mock_boundaries, tmp_path):
+    shp = str(tmp_path / 'adm.shp')
+    store = str(tmp_path / 'store')
+    layer = mock_boundaries[['ADM_CD', 'ADM_NM', 'geometry']]
+    layer.to_file(shp, encoding='euc-kr')
+
+    first = read_shapefile_cached(shp, columns=['ADM_NM'], store_dir=store)
+    assert first['ADM_NM'].tolist() == layer['ADM_NM'].tolist()
+    assert len(os.listdir(store)) == 1
+
+    # 같은 shapefile 을 다시 읽으면 변환 없이 사본을 사용
+    read_shapefile_cached(shp, store_dir=store)
+    assert len(os.listdir(store)) == 1
+
+    # .dbf 만 바뀌어도 다시 변환
+    renamed = layer.assign(ADM_NM=layer['ADM_NM'] + '1')
+    stat = os.stat(shp)
+    renamed.to_file(shp, encoding='euc-kr')
+    os.utime(shp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    again = read_shapefile_cached(shp, columns=['ADM_NM'], store_dir=store)
+    assert again['ADM_NM'].tolist() == renamed['ADM_NM'].tolist()
+    assert isinstance(again, gpd.GeoDataFrame)
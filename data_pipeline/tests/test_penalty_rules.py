@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from penalty_rules import PENALTY_RULES, compile_rules, rule_counts
+from scoring_engine import ScoringEngine
+
+
+def rules_named(*names):
+    return [rule for rule in PENALTY_RULES if rule['name'] in names]
+
+
+def test_security_fail_caps_bottom_fifth():
+    rules = rules_named('security_fail')
+    df = pd.DataFrame({'cctv_count': np.arange(100)})
+    engine = ScoringEngine(df, rules=rules)
+    _, grades, _ = engine.default_grades()
+    assert rule_counts(engine.flags, compile_rules(rules))['security_fail'] == 20
+    assert (grades.iloc[:20] == 'D').all()
+
+
+def test_security_fail_share_on_grid(grid_hierarchy):
+    for cell_size, level in grid_hierarchy.groupby('cell_size'):
+        engine = ScoringEngine(level)
+        _, grades, _ = engine.default_grades()
+        capped = rule_counts(engine.flags)['security_fail'] / len(level)
+        assert capped <= 0.20, f"{cell_size}m: security_fail caps {capped:.0%} of cells"
+        assert (grades == 'D').mean() < 0.5, f"{cell_size}m: grades collapse to D"
+
+
+def test_night_noise_lowers_score_and_grade():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        'cctv_count': rng.integers(0, 50, 200),
+        'viol_rate': rng.random(200),
+        'night_noise_db': rng.uniform(40, 70, 200),
+    })
+    plain = ScoringEngine(df, rules=[])
+    noisy = ScoringEngine(df, rules=rules_named('night_noise'))
+    _, plain_scores, plain_codes = plain.grade({'default': 'default'})
+    _, noisy_scores, noisy_codes = noisy.grade({'default': 'default'})
+
+    fired = (df['night_noise_db'] >= 55).to_numpy()
+    # 가장 시끄러운 행은 환경 점수가 이미 0 이라 더 깎이지 않음
+    assert (noisy_scores[fired, 0] <= plain_scores[fired, 0]).all()
+    assert (noisy_scores[fired, 0] < plain_scores[fired, 0]).mean() > 0.9
+    assert (noisy_scores[~fired, 0] == plain_scores[~fired, 0]).all()
+    assert (noisy_codes[fired, 0] < plain_codes[fired, 0]).any()
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pandas as pd
+
+from pipeline_dag import Pipeline
+
+
+def test_versions_change_the_key_but_are_not_passed(tmp_path):
+    calls = []
+
+    def load(value):
+        calls.append(value)
+        return pd.DataFrame({'value': [value]})
+
+    def build(version):
+        return Pipeline(cache_dir=str(tmp_path)).add('table', load, params={'value': 1}, versions={'source': version})
+
+    first = build('v1')
+    assert first.run('table')['table']['value'].tolist() == [1]
+    build('v1').run('table')
+    assert calls == [1]
+    assert build('v2').stage_keys(['table']) != first.stage_keys(['table'])
+    build('v2').run('table')
+    assert calls == [1, 1]
+
+
+def test_parallel_stage_output_is_not_interleaved(tmp_path, capsys):
+    started = threading.Barrier(2)
+
+    def chatty(label):
+        def stage():
+            started.wait(timeout=5)
+            for i in range(50):
+                print(f"{label} line {i}")
+                time.sleep(0.001)
+            return label
+        return stage
+
+    pipeline = Pipeline(cache_dir=str(tmp_path), max_workers=2)
+    pipeline.add('left', chatty('left')).add('right', chatty('right'))
+    assert pipeline.run('left', 'right') == {'left': 'left', 'right': 'right'}
+
+    lines = [line for line in capsys.readouterr().out.splitlines() if not line.startswith('[pipeline]')]
+    assert len(lines) == 100
+    for label in ('left', 'right'):
+        block = [i for i, line in enumerate(lines) if line.startswith(f"[{label}] ")]
+        assert [lines[i] for i in block] == [f"[{label}] {label} line {i}" for i in range(50)]
+        assert block == list(range(block[0], block[0] + 50))
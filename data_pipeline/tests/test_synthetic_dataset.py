@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+import pytest
+import shapely
+
+from synthetic_dataset import DATASETS, generate_synthetic_dataset, load_synthetic_points, point_counts
+
+
+@pytest.fixture(scope='module')
+def districts(mock_boundaries):
+    return mock_boundaries.head(4)
+
+
+def test_jobs_do_not_change_the_data(districts, tmp_path):
+    serial = generate_synthetic_dataset(districts, str(tmp_path / 'serial'), scale=0.5, jobs=1)
+    parallel = generate_synthetic_dataset(districts, str(tmp_path / 'parallel'), scale=0.5, jobs=2)
+    assert serial == parallel
+
+    for a, b in zip(load_synthetic_points(str(tmp_path / 'serial')), load_synthetic_points(str(tmp_path / 'parallel'))):
+        a = pd.DataFrame(a.assign(x=a.geometry.x, y=a.geometry.y).drop(columns='geometry'))
+        b = pd.DataFrame(b.assign(x=b.geometry.x, y=b.geometry.y).drop(columns='geometry'))
+        pd.testing.assert_frame_equal(a.sort_values(['adm_nm', 'x', 'y'], ignore_index=True),
+                                      b.sort_values(['adm_nm', 'x', 'y'], ignore_index=True))
+
+
+def test_partitions_hold_each_district_inside_its_polygon(districts, tmp_path):
+    out_dir = str(tmp_path / 'chunked')
+    totals = generate_synthetic_dataset(districts, out_dir, scale=0.5, jobs=1, chunk_rows=50)
+    points = dict(zip(DATASETS, load_synthetic_points(out_dir)))
+
+    for district in districts.itertuples():
+        expected = point_counts(district.geometry.area, district.is_target_zone, 0.5)
+        for dataset in DATASETS:
+            part_dir = os.path.join(out_dir, dataset, f"adm_cd={district.ADM_CD}")
+            parts = sorted(os.listdir(part_dir))
+            assert parts == [f"part-{i:05d}.parquet" for i in range(-(-expected[dataset] // 50))]
+
+            rows = points[dataset][points[dataset]['adm_nm'] == district.ADM_NM]
+            assert len(rows) == expected[dataset]
+            assert shapely.contains_xy(district.geometry, rows.geometry.x, rows.geometry.y).all()
+
+    assert totals == {dataset: len(points[dataset]) for dataset in DATASETS}
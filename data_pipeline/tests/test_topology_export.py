@@ -0,0 +1,66 @@
+import json
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from benchmark_pipeline import make_fixture_boundaries
+from schema_config import CRS_ANALYSIS, CRS_OUTPUT
+from topology_export import QUANTIZATION, SIMPLIFY_LEVELS_M, write_topojson_levels
+
+
+def wiggle(coords):
+    """Smooth displacement field (a function of position only, so shared borders stay shared)"""
+    x, y = coords[:, 0], coords[:, 1]
+    return np.column_stack([x + 6 * np.sin(y / 37.0), y + 6 * np.cos(x / 41.0)])
+
+
+@pytest.fixture(scope='module')
+def levels(tmp_path_factory):
+    boundaries = make_fixture_boundaries(30, seed=5)
+    boundaries['geometry'] = shapely.transform(boundaries.geometry.values, wiggle)
+    base = str(tmp_path_factory.mktemp('topojson') / 'districts')
+    return boundaries, write_topojson_levels(boundaries, base)
+
+
+def test_quantized_arcs_stay_in_range(levels):
+    _, paths = levels
+    for path in paths.values():
+        with open(path, encoding='utf-8') as f:
+            doc = json.load(f)
+        assert set(doc['objects']) == {'districts'}
+        # delta 인코딩된 정수 좌표를 누적하면 0 .. QUANTIZATION-1 범위
+        for arc in doc['arcs']:
+            arc = np.asarray(arc)
+            assert arc.dtype.kind == 'i'
+            absolute = np.cumsum(arc, axis=0)
+            assert absolute.min() >= 0 and absolute.max() < QUANTIZATION
+
+
+def test_levels_stay_valid_and_gap_free(levels):
+    boundaries, paths = levels
+    original = boundaries.set_index('ADM_CD').geometry
+    vertices = []
+    for level, path in paths.items():
+        gdf = gpd.read_file(path).set_crs(CRS_OUTPUT).to_crs(CRS_ANALYSIS).set_index('ADM_CD')
+        tolerance = SIMPLIFY_LEVELS_M[level]
+
+        assert sorted(gdf.index) == sorted(original.index)
+        assert gdf.is_valid.all()
+        assert (gdf['ADM_NM'] == boundaries.set_index('ADM_CD')['ADM_NM'].reindex(gdf.index)).all()
+
+        # 이웃 동끼리 겹치지 않고 (면적 합 == 합집합 면적) 틈도 없음 (합집합이 구멍 없는 폴리곤 하나)
+        total = shapely.union_all(gdf.geometry.values)
+        assert gdf.area.sum() == pytest.approx(total.area, rel=1e-6)
+        assert total.geom_type == 'Polygon' and len(total.interiors) == 0
+        outline = shapely.union_all(original.values)
+        assert abs(total.area - outline.area) <= outline.length * tolerance
+
+        # 각 동은 원래 경계에서 tolerance (+ 양자화/재투영 오차) 이상 벗어나지 않음
+        for adm_cd, geom in gdf.geometry.items():
+            assert shapely.hausdorff_distance(geom, original[adm_cd]) <= tolerance + 0.5
+        vertices.append(int(shapely.get_num_coordinates(gdf.geometry.values).sum()))
+
+    assert vertices == sorted(vertices, reverse=True)
+    assert vertices[-1] < vertices[0]
@@ -0,0 +1,60 @@
+import gzip
+from collections import Counter
+
+import geopandas as gpd
+import mapbox_vector_tile
+import pytest
+from pmtiles.reader import MmapSource, Reader, all_tiles
+from pmtiles.tile import zxy_to_tileid
+from shapely.geometry import box
+
+from vector_tiles import iter_tiles, make_layer, tile_range, write_pmtiles
+
+
+@pytest.fixture(scope='module')
+def rectangle():
+    """An axis-aligned rectangle in EPSG:3857 around 서울 (simplification leaves it as is)"""
+    frame = gpd.GeoDataFrame({'name': ['rect'], 'score': [71.5], 'is_target': [True]},
+                             geometry=[box(14_128_000, 4_505_000, 14_141_000, 4_513_000)], crs='EPSG:3857')
+    return make_layer('rect', frame, ['name', 'score', 'is_target'], min_zoom=9, max_zoom=13)
+
+
+def test_tile_count_per_zoom(rectangle):
+    counts = Counter(z for z, _, _, _ in iter_tiles([rectangle], 9, 13))
+    for z in range(9, 14):
+        x0, y0, x1, y1 = tile_range(rectangle['geoms'][0].bounds, z)
+        assert counts[z] == (x1 - x0 + 1) * (y1 - y0 + 1)
+
+
+def test_tiles_are_written_in_tile_id_order(mock_boundaries, grid_hierarchy, tmp_path):
+    districts = make_layer('districts', mock_boundaries, ['ADM_NM', 'is_target_zone'], min_zoom=9, max_zoom=14)
+    cells = grid_hierarchy[grid_hierarchy['cell_size'] == 250]
+    grid = make_layer('grid', cells, ['cell_size'], min_zoom=12, max_zoom=14)
+
+    tiles = list(iter_tiles([districts, grid], 9, 14))
+    ids = [zxy_to_tileid(z, x, y) for z, x, y, _ in tiles]
+    assert ids == sorted(set(ids))
+
+    # 격자 layer 는 min_zoom 이상에서만 포함
+    for z, _, _, data in tiles:
+        names = set(mapbox_vector_tile.decode(gzip.decompress(data)))
+        assert ('grid' in names) <= (z >= 12)
+        assert names <= {'districts', 'grid'}
+
+    path = str(tmp_path / 'tiles.pmtiles')
+    assert write_pmtiles([districts, grid], path, 9, 14) == len(tiles)
+    with open(path, 'rb') as f:
+        get_bytes = MmapSource(f)
+        header = Reader(get_bytes).header()
+        assert header['clustered']
+        assert header['addressed_tiles_count'] == len(tiles)
+        stored = [zxy_to_tileid(*zxy) for zxy, _ in all_tiles(get_bytes)]
+        fields = {layer['id']: layer['fields'] for layer in Reader(get_bytes).metadata()['vector_layers']}
+    assert stored == ids
+    assert fields['districts'] == {'ADM_NM': 'String', 'is_target_zone': 'Boolean'}
+
+
+def test_properties_survive_encoding(rectangle):
+    _, _, _, data = next(iter_tiles([rectangle], 11, 11))
+    feature = mapbox_vector_tile.decode(gzip.decompress(data))['rect']['features'][0]
+    assert feature['properties'] == {'name': 'rect', 'score': 71.5, 'is_target': True}
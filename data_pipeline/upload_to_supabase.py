@@ -1,12 +1,15 @@
 import os
+import sys
 import time
 import numpy as np
+import pandas as pd
+import shapely
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from shapely import wkt
 from pyproj import Transformer
-from calculate_grade import calculate_grades
-from generate_mock_points import generate_mock_dataset
+from pipeline_dag import read_default, run_default
+from district_locator import load_locator
+from batch_uploader import resume_checkpoint, supabase_sender, upload_batches
 
 # 1. Setup & Config
 load_dotenv(dotenv_path='../.env.local')
@@ -24,66 +27,92 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+CHECKPOINT_PATH = 'listings_failed_batches.jsonl'
+
 # Coordinate Transformer: EPSG:5179 (Korea Central) -> EPSG:4326 (WGS84)
 transformer = Transformer.from_crs("EPSG:5179", "EPSG:4326", always_xy=True)
 
-def generate_mock_listings():
+LISTING_BATCH_ROWS = 10_000  # 레코드 dict 를 한 번에 만드는 행 수 (메모리 상한)
+DEFAULT_GRADE = 'C'
+
+def to_hex_ewkb(lon, lat, srid=4326):
+    """Point coordinate arrays -> hex EWKB strings with SRID (PostGIS 가 바로 파싱)"""
+    points = shapely.set_srid(shapely.points(lon, lat), srid)
+    return shapely.to_wkb(points, hex=True, include_srid=True)
+
+def iter_listing_batches(bld_gdf, grades, locator, batch_rows=LISTING_BATCH_ROWS, seed=None):
+    """
+    Yields lists of listing records, batch_rows at a time.
+    Each building is geocoded to its 행정동 with the shared district locator,
+    all coordinates are transformed in one array call and encoded as hex EWKB,
+    grades are joined by 행정동 name in one vectorized lookup (unknown -> DEFAULT_GRADE).
+    """
+    rng = np.random.default_rng(seed)
+    x = bld_gdf.geometry.x.to_numpy()
+    y = bld_gdf.geometry.y.to_numpy()
+
+    # A. Coord Transform (always_xy=True -> lon, lat)
+    lon, lat = transformer.transform(x, y)
+    # B. Hex EWKB (SRID=4326)
+    location = to_hex_ewkb(lon, lat)
+
+    # C. Mock Attributes
+    adm_nm = pd.Series(locator.names_for(locator.locate_index(x, y, crs=bld_gdf.crs)), index=bld_gdf.index).fillna('')
+    grade = adm_nm.map(grades).fillna(DEFAULT_GRADE).to_numpy(dtype=object)
+    # Mock Price (Deposit: 10m~1b won, Monthly: 300k~2m won), BIGINT range
+    price_deposit = rng.integers(1000, 100000, len(bld_gdf), dtype=np.int64) * 10000
+    price_monthly = rng.integers(30, 200, len(bld_gdf), dtype=np.int64) * 10000
+    # Mock address / name
+    address = ("서울시 " + adm_nm + " " + pd.Series(x.astype(np.int64) % 1000, index=adm_nm.index).astype(str)
+               + "-" + pd.Series(y.astype(np.int64) % 100, index=adm_nm.index).astype(str) + "번지").to_numpy(dtype=object)
+    building_name = (adm_nm + " 빌라 " + bld_gdf.index.astype(str) + "호").to_numpy(dtype=object)
+
+    columns = {
+        "location": location,
+        "safety_grade": grade,
+        "price_deposit": price_deposit,
+        "price_monthly": price_monthly,
+        "address": address,
+        "building_name": building_name,
+    }
+    keys = list(columns)
+    for start in range(0, len(bld_gdf), batch_rows):
+        # 컬럼 slice -> Python list 로 한 번에 변환 후 zip 으로 레코드 생성
+        values = [columns[k][start:start + batch_rows].tolist() for k in keys]
+        yield [dict(zip(keys, row)) for row in zip(*values)]
+
+def generate_mock_listings(batch_rows=LISTING_BATCH_ROWS):
+    """Generator of listing record batches (upload_batches 가 바로 소비)"""
     print("1. Generating Mock Data & Grades...")
-    # Get Grades for Districts
-    df_admin, _ = calculate_grades()
+    # Get Grades for Districts (pipeline_dag 캐시 재사용 -> 등급과 같은 건물 데이터)
+    stages = run_default('grades', 'boundaries')
+    df_admin, _ = stages['grades']
     # Grade Map: ADM_NM -> Grade
-    grade_map = df_admin['safety_grade'].to_dict()
+    grades = df_admin['safety_grade']
+    locator = load_locator(stages['boundaries'])
     
-    # Get Raw Building Data
-    _, _, bld_gdf = generate_mock_dataset()
+    # Get Raw Building Data (좌표만 읽고 행정동은 locator 로 판정)
+    bld_gdf = read_default('mock_points', part=2, columns=['geometry'])
     print(f"   -> Generated {len(bld_gdf)} buildings.")
 
-    listings = []
-    
     print("2. Processing & Transforming Data...")
-    for idx, row in bld_gdf.iterrows():
-        # A. Coord Transform
-        # pyproj transform: x, y -> lon, lat (because always_xy=True)
-        x, y = row['geometry'].x, row['geometry'].y
-        lon, lat = transformer.transform(x, y)
-        
-        # B. Create WKT (POINT(lon lat))
-        location_wkt = f"POINT({lon} {lat})"
-        
-        # C. Mock Attributes
-        adm_nm = row['adm_nm']
-        grade = grade_map.get(adm_nm, 'C') # Default C
-        
-        # Mock Price (Deposit: 10m~1b won, Monthly: 300k~2m won)
-        # Using BIGINT range
-        price_deposit = int(np.random.randint(1000, 100000)) * 10000 # 10,000,000 ~ 1,000,000,000
-        price_monthly = int(np.random.randint(30, 200)) * 10000 # 300,000 ~ 2,000,000
-        
-        listings.append({
-            "location": location_wkt,
-            "safety_grade": grade,
-            "price_deposit": price_deposit,
-            "price_monthly": price_monthly,
-            "address": f"서울시 {adm_nm} {int(x)%1000}-{int(y)%100}번지", # Mock address
-            "building_name": f"{adm_nm} 빌라 {idx}호", # Mock name
-        })
-        
-    return listings
+    return iter_listing_batches(bld_gdf, grades, locator, batch_rows=batch_rows)
 
 def upload_listings(data, batch_size=1000):
-    total = len(data)
-    print(f"\n3. Uploading {total} records to Supabase (Batch Size: {batch_size})...")
-    
-    for i in range(0, total, batch_size):
-        batch = data[i:i+batch_size]
-        try:
-            response = supabase.table("listings").upsert(batch).execute()
-            print(f"   -> Uploaded batch {i//batch_size + 1}/{total//batch_size + 1} ({len(batch)} rows)")
-        except Exception as e:
-            print(f"   [ERROR] Failed to upload batch {i}: {e}")
-            
+    print(f"\n3. Uploading records to Supabase (Batch Size: up to {batch_size})...")
+    upload_batches(
+        data,
+        supabase_sender(supabase, "listings", method="upsert"),
+        label="listings",
+        max_rows=batch_size,
+        checkpoint_path=CHECKPOINT_PATH,
+    )
     print("\n[Upload Complete]")
 
 if __name__ == "__main__":
-    listings_data = generate_mock_listings()
-    upload_listings(listings_data)
+    if '--resume' in sys.argv:
+        # Re-send only the batches that failed in a previous run
+        resume_checkpoint(CHECKPOINT_PATH, supabase_sender(supabase, "listings", method="upsert"))
+    else:
+        listings_data = generate_mock_listings()
+        upload_listings(listings_data)
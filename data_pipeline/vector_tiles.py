@@ -0,0 +1,220 @@
+"""
+Vector Tile (MVT / PMTiles) Export
+Project: Tenant Note - Safety Grade Analysis
+
+행정동 choropleth 와 격자 폴리곤을 zoom 피라미드 벡터 타일로 만들어 PMTiles 한 파일로 저장한다.
+지도는 화면에 보이는 타일만 받아서 그리면 된다.
+
+- EPSG:3857 로 한 번만 변환, zoom 마다 타일 1px 기준으로 단순화 (preserve_topology)
+- layer 마다 min_zoom 지정 -> 격자처럼 세밀한 layer 는 확대했을 때만 포함
+- 타일 <-> 피처 매칭은 zoom 별 STRtree 한 번의 bulk query, 잘라내기는 타일 단위 벡터 연산
+- 타일은 gzip 압축 MVT, tile id 순서로 하나씩 만들어 바로 PMTiles 에 기록 (clustered, 전체를 모으지 않음)
+"""
+import gzip
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import shapely
+import mapbox_vector_tile
+from pmtiles.tile import Compression, TileType, tileid_to_zxy, zxy_to_tileid
+from pmtiles.writer import write as pmtiles_write
+
+WEB_MERCATOR = 'EPSG:3857'
+WORLD_HALF = 20037508.342789244
+
+TILE_EXTENT = 4096
+TILE_BUFFER_PX = 64      # 이웃 타일과 겹치게 잘라서 경계선이 끊기지 않도록 (extent 단위)
+SIMPLIFY_PX = 1.0        # 단순화 허용 오차 (화면 pixel, 256px 타일 기준)
+
+DEFAULT_MIN_ZOOM = 9
+DEFAULT_MAX_ZOOM = 15
+
+
+def tile_size_m(z):
+    return 2 * WORLD_HALF / (2 ** z)
+
+
+def tile_bounds(z, x, y):
+    size = tile_size_m(z)
+    min_x = -WORLD_HALF + x * size
+    max_y = WORLD_HALF - y * size
+    return min_x, max_y - size, min_x + size, max_y
+
+
+def tile_range(bounds, z):
+    """(x0, y0, x1, y1) inclusive tile index range covering mercator bounds"""
+    size = tile_size_m(z)
+    n = 2 ** z
+    min_x, min_y, max_x, max_y = bounds
+    x0 = min(n - 1, max(0, math.floor((min_x + WORLD_HALF) / size)))
+    x1 = min(n - 1, max(0, math.floor((max_x + WORLD_HALF) / size)))
+    y0 = min(n - 1, max(0, math.floor((WORLD_HALF - max_y) / size)))
+    y1 = min(n - 1, max(0, math.floor((WORLD_HALF - min_y) / size)))
+    return x0, y0, x1, y1
+
+
+def _clean_properties(df, columns):
+    """Column-wise conversion to plain Python values; NaN properties are omitted"""
+    records = [{} for _ in range(len(df))]
+    for col in columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == 'f':
+            ok = ~np.isnan(values)
+            for i in np.flatnonzero(ok):
+                records[i][col] = float(values[i])
+        elif values.dtype.kind in 'iu':
+            for i, v in enumerate(values.tolist()):
+                records[i][col] = v
+        elif values.dtype.kind == 'b':
+            for i, v in enumerate(values.tolist()):
+                records[i][col] = bool(v)
+        else:
+            for i, v in enumerate(values):
+                if not pd.isna(v):
+                    records[i][col] = str(v)
+    return records
+
+
+def _field_type(series):
+    """TileJSON vector_layers field type of a property column"""
+    kind = series.dtype.kind
+    if kind == 'b':
+        return 'Boolean'
+    return 'Number' if kind in 'iuf' else 'String'
+
+
+def make_layer(name, gdf, properties, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+    """Layer spec for write_pmtiles: geometry is reprojected to EPSG:3857 once here"""
+    merc = gdf.to_crs(WEB_MERCATOR)
+    columns = [c for c in properties if c in merc.columns]
+    return {
+        'name': name,
+        'geoms': np.asarray(merc.geometry.values, dtype=object),
+        'properties': _clean_properties(merc, columns),
+        'fields': {c: _field_type(merc[c]) for c in columns},
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+    }
+
+
+def _layer_index(layer, z):
+    """
+    Tile <-> feature pairs of one layer at zoom z (one STRtree bulk query), sorted by tile id.
+    Returns (simplified geoms, their layer row numbers, tile ids, geometry index per pair) or None.
+    """
+    pixel = tile_size_m(z) / 256
+    geoms = shapely.simplify(layer['geoms'], pixel * SIMPLIFY_PX, preserve_topology=True)
+    valid = np.flatnonzero(~(shapely.is_missing(geoms) | shapely.is_empty(geoms)))
+    if len(valid) == 0:
+        return None
+    geoms = geoms[valid]
+
+    x0, y0, x1, y1 = tile_range(shapely.total_bounds(geoms), z)
+    xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+    xs, ys = xs.ravel(), ys.ravel()
+    size = tile_size_m(z)
+    tile_min_x = -WORLD_HALF + xs * size
+    tile_max_y = WORLD_HALF - ys * size
+    boxes = shapely.box(tile_min_x, tile_max_y - size, tile_min_x + size, tile_max_y)
+
+    tree = shapely.STRtree(geoms)
+    tile_idx, geom_idx = tree.query(boxes, predicate='intersects')
+    box_ids = np.array([zxy_to_tileid(z, int(x), int(y)) for x, y in zip(xs, ys)], dtype=np.int64)
+    tile_ids = box_ids[tile_idx]
+    order = np.argsort(tile_ids, kind='stable')
+    return geoms, valid, tile_ids[order], geom_idx[order]
+
+
+def _tile_features(layer, index, tile_id, z, x, y):
+    """Features of one layer clipped to tile (z, x, y) with the buffer"""
+    geoms, valid, tile_ids, geom_idx = index
+    lo, hi = np.searchsorted(tile_ids, [tile_id, tile_id + 1])
+    if lo == hi:
+        return []
+    g_idx = geom_idx[lo:hi]
+    bx0, by0, bx1, by1 = tile_bounds(z, x, y)
+    buffer_m = tile_size_m(z) * TILE_BUFFER_PX / TILE_EXTENT
+    clipped = shapely.clip_by_rect(geoms[g_idx], bx0 - buffer_m, by0 - buffer_m, bx1 + buffer_m, by1 + buffer_m)
+    keep = ~shapely.is_empty(clipped)
+    return [{'geometry': geom, 'properties': layer['properties'][valid[i]]}
+            for geom, i in zip(clipped[keep], g_idx[keep])]
+
+
+def iter_tiles(layers, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+    """
+    Yields (z, x, y, gzipped MVT bytes) for every non-empty tile in PMTiles tile-id order
+    (zoom by zoom, Hilbert order within a zoom). Only the tile <-> feature index of the
+    current zoom is held; each tile is clipped and encoded when it is yielded.
+    """
+    for z in range(min_zoom, max_zoom + 1):
+        indexes = []
+        for layer in layers:
+            if layer['min_zoom'] <= z <= layer['max_zoom']:
+                index = _layer_index(layer, z)
+                if index is not None:
+                    indexes.append((layer, index))
+        if not indexes:
+            continue
+        for tile_id in np.unique(np.concatenate([index[2] for _, index in indexes])).tolist():
+            _, x, y = tileid_to_zxy(tile_id)
+            tile_layers = []
+            for layer, index in indexes:
+                features = _tile_features(layer, index, tile_id, z, x, y)
+                if features:
+                    tile_layers.append({'name': layer['name'], 'features': features})
+            if not tile_layers:
+                continue
+            data = mapbox_vector_tile.encode(
+                tile_layers,
+                default_options={'quantize_bounds': tile_bounds(z, x, y), 'extents': TILE_EXTENT},
+            )
+            yield z, x, y, gzip.compress(data, mtime=0)
+
+
+def write_pmtiles(layers, path, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM, name='tenant-note'):
+    """
+    Writes all tiles of the given layers (see make_layer) into a single PMTiles archive.
+    Returns the number of tiles written.
+    """
+    # 타일은 tile id 순서로 만들어지므로 메모리에 모으지 않고 바로 기록
+    tiles = iter_tiles(layers, min_zoom, max_zoom)
+    first = next(tiles, None)
+    if first is None:
+        raise ValueError("No features to tile")
+
+    # 헤더용 경위도 범위 (모든 layer 의 EPSG:3857 범위 -> WGS84)
+    all_bounds = np.array([shapely.total_bounds(layer['geoms']) for layer in layers])
+    min_x, min_y = all_bounds[:, 0].min(), all_bounds[:, 1].min()
+    max_x, max_y = all_bounds[:, 2].max(), all_bounds[:, 3].max()
+    to_lon = lambda mx: mx / WORLD_HALF * 180.0
+    to_lat = lambda my: math.degrees(2 * math.atan(math.exp(my / WORLD_HALF * math.pi)) - math.pi / 2)
+
+    header = {
+        'tile_type': TileType.MVT,
+        'tile_compression': Compression.GZIP,
+        'min_lon_e7': int(to_lon(min_x) * 1e7),
+        'min_lat_e7': int(to_lat(min_y) * 1e7),
+        'max_lon_e7': int(to_lon(max_x) * 1e7),
+        'max_lat_e7': int(to_lat(max_y) * 1e7),
+        'center_zoom': min_zoom,
+        'center_lon_e7': int(to_lon((min_x + max_x) / 2) * 1e7),
+        'center_lat_e7': int(to_lat((min_y + max_y) / 2) * 1e7),
+    }
+    metadata = {
+        'name': name,
+        'vector_layers': [
+            {'id': layer['name'], 'minzoom': layer['min_zoom'], 'maxzoom': layer['max_zoom'],
+             'fields': layer['fields']}
+            for layer in layers
+        ],
+    }
+    count = 0
+    with pmtiles_write(path) as writer:
+        for z, x, y, data in itertools.chain([first], tiles):
+            writer.write_tile(zxy_to_tileid(z, x, y), data)
+            count += 1
+        writer.finalize(header, metadata)
+    print(f"   -> {count} tiles (z{min_zoom}-{max_zoom}) written to {path}")
+    return count
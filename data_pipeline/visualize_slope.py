@@ -2,6 +2,8 @@ import os
 import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
+from intermediate_store import read_shapefile_cached
+from merge_slope_data import SEOUL_ADM_FILTER, load_slope_table
 
 # Configuration
 DATA_DIR = os.path.join(os.getcwd(), 'data')
@@ -22,15 +24,13 @@ def main():
     print("Starting Visualization...")
     
     # 1. Load Data
-    print("Loading CSV...")
-    df = pd.read_csv(CSV_PATH)
+    df = load_slope_table(['adm_cd', 'adm_nm', 'mean_slope'])
     
     print("Loading Shapefile...")
     shp_path = get_shapefile_path()
-    gdf = gpd.read_file(shp_path, encoding='euc-kr')
     
-    # Filter Seoul & Reproject
-    gdf = gdf[gdf['ADM_CD'].str.startswith('11')].copy()
+    # Filter Seoul & Reproject (GeoParquet 사본에서 필요한 컬럼과 서울 행만 읽음)
+    gdf = read_shapefile_cached(shp_path, columns=['ADM_CD'], filters=SEOUL_ADM_FILTER)
     if gdf.crs != TARGET_CRS:
         gdf = gdf.to_crs(TARGET_CRS)
 
@@ -0,0 +1,138 @@
+"""
+Label-Raster Zonal Statistics Engine
+Project: Tenant Note - Safety Grade Analysis
+
+행정동 폴리곤을 정수 라벨 래스터로 한 번만 rasterize 해서 캐시하고,
+어떤 값 래스터(경사도, 소음, 인구밀도 등)든 np.bincount 한 번의 패스로
+count / sum / mean / min / max / 임계값 비율을 동시에 계산한다.
+
+- 라벨 0 = 폴리곤 밖, 1..N = gdf 의 행 순서
+- rasterstats 기본값과 같이 픽셀 중심이 폴리곤 안에 있는 셀만 포함 (all_touched=False)
+- 라벨 래스터는 memmap .npy 에 블록 단위로 쓰고, 값 래스터는 행 블록 단위로 읽으므로
+  어느 쪽도 전체를 메모리에 올리지 않음
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from rasterio.features import rasterize
+from rasterio.transform import Affine
+
+BLOCK_ROWS = 2048
+
+
+def label_cache_key(gdf, transform, shape):
+    """Hash of the polygons (WKB), the grid transform and shape"""
+    h = hashlib.sha1()
+    for geom in gdf.geometry:
+        h.update(geom.wkb)
+    h.update(repr(tuple(transform)[:6]).encode())
+    h.update(repr(tuple(shape)).encode())
+    return h.hexdigest()[:16]
+
+
+def build_label_raster(gdf, transform, shape, cache_dir=None):
+    """
+    Rasterizes gdf polygons (already in the raster CRS) to an int32 label raster.
+    The raster is a memory-mapped .npy filled block by block, so memory stays at one block.
+    With cache_dir it is kept and re-opened memory-mapped next time; without, it lives in
+    an unlinked temporary file.
+    """
+    cache_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f"labels_{label_cache_key(gdf, transform, shape)}.npy")
+        if os.path.exists(cache_path):
+            print(f"   - Using cached label raster {os.path.basename(cache_path)}")
+            return np.load(cache_path, mmap_mode='r')
+
+    # 임시 파일에 쓰고 완성되면 교체 (중간에 죽어도 깨진 캐시가 남지 않도록)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.npy.tmp')
+    os.close(fd)
+    try:
+        labels = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int32, shape=tuple(shape))
+        # 블록 단위로 rasterize (전체 격자 크기의 중간 배열을 만들지 않도록)
+        for row0 in range(0, shape[0], BLOCK_ROWS):
+            row1 = min(shape[0], row0 + BLOCK_ROWS)
+            block_transform = transform * Affine.translation(0, row0)
+            labels[row0:row1] = rasterize(
+                ((geom, i + 1) for i, geom in enumerate(gdf.geometry) if geom is not None and not geom.is_empty),
+                out_shape=(row1 - row0, shape[1]),
+                transform=block_transform,
+                fill=0,
+                dtype='int32',
+            )
+        labels.flush()
+        if cache_path:
+            del labels
+            os.replace(tmp_path, cache_path)
+            return np.load(cache_path, mmap_mode='r')
+        # 캐시 없음: 파일은 지우고 열린 memmap 만 사용 (닫히면 디스크에서 사라짐)
+        os.remove(tmp_path)
+        return labels
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def zonal_summary(labels, values, n_zones, nodata=None, thresholds=None):
+    """
+    Per-zone statistics of `values` over the label raster in a single pass.
+
+    thresholds: {name: t} adds '<name>_ratio' = share of valid cells with value >= t.
+    Returns a DataFrame indexed 1..n_zones with count, sum, mean, min, max (+ ratios).
+    Zones without valid cells get count 0 and NaN statistics.
+    """
+    thresholds = thresholds or {}
+    size = n_zones + 1
+    count = np.zeros(size, dtype=np.int64)
+    total = np.zeros(size, dtype=np.float64)
+    vmin = np.full(size, np.inf)
+    vmax = np.full(size, -np.inf)
+    above = {name: np.zeros(size, dtype=np.int64) for name in thresholds}
+
+    for row0 in range(0, labels.shape[0], BLOCK_ROWS):
+        row1 = min(labels.shape[0], row0 + BLOCK_ROWS)
+        lab = np.asarray(labels[row0:row1]).ravel()
+        val = np.asarray(values[row0:row1], dtype=np.float64).ravel()
+
+        valid = (lab > 0) & ~np.isnan(val)
+        if nodata is not None and not np.isnan(nodata):
+            valid &= val != nodata
+        lab = lab[valid]
+        val = val[valid]
+        if len(lab) == 0:
+            continue
+
+        count += np.bincount(lab, minlength=size)
+        total += np.bincount(lab, weights=val, minlength=size)
+        np.minimum.at(vmin, lab, val)
+        np.maximum.at(vmax, lab, val)
+        for name, t in thresholds.items():
+            above[name] += np.bincount(lab[val >= t], minlength=size)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = pd.DataFrame({
+            'count': count,
+            'sum': total,
+            'mean': total / count,
+            'min': np.where(count > 0, vmin, np.nan),
+            'max': np.where(count > 0, vmax, np.nan),
+        })
+        for name in thresholds:
+            result[f'{name}_ratio'] = above[name] / count
+    return result.iloc[1:]
+
+
+def zonal_stats_by_label(gdf, values, transform, id_col=None, nodata=None, thresholds=None, cache_dir=None):
+    """
+    Convenience wrapper: rasterize gdf (cached) and summarize `values` per polygon.
+    The result is aligned to gdf rows (indexed by gdf[id_col] if given, else gdf.index).
+    """
+    labels = build_label_raster(gdf, transform, values.shape, cache_dir=cache_dir)
+    summary = zonal_summary(labels, values, len(gdf), nodata=nodata, thresholds=thresholds)
+    summary.index = gdf[id_col].values if id_col else gdf.index
+    return summary
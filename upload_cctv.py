@@ -1,6 +1,15 @@
+import codecs
+import hashlib
+import itertools
+import json
+import os
+import sys
+import numpy as np
 import pandas as pd
 from supabase import create_client, Client
-import math
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_pipeline'))
+from batch_uploader import resume_checkpoint, supabase_sender, upload_batches
 
 # ---------------------------------------------------------
 # 🔑 Supabase 키 설정 (반드시 본인의 키로 변경하세요!)
@@ -14,40 +23,54 @@ except Exception as e:
     print(f"🔥 Supabase 연결 설정 실패: {e}")
     exit()
 
-def upload_data():
-    print("🗑️ 1. 기존 데이터 삭제 중 (초기화)...")
+CSV_PATH = 'cctv_data.csv'
+MIGRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cctv_content_key.sql')
+CHECKPOINT_PATH = 'cctv_failed_batches.jsonl'
+MANIFEST_PATH = 'cctv_manifest.json'
+CHUNK_SIZE = 50000
+
+# 대한민국 좌표 범위 (0,0 등 잘못된 좌표 차단)
+KOREA_LAT_RANGE = (33, 43)
+KOREA_LNG_RANGE = (124, 132)
+
+
+def decodes_fully(path, encoding, block_size=8 * 1024 * 1024):
+    """파일 전체가 encoding 으로 디코딩되는지 확인 (블록 단위 스트리밍, 메모리는 블록 크기만큼)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
     try:
-        # 기존 데이터 전체 삭제 (안전하게 id가 0보다 큰 것 삭제)
-        supabase.table('cctv').delete().gt('id', 0).execute()
-        print("   ✅ DB 초기화 완료!")
-    except Exception as e:
-        print(f"   ⚠️ 초기화 중 메시지(무시 가능): {e}")
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                decoder.decode(block)
+        decoder.decode(b'', final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
 
-    print("\n📂 2. CSV 파일 로딩 중...")
-    df = None
-    # 인코딩 자동 감지 (한글 깨짐 방지)
+
+def detect_encoding(path):
+    """
+    인코딩 자동 감지 (한글 깨짐 방지) - 파일 전체를 디코딩해 보고 결정
+    (앞부분만 보면 뒤쪽의 CP949 글자에서 업로드 도중 UnicodeDecodeError 가 남)
+    """
     encodings = ['utf-8', 'cp949', 'euc-kr', 'utf-8-sig']
-    
     for enc in encodings:
         try:
-            df = pd.read_csv('cctv_data.csv', encoding=enc)
-            print(f"   ✅ 파일 읽기 성공 (인코딩: {enc})")
-            break
-        except:
+            if not decodes_fully(path, enc):
+                continue
+            pd.read_csv(path, encoding=enc, nrows=1000)
+            return enc
+        except Exception:
             continue
-            
-    if df is None:
-        print("❌ 파일 읽기 실패. 엑셀에서 'CSV (UTF-8)' 형식으로 다시 저장해주세요.")
-        return
+    return None
+
 
-    # 3. 컬럼명 스마트 매핑 (깨진 글자라도 찾기)
-    print(f"📋 읽어온 컬럼: {list(df.columns)}")
-    
+def resolve_coord_columns(columns):
+    """
+    컬럼명 스마트 매핑 (깨진 글자라도 찾기). Returns (lat_col, lng_col).
+    """
     target_lat = None
     target_lng = None
-    
-    # [수정된 부분] for 와 in 사이에 변수 x를 넣었습니다.
-    for col in df.columns:
+    for col in columns:
         c = str(col).lower()
         if any(x in c for x in ['lat', '위도', 'wgs84위도']): target_lat = col
         if any(x in c for x in ['lon', 'lng', '경도', 'wgs84경도']): target_lng = col
@@ -55,68 +78,271 @@ def upload_data():
     # 못 찾았으면 위치(인덱스)로 강제 추정 (보통 뒤쪽에 좌표가 있음)
     if not target_lat or not target_lng:
         print("⚠️ 컬럼 이름으로 좌표를 찾을 수 없어, 12, 13번째 컬럼을 좌표로 가정합니다.")
-        if len(df.columns) > 13:
-            target_lat = df.columns[1] # 엑셀 13번째
-            target_lng = df.columns[2] # 엑셀 14번째
+        if len(columns) > 13:
+            target_lat = columns[1] # 엑셀 13번째
+            target_lng = columns[2] # 엑셀 14번째
+    return target_lat, target_lng
 
-    print(f"🎯 좌표 컬럼 확정: 위도=[{target_lat}], 경도=[{target_lng}]")
 
-    # 4. 데이터 정제 및 변환
-    records = []
-    print("🔄 유효 데이터 선별 중...")
+def _text_column(chunk, names, default):
+    """첫 번째로 존재하는 컬럼 값을 사용하고, 비어 있으면 다음 후보/기본값으로 채움"""
+    result = pd.Series(default, index=chunk.index, dtype=object)
+    for name in reversed(names):
+        if name in chunk.columns:
+            result = chunk[name].where(chunk[name].notna(), result)
+    return result.astype(str)
 
-    count_skipped = 0
-    for index, row in df.iterrows():
-        try:
-            lat = row[target_lat]
-            lng = row[target_lng]
 
-            # 좌표가 없거나 0이면 건너뜀
-            if pd.isna(lat) or pd.isna(lng):
-                count_skipped += 1
-                continue
-                
-            lat_val = float(lat)
-            lng_val = float(lng)
+def clean_cctv_chunk(chunk, lat_col, lng_col):
+    """
+    Vectorized cleaning of one CSV chunk.
+    Returns (records DataFrame, skipped count).
+    """
+    lat = pd.to_numeric(chunk[lat_col], errors='coerce')
+    lng = pd.to_numeric(chunk[lng_col], errors='coerce')
 
-            # 🚨 핵심: 대한민국 좌표 범위(33~43, 124~132)가 아니면 버림 (0,0 데이터 차단)
-            if not (33 < lat_val < 43 and 124 < lng_val < 132):
-                count_skipped += 1
-                continue
+    if '카메라대수' in chunk.columns:
+        count = pd.to_numeric(chunk['카메라대수'], errors='coerce')
+        # 정수로 변환할 수 없는 값은 불량 데이터로 간주 (원본의 int() 실패와 동일)
+        count_ok = count.notna() & np.isfinite(count)
+    else:
+        count = pd.Series(1, index=chunk.index)
+        count_ok = pd.Series(True, index=chunk.index)
+
+    # 🚨 핵심: 대한민국 좌표 범위(33~43, 124~132)가 아니면 버림 (NaN 은 비교가 False 라 함께 제외)
+    valid = (
+        (lat > KOREA_LAT_RANGE[0]) & (lat < KOREA_LAT_RANGE[1]) &
+        (lng > KOREA_LNG_RANGE[0]) & (lng < KOREA_LNG_RANGE[1]) &
+        count_ok
+    )
+    chunk = chunk[valid]
+
+    records = pd.DataFrame({
+        "name": _text_column(chunk, ['관리기관명'], 'CCTV'),
+        "address": _text_column(chunk, ['소재지도로명주소', '소재지지번주소'], '주소미상'),
+        "purpose": _text_column(chunk, ['설치목적구분'], '다목적'),
+        "count": count[valid].astype(np.int64),
+        "lat": lat[valid].astype(float),
+        "lng": lng[valid].astype(float),
+    })
+    return records, int((~valid).sum())
 
-            record = {
-                "name": str(row.get('관리기관명', 'CCTV')), 
-                "address": str(row.get('소재지도로명주소', row.get('소재지지번주소', '주소미상'))),
-                "purpose": str(row.get('설치목적구분', '다목적')),
-                "count": int(row.get('카메라대수', 1)),
-                "lat": lat_val,
-                "lng": lng_val,
-            }
-            records.append(record)
-        except:
-            count_skipped += 1
-            continue
 
-    print(f"   🚀 유효 데이터: {len(records)}개 (제외된 불량 데이터: {count_skipped}개)")
+def iter_cctv_records(path, batch_size=1000, chunk_size=CHUNK_SIZE, stats=None):
+    """
+    Streams the CCTV CSV in chunks and yields upload-ready record batches (list of dicts).
+    Valid/skipped counters are accumulated into `stats` as the file is consumed.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('valid', 0)
+    stats.setdefault('skipped', 0)
 
-    if len(records) == 0:
-        print("❌ 업로드할 유효한 데이터가 없습니다. 좌표 컬럼을 다시 확인하세요.")
+    encoding = detect_encoding(path)
+    if encoding is None:
+        stats['error'] = "파일 읽기 실패. 엑셀에서 'CSV (UTF-8)' 형식으로 다시 저장해주세요."
         return
+    print(f"   ✅ 파일 읽기 성공 (인코딩: {encoding})")
+
+    lat_col = lng_col = None
+    pending = []
+    pending_rows = 0
+    for chunk in pd.read_csv(path, encoding=encoding, chunksize=chunk_size, low_memory=False):
+        if lat_col is None:
+            # 3. 좌표 컬럼은 첫 청크에서 한 번만 결정
+            print(f"📋 읽어온 컬럼: {list(chunk.columns)}")
+            lat_col, lng_col = resolve_coord_columns(list(chunk.columns))
+            print(f"🎯 좌표 컬럼 확정: 위도=[{lat_col}], 경도=[{lng_col}]")
+            if lat_col is None or lng_col is None:
+                stats['error'] = "좌표 컬럼을 찾을 수 없습니다."
+                return
+
+        # 4. 데이터 정제 및 변환 (벡터 연산)
+        records, skipped = clean_cctv_chunk(chunk, lat_col, lng_col)
+        stats['valid'] += len(records)
+        stats['skipped'] += skipped
+
+        pending.append(records)
+        pending_rows += len(records)
+        if pending_rows < batch_size:
+            continue
+        buffer = pd.concat(pending, ignore_index=True)
+        full = (len(buffer) // batch_size) * batch_size
+        for start in range(0, full, batch_size):
+            yield buffer.iloc[start:start + batch_size].to_dict('records')
+        pending = [buffer.iloc[full:]]
+        pending_rows = len(buffer) - full
+
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True).to_dict('records')
+
 
-    # 5. 고속 업로드 (배치 처리)
-    print("📡 DB 업로드 시작...")
-    batch_size = 1000
-    total_batches = math.ceil(len(records) / batch_size)
+# --- Incremental sync ----------------------------------------------------
+# cctv 테이블에 UNIQUE 제약이 걸린 content_key 컬럼이 필요합니다 (upsert/delete 기준).
+# 처음 한 번 cctv_content_key.sql 을 실행하세요 (실행 시 check_content_key 로 먼저 확인).
+# 마지막으로 업로드한 {content_key: row_hash} 는 MANIFEST_PATH 에 저장되고,
+# 다음 실행에서는 신규/변경분만 upsert, 사라진 카메라만 delete 합니다.
+
+def check_content_key():
+    """content_key 컬럼이 있는지 업로드 전에 확인 (없으면 모든 upsert 가 실패하므로 바로 중단)"""
+    try:
+        supabase.table('cctv').select('content_key').limit(1).execute()
+        return True
+    except Exception as e:
+        print(f"❌ cctv.content_key 컬럼을 확인할 수 없습니다: {e}")
+        print(f"   먼저 Supabase SQL Editor 에서 {MIGRATION_PATH} 를 실행하세요.")
+        return False
 
-    for i in range(total_batches):
-        batch = records[i*batch_size : (i+1)*batch_size]
+
+def content_key(record):
+    """카메라 고유 키: 좌표(소수 6자리, 약 10cm) + 주소 + 설치목적"""
+    raw = f"{record['lat']:.6f}|{record['lng']:.6f}|{record['address']}|{record['purpose']}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def row_hash(record):
+    """키 이외의 속성(관리기관, 대수, 원 좌표)이 바뀌었는지 판별하기 위한 해시"""
+    raw = f"{record['name']}|{record['count']}|{record['lat']!r}|{record['lng']!r}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def iter_keyed_batches(batches):
+    """
+    Attaches content_key to every record. Identical cameras (same key) get an
+    occurrence suffix so each row keeps its own key.
+    """
+    seen = {}
+    for batch in batches:
+        for record in batch:
+            key = content_key(record)
+            n = seen.get(key, 0)
+            seen[key] = n + 1
+            record['content_key'] = key if n == 0 else f"{key}#{n}"
+        yield batch
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['rows']
+
+
+def save_manifest(rows, path=MANIFEST_PATH):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'table': 'cctv', 'rows': rows}, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def cctv_delete_sender():
+    """content_key 목록으로 삭제하는 sender (batch 는 {'content_key': ...} 레코드 목록)"""
+    def send(batch):
+        keys = [r['content_key'] for r in batch]
+        supabase.table('cctv').delete().in_('content_key', keys).execute()
+    return send
+
+
+def sync_records(batches, manifest):
+    """
+    Diffs keyed record batches against the manifest and sends only the changes.
+    Returns the new manifest, leaving failed writes at their previous state so the
+    next run retries them.
+    """
+    new_manifest = {}
+    counters = {'insert': 0, 'update': 0, 'unchanged': 0, 'delete': 0}
+
+    def changed_batches():
+        for batch in batches:
+            changed = []
+            for record in batch:
+                key = record['content_key']
+                h = row_hash(record)
+                new_manifest[key] = h
+                old = manifest.get(key)
+                if old == h:
+                    counters['unchanged'] += 1
+                    continue
+                counters['insert' if old is None else 'update'] += 1
+                changed.append(record)
+            if changed:
+                yield changed
+
+    def revert(batch, error):
+        # 실패한 행은 이전 manifest 상태로 되돌림 (신규였다면 제거)
+        for r in batch:
+            key = r['content_key']
+            if key in manifest:
+                new_manifest[key] = manifest[key]
+            else:
+                new_manifest.pop(key, None)
+
+    upload_batches(
+        changed_batches(),
+        supabase_sender(supabase, 'cctv', method='upsert', on_conflict='content_key'),
+        label='cctv-upsert',
+        checkpoint_path=CHECKPOINT_PATH,
+        on_failed=revert,
+    )
+
+    removed = [k for k in manifest if k not in new_manifest]
+    counters['delete'] = len(removed)
+    if removed:
+        upload_batches(
+            ({'content_key': k} for k in removed),
+            cctv_delete_sender(),
+            label='cctv-delete',
+            max_rows=200,  # in_ 필터는 URL 에 들어가므로 작게
+            on_failed=revert,
+        )
+
+    print(f"   🔁 신규 {counters['insert']} / 변경 {counters['update']} / "
+          f"삭제 {counters['delete']} / 동일 {counters['unchanged']}")
+    return new_manifest
+
+
+def upload_data(mode='sync'):
+    manifest = load_manifest() if mode == 'sync' else None
+    if manifest is None:
+        # 전체 재적재 (--full 또는 manifest 가 없는 첫 실행)
+        print("🗑️ 1. 기존 데이터 삭제 중 (초기화)...")
         try:
-            supabase.table('cctv').insert(batch).execute()
-            print(f"   ✅ Batch [{i+1}/{total_batches}] 완료")
+            # 기존 데이터 전체 삭제 (안전하게 id가 0보다 큰 것 삭제)
+            supabase.table('cctv').delete().gt('id', 0).execute()
+            print("   ✅ DB 초기화 완료!")
         except Exception as e:
-            print(f"   ❌ Batch [{i+1}] 에러: {e}")
+            print(f"   ⚠️ 초기화 중 메시지(무시 가능): {e}")
+        manifest = {}
+    else:
+        print(f"🔍 1. 증분 동기화 모드 (manifest: {len(manifest)}건)")
+
+    print("\n📂 2. CSV 파일 로딩 중...")
+    stats = {'valid': 0, 'skipped': 0}
+    batches = iter_cctv_records(CSV_PATH, batch_size=1000, stats=stats)
+    # 첫 배치를 미리 꺼내서 파일/좌표 컬럼 문제를 업로드 전에 확인
+    first_batch = next(batches, None)
+    if first_batch is None:
+        if stats.get('error'):
+            print(f"❌ {stats['error']}")
+        else:
+            print("❌ 업로드할 유효한 데이터가 없습니다. 좌표 컬럼을 다시 확인하세요.")
+        return
+
+    # 5. 고속 업로드 (변경분만, 배치 병렬 전송 + 재시도) - 배치를 읽는 대로 바로 전송하므로 메모리가 일정하게 유지됨
+    print("📡 DB 동기화 시작...")
+    keyed = iter_keyed_batches(itertools.chain([first_batch], batches))
+    new_manifest = sync_records(keyed, manifest)
+    save_manifest(new_manifest)
 
+    print(f"   🚀 유효 데이터: {stats['valid']}개 (제외된 불량 데이터: {stats['skipped']}개)")
     print("🎉 모든 작업이 완료되었습니다!")
 
 if __name__ == "__main__":
-    upload_data()
\ No newline at end of file
+    if not check_content_key():
+        sys.exit(1)
+    if '--resume' in sys.argv:
+        # 이전 실행에서 실패한 배치만 다시 전송
+        resume_checkpoint(CHECKPOINT_PATH, supabase_sender(supabase, 'cctv', method='upsert', on_conflict='content_key'))
+    else:
+        # 기본은 증분 동기화, --full 이면 전체 삭제 후 재적재
+        upload_data(mode='full' if '--full' in sys.argv else 'sync')
\ No newline at end of file